@@ -0,0 +1,208 @@
+from sqlalchemy import delete, insert, not_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta
+from typing import List, Optional
+import uuid
+from app import models, schemas, security
+from app.pagination import decode_cursor
+from app.services import alert_storage, principals, versioning
+from app.services.trigger_state import ARMED, trigger_store
+
+# Async counterparts of app.crud for the API endpoints. The Celery worker
+# keeps using the sync functions in app.crud.
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
+
+async def get_user_by_id(db: AsyncSession, user_id: uuid.UUID):
+    return await db.get(models.User, user_id)
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    hashed_password = await security.ahash_password(user.password)
+    db_user = models.User(
+        email=user.email,
+        hashed_password=hashed_password,
+        id=uuid.uuid4()
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    """Return the user when the password matches, upgrading its hash if the cost changed"""
+    db_user = await get_user_by_email(db, email)
+    if not db_user:
+        return None
+    valid, new_hash = await security.averify_password(password, db_user.hashed_password)
+    if not valid:
+        return None
+    if new_hash:
+        db_user.hashed_password = new_hash
+        await db.commit()
+    return db_user
+
+async def get_strategies_by_user(db: AsyncSession, user_id: uuid.UUID, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    query = select(models.Strategy).where(models.Strategy.user_id == user_id)
+    if cursor:
+        created_at, strategy_id = decode_cursor(cursor)
+        query = query.where(tuple_(models.Strategy.created_at, models.Strategy.id) < (created_at, strategy_id))
+    query = query.order_by(models.Strategy.created_at.desc(), models.Strategy.id.desc())
+    if not cursor:
+        query = query.offset(skip)
+    result = await db.execute(query.limit(limit))
+    return result.scalars().all()
+
+async def get_strategy_by_id(db: AsyncSession, strategy_id: uuid.UUID):
+    return await db.get(models.Strategy, strategy_id)
+
+async def create_user_strategy(db: AsyncSession, strategy: schemas.StrategyCreate, user_id: uuid.UUID):
+    db_strategy = models.Strategy(
+        **strategy.dict(),
+        user_id=user_id,
+        id=uuid.uuid4()
+    )
+    db.add(db_strategy)
+    await db.commit()
+    await db.refresh(db_strategy)
+    await versioning.abump_version(user_id, versioning.STRATEGIES)
+    return db_strategy
+
+async def update_strategy(db: AsyncSession, db_strategy: models.Strategy, strategy_update: schemas.StrategyCreate):
+    for field, value in strategy_update.dict().items():
+        setattr(db_strategy, field, value)
+    # An edited strategy starts over armed
+    db_strategy.trigger_state, db_strategy.triggered_at = ARMED, None
+    await db.commit()
+    await db.refresh(db_strategy)
+    await trigger_store.aforget([db_strategy.id])
+    await versioning.abump_version(db_strategy.user_id, versioning.STRATEGIES)
+    return db_strategy
+
+async def delete_strategy(db: AsyncSession, db_strategy: models.Strategy):
+    await db.delete(db_strategy)
+    await db.commit()
+    await trigger_store.aforget([db_strategy.id])
+    await versioning.abump_version(db_strategy.user_id, versioning.STRATEGIES)
+    return db_strategy
+
+async def toggle_strategy(db: AsyncSession, db_strategy: models.Strategy):
+    db_strategy.is_active = not db_strategy.is_active
+    # A re-activated strategy starts over armed, like an edited one
+    db_strategy.trigger_state, db_strategy.triggered_at = ARMED, None
+    await db.commit()
+    await db.refresh(db_strategy)
+    await trigger_store.aforget([db_strategy.id])
+    await versioning.abump_version(db_strategy.user_id, versioning.STRATEGIES)
+    return db_strategy
+
+async def get_alerts_by_user(db: AsyncSession, user_id: uuid.UUID, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    query = select(models.Alert).where(models.Alert.user_id == user_id)
+    cutoff = alert_storage.retention_cutoff()
+    if cutoff is not None:
+        # Lets Postgres prune partitions outside the retention window
+        query = query.where(models.Alert.created_at >= cutoff)
+    if cursor:
+        created_at, alert_id = decode_cursor(cursor)
+        query = query.where(tuple_(models.Alert.created_at, models.Alert.id) < (created_at, alert_id))
+    query = query.order_by(models.Alert.created_at.desc(), models.Alert.id.desc())
+    if not cursor:
+        query = query.offset(skip)
+    result = await db.execute(query.limit(limit))
+    return result.scalars().all()
+
+async def get_alert_stats(db: AsyncSession, user_id: uuid.UUID, days: int = 30):
+    since = datetime.utcnow().date() - timedelta(days=days)
+    result = await db.execute(
+        select(models.AlertDailyRollup).where(
+            models.AlertDailyRollup.user_id == user_id,
+            models.AlertDailyRollup.day >= since
+        ).order_by(models.AlertDailyRollup.day.desc(), models.AlertDailyRollup.strategy_id)
+    )
+    return result.scalars().all()
+
+async def update_user_telegram_chat_id(db: AsyncSession, user_id: uuid.UUID, chat_id: str):
+    db_user = await get_user_by_id(db, user_id)
+    if db_user:
+        db_user.telegram_chat_id = chat_id
+        await db.commit()
+        await db.refresh(db_user)
+        await principals.ainvalidate(db_user.id)
+    return db_user
+
+async def set_user_active(db: AsyncSession, user_id: uuid.UUID, is_active: bool):
+    db_user = await get_user_by_id(db, user_id)
+    if db_user:
+        db_user.is_active = is_active
+        await db.commit()
+        await db.refresh(db_user)
+        await principals.ainvalidate(db_user.id)
+    return db_user
+
+async def get_owned_strategy_ids(db: AsyncSession, user_id: uuid.UUID, strategy_ids):
+    """Subset of strategy_ids owned by the user, in one query"""
+    if not strategy_ids:
+        return set()
+    result = await db.execute(
+        select(models.Strategy.id).where(
+            models.Strategy.id.in_(list(strategy_ids)),
+            models.Strategy.user_id == user_id
+        )
+    )
+    return set(result.scalars().all())
+
+async def bulk_create_strategies(db: AsyncSession, strategies: List[schemas.StrategyCreate], user_id: uuid.UUID):
+    now = datetime.utcnow()
+    rows = [
+        dict(strategy.dict(), id=uuid.uuid4(), user_id=user_id, is_active=True, created_at=now)
+        for strategy in strategies
+    ]
+    if rows:
+        await db.execute(insert(models.Strategy), rows)
+        await db.commit()
+        await versioning.abump_version(user_id, versioning.STRATEGIES)
+    return [row["id"] for row in rows]
+
+async def bulk_update_strategies(db: AsyncSession, items: List[schemas.StrategyUpdateItem], user_id: uuid.UUID):
+    """Update by primary key; callers must pass owned strategies only"""
+    if items:
+        await db.execute(update(models.Strategy), [
+            dict(item.dict(), trigger_state=ARMED, triggered_at=None) for item in items
+        ])
+        await db.commit()
+        await trigger_store.aforget([item.id for item in items])
+        await versioning.abump_version(user_id, versioning.STRATEGIES)
+
+async def bulk_toggle_strategies(db: AsyncSession, strategy_ids, user_id: uuid.UUID, is_active: Optional[bool] = None):
+    if is_active is not None and strategy_ids:
+        # Only strategies whose flag changes start over armed; the rest are left alone
+        result = await db.execute(
+            select(models.Strategy.id).where(
+                models.Strategy.id.in_(list(strategy_ids)),
+                models.Strategy.is_active != is_active
+            )
+        )
+        strategy_ids = result.scalars().all()
+    if strategy_ids:
+        value = not_(models.Strategy.is_active) if is_active is None else is_active
+        await db.execute(
+            update(models.Strategy)
+            .where(models.Strategy.id.in_(list(strategy_ids)))
+            .values(is_active=value, trigger_state=ARMED, triggered_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        await trigger_store.aforget(strategy_ids)
+        await versioning.abump_version(user_id, versioning.STRATEGIES)
+
+async def bulk_delete_strategies(db: AsyncSession, strategy_ids, user_id: uuid.UUID):
+    if strategy_ids:
+        await db.execute(
+            delete(models.Strategy)
+            .where(models.Strategy.id.in_(list(strategy_ids)))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        await trigger_store.aforget(strategy_ids)
+        await versioning.abump_version(user_id, versioning.STRATEGIES)
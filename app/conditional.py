@@ -0,0 +1,61 @@
+import os
+import hashlib
+from typing import Awaitable, Callable, Optional, Tuple
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from app import profiling
+from app.cache import TTLCache
+from app.pagination import next_cursor
+from app.services import versioning
+
+# Serialized listing pages keyed by ETag; the version in the ETag makes
+# entries unreachable as soon as the user's data changes.
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "10"))
+response_cache = TTLCache(maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "5000")), ttl=RESPONSE_CACHE_TTL)
+
+def make_etag(user_id, kind: str, version: int, *params) -> str:
+    digest = hashlib.blake2s(repr((str(user_id),) + params).encode(), digest_size=8).hexdigest()
+    return f'W/"{kind}-{version}-{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {t.strip() for t in header.split(",")}
+    return "*" in tags or etag in tags or etag[2:] in tags
+
+async def conditional_listing(
+    request: Request,
+    user_id,
+    kind: str,
+    params: tuple,
+    limit: int,
+    load: Callable[[], Awaitable[list]],
+    adapter: TypeAdapter,
+) -> Response:
+    """Serve a paginated listing with ETag / If-None-Match support.
+
+    A matching If-None-Match is answered with 304 before any query runs;
+    otherwise the serialized page may come from the short-TTL cache. When
+    the version store is unreachable the page is built fresh, without ETag.
+    """
+    version = await versioning.get_version(user_id, kind)
+    headers = {"Cache-Control": "private, no-cache"}
+    etag = None
+    if version is not None:
+        etag = headers["ETag"] = make_etag(user_id, kind, version, *params)
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+
+    use_cache = etag is not None and RESPONSE_CACHE_TTL > 0
+    cached: Optional[Tuple[bytes, Optional[str]]] = response_cache.get(etag) if use_cache else None
+    if cached is None:
+        rows = await load()
+        with profiling.timer("serialize"):
+            cached = (adapter.dump_json(adapter.validate_python(rows, from_attributes=True)), next_cursor(rows, limit))
+        if use_cache:
+            response_cache.set(etag, cached)
+    body, cursor = cached
+    if cursor:
+        headers["X-Next-Cursor"] = cursor
+    return Response(content=body, media_type="application/json", headers=headers)
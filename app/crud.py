@@ -1,15 +1,17 @@
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
+from typing import Optional
 import uuid
-from app import models, schemas
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app import models, schemas, security
+from app.pagination import decode_cursor
+from app.services import alert_storage, principals, versioning
+from app.services.trigger_state import ARMED, trigger_store
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
 def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = security.hash_password(user.password)
     db_user = models.User(
         email=user.email, 
         hashed_password=hashed_password,
@@ -21,12 +23,31 @@ def create_user(db: Session, user: schemas.UserCreate):
     return db_user
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return security.verify_password(plain_password, hashed_password)[0]
+
+def authenticate_user(db: Session, email: str, password: str):
+    """Return the user when the password matches, upgrading its hash if the cost changed"""
+    db_user = get_user_by_email(db, email)
+    if not db_user:
+        return None
+    valid, new_hash = security.verify_password(password, db_user.hashed_password)
+    if not valid:
+        return None
+    if new_hash:
+        db_user.hashed_password = new_hash
+        db.commit()
+        db.refresh(db_user)
+    return db_user
 
-def get_strategies_by_user(db: Session, user_id: uuid.UUID, skip: int = 0, limit: int = 100):
-    return db.query(models.Strategy).filter(
-        models.Strategy.user_id == user_id
-    ).offset(skip).limit(limit).all()
+def get_strategies_by_user(db: Session, user_id: uuid.UUID, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    query = db.query(models.Strategy).filter(models.Strategy.user_id == user_id)
+    if cursor:
+        created_at, strategy_id = decode_cursor(cursor)
+        query = query.filter(tuple_(models.Strategy.created_at, models.Strategy.id) < (created_at, strategy_id))
+    query = query.order_by(models.Strategy.created_at.desc(), models.Strategy.id.desc())
+    if not cursor:
+        query = query.offset(skip)
+    return query.limit(limit).all()
 
 def get_strategy_by_id(db: Session, strategy_id: uuid.UUID):
     return db.query(models.Strategy).filter(models.Strategy.id == strategy_id).first()
@@ -40,13 +61,18 @@ def create_user_strategy(db: Session, strategy: schemas.StrategyCreate, user_id:
     db.add(db_strategy)
     db.commit()
     db.refresh(db_strategy)
+    versioning.bump_version(user_id, versioning.STRATEGIES)
     return db_strategy
 
 def update_strategy(db: Session, db_strategy: models.Strategy, strategy_update: schemas.StrategyCreate):
     for field, value in strategy_update.dict().items():
         setattr(db_strategy, field, value)
+    # An edited strategy starts over armed
+    db_strategy.trigger_state, db_strategy.triggered_at = ARMED, None
     db.commit()
     db.refresh(db_strategy)
+    trigger_store.forget([db_strategy.id])
+    versioning.bump_version(db_strategy.user_id, versioning.STRATEGIES)
     return db_strategy
 
 def delete_strategy(db: Session, strategy_id: uuid.UUID):
@@ -54,14 +80,20 @@ def delete_strategy(db: Session, strategy_id: uuid.UUID):
     if db_strategy:
         db.delete(db_strategy)
         db.commit()
+        trigger_store.forget([strategy_id])
+        versioning.bump_version(db_strategy.user_id, versioning.STRATEGIES)
     return db_strategy
 
 def toggle_strategy(db: Session, strategy_id: uuid.UUID):
     db_strategy = db.query(models.Strategy).filter(models.Strategy.id == strategy_id).first()
     if db_strategy:
         db_strategy.is_active = not db_strategy.is_active
+        # A re-activated strategy starts over armed, like an edited one
+        db_strategy.trigger_state, db_strategy.triggered_at = ARMED, None
         db.commit()
         db.refresh(db_strategy)
+        trigger_store.forget([strategy_id])
+        versioning.bump_version(db_strategy.user_id, versioning.STRATEGIES)
     return db_strategy
 
 def create_alert(db: Session, message: str, trigger_value: float, strategy_id: uuid.UUID, user_id: uuid.UUID):
@@ -75,12 +107,21 @@ def create_alert(db: Session, message: str, trigger_value: float, strategy_id: u
     db.add(db_alert)
     db.commit()
     db.refresh(db_alert)
+    versioning.bump_version(user_id, versioning.ALERTS)
     return db_alert
 
-def get_alerts_by_user(db: Session, user_id: uuid.UUID, skip: int = 0, limit: int = 100):
-    return db.query(models.Alert).filter(
-        models.Alert.user_id == user_id
-    ).order_by(models.Alert.created_at.desc()).offset(skip).limit(limit).all()
+def get_alerts_by_user(db: Session, user_id: uuid.UUID, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    query = db.query(models.Alert).filter(models.Alert.user_id == user_id)
+    cutoff = alert_storage.retention_cutoff()
+    if cutoff is not None:
+        query = query.filter(models.Alert.created_at >= cutoff)
+    if cursor:
+        created_at, alert_id = decode_cursor(cursor)
+        query = query.filter(tuple_(models.Alert.created_at, models.Alert.id) < (created_at, alert_id))
+    query = query.order_by(models.Alert.created_at.desc(), models.Alert.id.desc())
+    if not cursor:
+        query = query.offset(skip)
+    return query.limit(limit).all()
 
 def update_user_telegram_chat_id(db: Session, user_id: uuid.UUID, chat_id: str):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
@@ -88,4 +129,14 @@ def update_user_telegram_chat_id(db: Session, user_id: uuid.UUID, chat_id: str):
         db_user.telegram_chat_id = chat_id
         db.commit()
         db.refresh(db_user)
-    return db_user
\ No newline at end of file
+        principals.invalidate(db_user.id)
+    return db_user
+
+def set_user_active(db: Session, user_id: uuid.UUID, is_active: bool):
+    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    if db_user:
+        db_user.is_active = is_active
+        db.commit()
+        db.refresh(db_user)
+        principals.invalidate(db_user.id)
+    return db_user
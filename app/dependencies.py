@@ -1,10 +1,12 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from app import crud, models
-from app.database import get_db
+from app import async_crud, schemas
+from app.cache import principal_cache
+from app.database import AsyncSessionLocal
+from app.pagination import decode_cursor
+from typing import Optional
 import os
+import uuid
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,26 +16,55 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 SECRET_KEY = os.getenv("JWT_SECRET", "your-secret-key")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+def get_user_id_from_token(token: str) -> Optional[str]:
+    """Return the user id carried by a valid JWT, or None"""
+    # jose (and the crypto backends it probes) is imported on first use, not at worker start
+    from jose import JWTError, jwt
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+async def load_principal(user_id: uuid.UUID) -> Optional[schemas.User]:
+    """User snapshot for authentication, served from the principal cache when possible"""
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+    async with AsyncSessionLocal() as db:
+        user = await async_crud.get_user_by_id(db, user_id)
+        if user is None:
+            return None
+        principal = schemas.User.model_validate(user)
+    principal_cache.set(user_id, principal)
+    return principal
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+        user_id = uuid.UUID(get_user_id_from_token(token) or "")
+    except ValueError:
         raise credentials_exception
-        
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+
+    user = await load_principal(user_id)
     if user is None:
         raise credentials_exception
     return user
 
-def get_current_active_user(current_user: models.User = Depends(get_current_user)):
+async def get_current_active_user(current_user: schemas.User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+def valid_cursor(cursor: Optional[str] = None) -> Optional[str]:
+    """?cursor= of a listing, rejected with 400 before any query when malformed"""
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return cursor
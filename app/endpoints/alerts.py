@@ -0,0 +1,105 @@
+from fastapi import APIRouter, Depends, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import asyncio
+import json
+import uuid
+from app import async_crud, schemas, dependencies
+from app.conditional import conditional_listing
+from app.database import get_async_db
+from app.profiling import ProfiledRoute
+from app.services import versioning
+from app.services.alert_bus import hub
+
+router = APIRouter(prefix="/alerts", tags=["alerts"], route_class=ProfiledRoute)
+
+SSE_KEEPALIVE_SEC = 15
+
+_alert_list = TypeAdapter(List[schemas.Alert])
+
+@router.get("/", response_model=List[schemas.Alert])
+async def read_alerts(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Depends(dependencies.valid_cursor),
+    current_user: schemas.User = Depends(dependencies.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Newest first. Pass the X-Next-Cursor header of a page as ?cursor= to get the next one.
+    Supports If-None-Match with the returned ETag."""
+    return await conditional_listing(
+        request, current_user.id, versioning.ALERTS, (skip, limit, cursor), limit,
+        lambda: async_crud.get_alerts_by_user(db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor),
+        _alert_list,
+    )
+
+@router.get("/stats", response_model=List[schemas.AlertDailyStat])
+async def read_alert_stats(
+    days: int = Query(30, ge=1, le=366),
+    current_user: schemas.User = Depends(dependencies.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Daily alert counts per strategy from the precomputed rollups (refreshed periodically)"""
+    return await async_crud.get_alert_stats(db, user_id=current_user.id, days=days)
+
+@router.get("/stream")
+async def stream_alerts(
+    request: Request,
+    current_user: schemas.User = Depends(dependencies.get_current_active_user)
+):
+    """Server-sent events stream of the user's new alerts"""
+    user_id = str(current_user.id)
+
+    async def events():
+        queue = hub.connect(user_id)
+        try:
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SEC)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: alert\nid: {payload['id']}\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            hub.disconnect(user_id, queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+async def _active_user_id(token: str):
+    try:
+        user_id = uuid.UUID(dependencies.get_user_id_from_token(token) or "")
+    except ValueError:
+        return None
+    user = await dependencies.load_principal(user_id)
+    return str(user.id) if user and user.is_active else None
+
+@router.websocket("/ws")
+async def alerts_websocket(websocket: WebSocket, token: str = Query(...)):
+    """WebSocket stream of the user's new alerts; authenticate with ?token=<JWT>"""
+    user_id = await _active_user_id(token)
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    queue = hub.connect(user_id)
+    receiver = asyncio.create_task(websocket.receive_text())
+    try:
+        while True:
+            getter = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                await websocket.send_json(getter.result())
+            else:
+                getter.cancel()
+            if receiver in done:
+                # Clients only listen; incoming frames are ignored, a disconnect ends the loop
+                receiver.result()
+                receiver = asyncio.create_task(websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        hub.disconnect(user_id, queue)
@@ -1,40 +1,58 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from datetime import timedelta
-from jose import jwt
-from app import crud, schemas, dependencies
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta
+from typing import Optional
+from app import async_crud, schemas, dependencies
+from app.database import get_async_db
+from app.profiling import ProfiledRoute
+from app.security import HashingBusy
 import os
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=ProfiledRoute)
 
 SECRET_KEY = os.getenv("JWT_SECRET", "your-secret-key")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
-def create_access_token(data: dict):
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
+    if expires_delta:
+        to_encode["exp"] = datetime.utcnow() + expires_delta
+    from jose import jwt  # deferred: not needed until the first login
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def _hashing_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, try again shortly",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/signup", response_model=schemas.User)
-def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def signup(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await async_crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=400, 
             detail="Email already registered"
         )
-    return crud.create_user(db=db, user=user)
+    try:
+        return await async_crud.create_user(db=db, user=user)
+    except HashingBusy:
+        raise _hashing_busy()
 
 @router.post("/login", response_model=schemas.Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not crud.verify_password(form_data.password, user.hashed_password):
+    try:
+        user = await async_crud.authenticate_user(db, email=form_data.username, password=form_data.password)
+    except HashingBusy:
+        raise _hashing_busy()
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -50,14 +68,23 @@ def login(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=schemas.User)
-def read_users_me(current_user: schemas.User = Depends(dependencies.get_current_active_user)):
+async def read_users_me(current_user: schemas.User = Depends(dependencies.get_current_active_user)):
     return current_user
 
 @router.post("/telegram")
-def set_telegram_chat_id(
+async def set_telegram_chat_id(
     telegram_data: schemas.TelegramChatID,
     current_user: schemas.User = Depends(dependencies.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = crud.update_user_telegram_chat_id(db, current_user.id, telegram_data.chat_id)
+    user = await async_crud.update_user_telegram_chat_id(db, current_user.id, telegram_data.chat_id)
     return {"message": "Telegram chat ID updated successfully"}
+
+@router.post("/deactivate")
+async def deactivate_account(
+    current_user: schemas.User = Depends(dependencies.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Deactivate the current account; its tokens are refused by every API worker from now on"""
+    await async_crud.set_user_active(db, current_user.id, False)
+    return {"message": "Account deactivated"}
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Header, HTTPException
+from typing import Optional
+import os
+from app import profiling
+from app.profiling import ProfiledRoute
+from app.workers.sharding import get_shard_stats
+
+router = APIRouter(tags=["metrics"], route_class=ProfiledRoute)
+
+# When set, /metrics requires it in X-Metrics-Token
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+@router.get("/metrics")
+def read_metrics(x_metrics_token: Optional[str] = Header(None)):
+    """Per-route SQL/latency profile of this process, latest checker shard ticks and exchange client metrics"""
+    if METRICS_TOKEN and x_metrics_token != METRICS_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid metrics token")
+    # Exchange clients (and aiohttp) are only loaded in processes that use them
+    from app.exchanges.base import metrics as exchange_metrics
+    return {
+        "profile_mode": profiling.PROFILE_MODE,
+        "routes": profiling.route_stats.snapshot(),
+        # Ticks run in the Celery workers; each shard's latest stats (with its
+        # profile summary) are shared through Redis
+        "checker": {"shards": get_shard_stats()},
+        "exchanges": exchange_metrics.snapshot(),
+    }
@@ -0,0 +1,165 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
+import os
+import uuid
+from app import async_crud, schemas, dependencies
+from app.conditional import conditional_listing
+from app.database import get_async_db
+from app.profiling import ProfiledRoute
+from app.services import versioning
+
+router = APIRouter(prefix="/strategies", tags=["strategies"], route_class=ProfiledRoute)
+
+BULK_MAX_ITEMS = int(os.getenv("STRATEGY_BULK_MAX_ITEMS", "5000"))
+
+_strategy_list = TypeAdapter(List[schemas.Strategy])
+
+async def _get_owned_strategy(db: AsyncSession, strategy_id: uuid.UUID, user_id: uuid.UUID):
+    strategy = await async_crud.get_strategy_by_id(db, strategy_id=strategy_id)
+    if not strategy or strategy.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Strategy not found")
+    return strategy
+
+@router.get("/", response_model=List[schemas.Strategy])
+async def read_strategies(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Depends(dependencies.valid_cursor),
+    current_user: schemas.User = Depends(dependencies.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Newest first. Pass the X-Next-Cursor header of a page as ?cursor= to get the next one.
+    Supports If-None-Match with the returned ETag."""
+    return await conditional_listing(
+        request, current_user.id, versioning.STRATEGIES, (skip, limit, cursor), limit,
+        lambda: async_crud.get_strategies_by_user(db, user_id=current_user.id, skip=skip, limit=limit, cursor=cursor),
+        _strategy_list,
+    )
+
+@router.post("/", response_model=schemas.Strategy)
+async def create_strategy(
+    strategy: schemas.StrategyCreate,
+    current_user: schemas.User = Depends(dependencies.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await async_crud.create_user_strategy(db=db, strategy=strategy, user_id=current_user.id)
+
+def _item_id(item: Dict[str, Any]) -> Optional[uuid.UUID]:
+    """The item's id when it is a valid UUID, for reporting alongside a validation error"""
+    try:
+        return uuid.UUID(str(item.get("id")))
+    except ValueError:
+        return None
+
+def _validate_items(items: List[Dict[str, Any]], schema):
+    """Validate each item on its own so one bad row doesn't reject the batch"""
+    valid, results = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as e:
+            results.append(schemas.BulkItemResult(index=index, id=_item_id(item), status="invalid", detail=str(e)))
+    return valid, results
+
+def _check_batch_size(items):
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} items per request")
+
+@router.post("/bulk", response_model=schemas.BulkResult)
+async def bulk_create_strategies(
+    items: List[Dict[str, Any]],
+    current_user: schemas.User = Depends(dependencies.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    _check_batch_size(items)
+    valid, results = _validate_items(items, schemas.StrategyCreate)
+    ids = await async_crud.bulk_create_strategies(db, [s for _, s in valid], user_id=current_user.id)
+    results += [schemas.BulkItemResult(index=index, id=strategy_id, status="created") for (index, _), strategy_id in zip(valid, ids)]
+    return {"results": sorted(results, key=lambda r: r.index)}
+
+@router.put("/bulk", response_model=schemas.BulkResult)
+async def bulk_update_strategies(
+    items: List[Dict[str, Any]],
+    current_user: schemas.User = Depends(dependencies.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    _check_batch_size(items)
+    valid, results = _validate_items(items, schemas.StrategyUpdateItem)
+    owned = await async_crud.get_owned_strategy_ids(db, current_user.id, {s.id for _, s in valid})
+    updates = []
+    for index, item in valid:
+        if item.id in owned:
+            updates.append(item)
+            results.append(schemas.BulkItemResult(index=index, id=item.id, status="updated"))
+        else:
+            results.append(schemas.BulkItemResult(index=index, id=item.id, status="not_found"))
+    await async_crud.bulk_update_strategies(db, updates, user_id=current_user.id)
+    return {"results": sorted(results, key=lambda r: r.index)}
+
+def _id_results(ids: List[uuid.UUID], owned, status: str):
+    return [
+        schemas.BulkItemResult(index=index, id=strategy_id, status=status if strategy_id in owned else "not_found")
+        for index, strategy_id in enumerate(ids)
+    ]
+
+@router.post("/bulk/toggle", response_model=schemas.BulkResult)
+async def bulk_toggle_strategies(
+    body: schemas.StrategyBulkToggle,
+    current_user: schemas.User = Depends(dependencies.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    _check_batch_size(body.ids)
+    owned = await async_crud.get_owned_strategy_ids(db, current_user.id, body.ids)
+    await async_crud.bulk_toggle_strategies(db, owned, user_id=current_user.id, is_active=body.is_active)
+    return {"results": _id_results(body.ids, owned, "toggled")}
+
+@router.post("/bulk/delete", response_model=schemas.BulkResult)
+async def bulk_delete_strategies(
+    body: schemas.StrategyIds,
+    current_user: schemas.User = Depends(dependencies.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    _check_batch_size(body.ids)
+    owned = await async_crud.get_owned_strategy_ids(db, current_user.id, body.ids)
+    await async_crud.bulk_delete_strategies(db, owned, user_id=current_user.id)
+    return {"results": _id_results(body.ids, owned, "deleted")}
+
+@router.get("/{strategy_id}", response_model=schemas.Strategy)
+async def read_strategy(
+    strategy_id: uuid.UUID,
+    current_user: schemas.User = Depends(dependencies.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await _get_owned_strategy(db, strategy_id, current_user.id)
+
+@router.put("/{strategy_id}", response_model=schemas.Strategy)
+async def update_strategy(
+    strategy_id: uuid.UUID,
+    strategy: schemas.StrategyCreate,
+    current_user: schemas.User = Depends(dependencies.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    db_strategy = await _get_owned_strategy(db, strategy_id, current_user.id)
+    return await async_crud.update_strategy(db=db, db_strategy=db_strategy, strategy_update=strategy)
+
+@router.delete("/{strategy_id}")
+async def delete_strategy(
+    strategy_id: uuid.UUID,
+    current_user: schemas.User = Depends(dependencies.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    db_strategy = await _get_owned_strategy(db, strategy_id, current_user.id)
+    await async_crud.delete_strategy(db, db_strategy)
+    return {"message": "Strategy deleted successfully"}
+
+@router.post("/{strategy_id}/toggle", response_model=schemas.Strategy)
+async def toggle_strategy(
+    strategy_id: uuid.UUID,
+    current_user: schemas.User = Depends(dependencies.get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    db_strategy = await _get_owned_strategy(db, strategy_id, current_user.id)
+    return await async_crud.toggle_strategy(db, db_strategy)
@@ -0,0 +1,183 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Optional
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+EXCHANGE_TIMEOUT_SEC = float(os.getenv("EXCHANGE_TIMEOUT_SEC", "10"))
+EXCHANGE_MAX_RETRIES = int(os.getenv("EXCHANGE_MAX_RETRIES", "4"))
+EXCHANGE_BACKOFF_BASE = float(os.getenv("EXCHANGE_BACKOFF_BASE", "0.25"))
+EXCHANGE_BACKOFF_MAX = float(os.getenv("EXCHANGE_BACKOFF_MAX", "10"))
+EXCHANGE_POOL_SIZE = int(os.getenv("EXCHANGE_POOL_SIZE", "50"))
+# Fraction of each venue's published limit we allow ourselves to use
+EXCHANGE_BUDGET_HEADROOM = float(os.getenv("EXCHANGE_BUDGET_HEADROOM", "0.9"))
+
+class ExchangeError(Exception):
+    def __init__(self, venue: str, message: str, status: Optional[int] = None):
+        super().__init__(f"{venue}: {message}")
+        self.venue = venue
+        self.status = status
+
+class RateLimited(ExchangeError):
+    pass
+
+class WeightBudget:
+    """Rolling request-weight budget for one venue.
+
+    Capacity refills continuously over the window, so bursts up to the
+    limit are allowed and sustained load settles at limit/window. A 429 or
+    ban response pauses the whole venue until its Retry-After passes.
+    """
+
+    def __init__(self, limit: int, window_sec: float, headroom: float = EXCHANGE_BUDGET_HEADROOM):
+        self.capacity = max(1.0, limit * headroom)
+        self.window_sec = window_sec
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.capacity / self.window_sec)
+        self._updated = now
+
+    async def acquire(self, weight: float = 1):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= weight:
+                    self._tokens -= weight
+                    return
+                await asyncio.sleep((weight - self._tokens) * self.window_sec / self.capacity)
+
+    def observe_used(self, used: float, limit: float):
+        """Align with the server's own count of used weight (never loosens the budget)"""
+        self._refill(time.monotonic())
+        self._tokens = min(self._tokens, self.capacity - used * self.capacity / limit)
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+class RequestMetrics:
+    """Counters and latency per (venue, endpoint, outcome), shared by all clients in the process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)
+        self._latency = defaultdict(lambda: [0, 0.0, 0.0])
+
+    def record(self, venue: str, endpoint: str, outcome: str, elapsed: float):
+        with self._lock:
+            self._counts[(venue, endpoint, outcome)] += 1
+            stat = self._latency[(venue, endpoint)]
+            stat[0] += 1
+            stat[1] += elapsed
+            stat[2] = max(stat[2], elapsed)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = {f"{v}:{e}:{o}": n for (v, e, o), n in self._counts.items()}
+            latency = {
+                f"{v}:{e}": {"count": n, "avg_ms": round(total / n * 1000, 1), "max_ms": round(peak * 1000, 1)}
+                for (v, e), (n, total, peak) in self._latency.items()
+            }
+        return {"requests": counts, "latency": latency}
+
+metrics = RequestMetrics()
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+    delay = random.uniform(0, min(EXCHANGE_BACKOFF_MAX, EXCHANGE_BACKOFF_BASE * 2 ** attempt))
+    return max(delay, retry_after or 0.0)
+
+class ExchangeClient:
+    """Pooled async HTTP client for one venue with budgets, retries and metrics.
+
+    The aiohttp session is created on first use in the running loop; pass
+    `session` to share an existing one (e.g. the scanner's connector).
+    """
+
+    venue = "exchange"
+    # Statuses that mean "slow down", answered with Retry-After
+    rate_limit_statuses = (429,)
+
+    def __init__(self, base_url: str, budget: WeightBudget, session: Optional[aiohttp.ClientSession] = None,
+                 max_retries: int = EXCHANGE_MAX_RETRIES, timeout: float = EXCHANGE_TIMEOUT_SEC):
+        self.base_url = base_url.rstrip("/")
+        self.budget = budget
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = session
+        self._owns_session = session is None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=EXCHANGE_POOL_SIZE, ttl_dns_cache=300),
+                timeout=self.timeout,
+            )
+            self._owns_session = True
+        return self._session
+
+    async def close(self):
+        if self._owns_session and self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def _observe_headers(self, headers):
+        """Hook for venues that report used weight in response headers"""
+
+    def _check_payload(self, data):
+        """Hook for venues that signal errors inside a 200 response; return a Retry-After to retry"""
+        return None
+
+    async def request(self, path: str, params: Optional[dict] = None, weight: float = 1, method: str = "GET"):
+        session = self._get_session()
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            await self.budget.acquire(weight)
+            started = time.monotonic()
+            retry_after = None
+            try:
+                async with session.request(method, url, params=params, timeout=self.timeout) as resp:
+                    self._observe_headers(resp.headers)
+                    if resp.status in self.rate_limit_statuses:
+                        retry_after = float(resp.headers.get("Retry-After") or 1)
+                        self.budget.pause(retry_after)
+                        outcome, error = "rate_limited", RateLimited(self.venue, f"HTTP {resp.status} on {path}", resp.status)
+                    elif resp.status >= 500:
+                        outcome, error = "server_error", ExchangeError(self.venue, f"HTTP {resp.status} on {path}", resp.status)
+                    elif resp.status >= 400:
+                        body = (await resp.text())[:200]
+                        metrics.record(self.venue, path, "client_error", time.monotonic() - started)
+                        raise ExchangeError(self.venue, f"HTTP {resp.status} on {path}: {body}", resp.status)
+                    else:
+                        data = await resp.json(content_type=None)
+                        try:
+                            retry_after = self._check_payload(data)
+                        except ExchangeError:
+                            metrics.record(self.venue, path, "client_error", time.monotonic() - started)
+                            raise
+                        if retry_after is None:
+                            metrics.record(self.venue, path, "ok", time.monotonic() - started)
+                            return data
+                        self.budget.pause(retry_after)
+                        outcome, error = "rate_limited", RateLimited(self.venue, f"rate limited on {path}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                outcome, error = "network_error", ExchangeError(self.venue, f"{type(e).__name__} on {path}: {e}")
+            metrics.record(self.venue, path, outcome, time.monotonic() - started)
+            if attempt == self.max_retries:
+                raise error
+            delay = backoff_delay(attempt, retry_after)
+            logger.warning(f"{error}, retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
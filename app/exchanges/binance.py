@@ -0,0 +1,48 @@
+import os
+import time
+from typing import List, Optional
+from app.exchanges.base import ExchangeClient, WeightBudget
+
+BINANCE_BASE_URL = os.getenv("BINANCE_BASE_URL", "https://api.binance.com")
+# Spot REQUEST_WEIGHT limit per minute per IP
+BINANCE_WEIGHT_PER_MIN = int(os.getenv("BINANCE_WEIGHT_PER_MIN", "6000"))
+
+class BinanceClient(ExchangeClient):
+    venue = "binance"
+    # 418 is an IP ban after ignoring 429s; both carry Retry-After
+    rate_limit_statuses = (418, 429)
+
+    def __init__(self, session=None, base_url: str = BINANCE_BASE_URL, **kwargs):
+        super().__init__(base_url, WeightBudget(BINANCE_WEIGHT_PER_MIN, 60), session=session, **kwargs)
+
+    def _observe_headers(self, headers):
+        used = headers.get("X-MBX-USED-WEIGHT-1M")
+        if used:
+            self.budget.observe_used(float(used), BINANCE_WEIGHT_PER_MIN)
+
+    async def get_price(self, symbol: str) -> float:
+        data = await self.request("/api/v3/ticker/price", {"symbol": symbol.upper()}, weight=2)
+        return float(data["price"])
+
+    async def get_klines(self, symbol: str, interval: str, limit: int = 200) -> List[dict]:
+        """Closed klines, oldest first; the still-forming last bar is dropped"""
+        rows = await self.request("/api/v3/klines", {
+            "symbol": symbol.upper(), "interval": interval, "limit": min(1000, limit + 1)
+        }, weight=2)
+        now_ms = time.time() * 1000
+        return [
+            {"ts": int(r[0]), "open": float(r[1]), "high": float(r[2]), "low": float(r[3]),
+             "close": float(r[4]), "volume": float(r[5]), "close_ts": int(r[6])}
+            for r in rows if int(r[6]) < now_ms
+        ][-limit:]
+
+_client: Optional[BinanceClient] = None
+_client_pid: Optional[int] = None
+
+def get_client() -> BinanceClient:
+    """Process-wide client; use it from one event loop (app.services.loop_thread for sync callers)"""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        _client = BinanceClient()
+        _client_pid = os.getpid()
+    return _client
@@ -0,0 +1,59 @@
+import os
+from typing import List, Optional, Set, Tuple
+from app.exchanges.base import ExchangeClient, ExchangeError, WeightBudget
+
+BYBIT_BASE_URL = os.getenv("BYBIT_BASE_URL", "https://api.bybit.com")
+# Public market endpoints: 600 requests per 5 seconds per IP
+BYBIT_REQUESTS_PER_WINDOW = int(os.getenv("BYBIT_REQUESTS_PER_WINDOW", "600"))
+BYBIT_WINDOW_SEC = float(os.getenv("BYBIT_WINDOW_SEC", "5"))
+
+# retCodes Bybit returns with HTTP 200 when throttling
+_RATE_LIMIT_CODES = {10006, 10018}
+
+class BybitClient(ExchangeClient):
+    venue = "bybit"
+    rate_limit_statuses = (403, 429)
+
+    def __init__(self, session=None, base_url: str = BYBIT_BASE_URL, category: str = "linear", **kwargs):
+        super().__init__(base_url, WeightBudget(BYBIT_REQUESTS_PER_WINDOW, BYBIT_WINDOW_SEC), session=session, **kwargs)
+        self.category = category
+
+    def _check_payload(self, data):
+        code = data.get("retCode", 0) if isinstance(data, dict) else 0
+        if code in _RATE_LIMIT_CODES:
+            return 1.0
+        if code != 0:
+            raise ExchangeError(self.venue, f"retCode {code}: {data.get('retMsg')}")
+        return None
+
+    async def get_klines(self, symbol: str, interval: str, limit: int) -> List[dict]:
+        """Klines oldest first, including the still-forming last bar"""
+        data = await self.request("/v5/market/kline", {
+            "category": self.category, "symbol": symbol, "interval": interval, "limit": str(limit)
+        })
+        rows = sorted(data["result"]["list"], key=lambda x: int(x[0]))
+        return [{"ts": int(x[0]), "open": float(x[1]), "high": float(x[2]), "low": float(x[3]),
+                 "close": float(x[4]), "volume": float(x[5])} for x in rows]
+
+    async def get_orderbook_top(self, symbol: str, limit: int = 50) -> Optional[Tuple[float, float]]:
+        """Quantities at the best bid and ask"""
+        data = await self.request("/v5/market/orderbook", {
+            "category": self.category, "symbol": symbol, "limit": str(limit)
+        })
+        ob = data["result"]
+        if not ob.get("b") or not ob.get("a"):
+            return None
+        return float(ob["b"][0][1]), float(ob["a"][0][1])
+
+    async def get_symbols(self) -> Set[str]:
+        """Symbols currently trading in this category"""
+        symbols, cursor = set(), None
+        while True:
+            params = {"category": self.category, "limit": "1000"}
+            if cursor:
+                params["cursor"] = cursor
+            result = (await self.request("/v5/market/instruments-info", params))["result"]
+            symbols.update(i["symbol"] for i in result.get("list", []) if i.get("status") == "Trading")
+            cursor = result.get("nextPageCursor")
+            if not cursor:
+                return symbols
@@ -0,0 +1,31 @@
+import os
+import logging
+import argparse
+from app.database import get_engine
+from app.services import alert_storage
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def init_db(revision: str = "head"):
+    """Apply migrations up to revision and create the upcoming alert partitions.
+
+    Run once per deploy (python -m app.init_db) before starting the API
+    workers; the workers themselves never touch the schema.
+    """
+    from alembic import command
+    from alembic.config import Config
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+    command.upgrade(config, revision)
+    with get_engine().begin() as conn:
+        created = alert_storage.ensure_partitions(conn)
+    logger.info(f"Database at {revision}, {len(created)} alert partitions ensured")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate the database schema")
+    parser.add_argument("revision", nargs="?", default="head")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    init_db(args.revision)
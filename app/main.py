@@ -1,32 +1,59 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.endpoints import auth, strategies, alerts
-from app.database import engine, Base
-import os
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title="AlertBot Manager API",
-    description="API for managing trading alerts",
-    version="1.0.0"
-)
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with specific origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routers
-app.include_router(auth.router)
-app.include_router(strategies.router)
-app.include_router(alerts.router)
-
-@app.get("/")
-def read_root():
-    return {"message": "AlertBot Manager API is running"}
+from app import profiling, security
+from app.endpoints import auth, strategies, alerts, metrics
+from app.database import dispose_engines
+from app.services import principals
+from app.services.alert_bus import hub
+
+# Schema changes belong to `python -m app.init_db` (Alembic), run once per
+# deploy rather than by every worker on boot; the Dockerfile runs it before
+# uvicorn. Without it every request fails with "no such table".
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in each worker after fork, so pools and the hub start per process
+    await hub.start()
+    await principals.listener.start()
+    try:
+        yield
+    finally:
+        await principals.listener.stop()
+        await hub.stop()
+        await dispose_engines()
+        security.shutdown()
+
+def create_app() -> FastAPI:
+    app = FastAPI(
+        title="AlertBot Manager API",
+        description="API for managing trading alerts",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, replace with specific origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
+    )
+    # Per-request SQL count, DB and serialization time when PROFILE_MODE is set
+    profiling.install(app)
+
+    # Include routers
+    app.include_router(auth.router)
+    app.include_router(strategies.router)
+    app.include_router(alerts.router)
+    app.include_router(metrics.router)
+
+    @app.get("/")
+    def read_root():
+        return {"message": "AlertBot Manager API is running"}
+
+    return app
+
+app = create_app()
@@ -1,5 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Float, Integer, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Boolean, Float, Integer, Date, DateTime, ForeignKey, Index, Text, Uuid
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -8,7 +7,7 @@ from app.database import Base
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = Column(String(255), unique=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
     telegram_chat_id = Column(String(255), nullable=True)
@@ -21,31 +20,71 @@ class User(Base):
 class Strategy(Base):
     __tablename__ = "strategies"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id"), nullable=False)
     name = Column(String(255), nullable=False)
     source = Column(String(50), nullable=False)
     symbol = Column(String(50), nullable=False)
     condition_type = Column(String(50), nullable=False)
     condition_value = Column(Float, nullable=False)
+    # Kline interval and lookback for indicator conditions (rsi_*, stoch_*, ...)
+    interval = Column(String(10), nullable=False, default="1h", server_default="1h")
+    indicator_period = Column(Integer, nullable=False, default=14, server_default="14")
+    # Rule for condition_type "expression", e.g. "close > 25000 and rsi(14) < 30"
+    expression = Column(Text, nullable=True)
     check_interval = Column(Integer, default=300)
     is_active = Column(Boolean, default=True)
     notification_type = Column(String(50), default='both')
     created_at = Column(DateTime, default=datetime.utcnow)
     last_checked = Column(DateTime, nullable=True)
+    # Re-arm rules, see app.services.trigger_state
+    trigger_mode = Column(String(10), nullable=False, default="edge", server_default="edge")
+    hysteresis_pct = Column(Float, nullable=False, default=0.0, server_default="0")
+    rearm_after_sec = Column(Integer, nullable=False, default=0, server_default="0")
+    # Durable copy of the checker's armed/fired state, written in batches
+    trigger_state = Column(String(10), nullable=False, default="armed", server_default="armed")
+    triggered_at = Column(DateTime, nullable=True)
     
     user = relationship("User", back_populates="strategies")
     alerts = relationship("Alert", back_populates="strategy")
 
+    __table_args__ = (
+        # Keyset pagination of a user's strategies by (created_at, id)
+        Index("ix_strategies_user_created_id", "user_id", "created_at", "id"),
+    )
+
 class Alert(Base):
     __tablename__ = "alerts"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    strategy_id = Column(UUID(as_uuid=True), ForeignKey("strategies.id"), nullable=False)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    strategy_id = Column(Uuid(as_uuid=True), ForeignKey("strategies.id"), nullable=False)
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id"), nullable=False)
     message = Column(String, nullable=False)
     trigger_value = Column(Float, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # Part of the primary key because Postgres partitions alerts by created_at;
+    # migration 0007 gives other backends the same key
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
     
     strategy = relationship("Strategy", back_populates="alerts")
-    user = relationship("User", back_populates="alerts")
\ No newline at end of file
+    user = relationship("User", back_populates="alerts")
+
+    __table_args__ = (
+        # Keyset pagination of a user's alert feed by (created_at, id)
+        Index("ix_alerts_user_created_id", "user_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+class AlertDailyRollup(Base):
+    __tablename__ = "alert_daily_rollups"
+
+    day = Column(Date, primary_key=True)
+    user_id = Column(Uuid(as_uuid=True), primary_key=True)
+    strategy_id = Column(Uuid(as_uuid=True), primary_key=True)
+    alert_count = Column(Integer, nullable=False)
+    min_trigger = Column(Float, nullable=True)
+    max_trigger = Column(Float, nullable=True)
+    last_alert_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_alert_daily_rollups_user_day", "user_id", "day"),
+    )
@@ -0,0 +1,25 @@
+import base64
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+def encode_cursor(created_at: datetime, row_id: uuid.UUID) -> str:
+    """Opaque keyset cursor pointing just past (created_at, id)"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def next_cursor(rows, limit: int):
+    """Cursor for the page after rows, or None when this is the last page"""
+    if len(rows) < limit or not rows:
+        return None
+    last = rows[-1]
+    return encode_cursor(last.created_at, last.id)
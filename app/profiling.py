@@ -0,0 +1,261 @@
+import os
+import time
+import asyncio
+import functools
+import threading
+import contextvars
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Optional
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# "off": nothing is installed. "basic": per-route counters, per-tick shard stats, a
+# Server-Timing header and logs for slow requests/ticks only; two clock
+# reads per SQL statement, safe to leave on. "full": also logs every
+# request and tick.
+PROFILE_MODE = os.getenv("PROFILE_MODE", "off").lower()
+PROFILE_SLOW_REQUEST_MS = float(os.getenv("PROFILE_SLOW_REQUEST_MS", "500"))
+PROFILE_SLOW_TICK_MS = float(os.getenv("PROFILE_SLOW_TICK_MS", "10000"))
+
+def enabled() -> bool:
+    return PROFILE_MODE in ("basic", "full")
+
+class Profile:
+    """SQL statements and time per kind (db, serialize, fetch, notify, ...) of one request or tick"""
+
+    __slots__ = ("name", "queries", "timings", "started", "endpoint_done")
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.queries = 0
+        self.timings: Dict[str, float] = defaultdict(float)
+        self.started = time.perf_counter()
+        self.endpoint_done: Optional[float] = None
+
+    def add(self, kind: str, seconds: float):
+        self.timings[kind] += seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> dict:
+        out = {"queries": self.queries}
+        out.update({f"{kind}_ms": round(sec * 1000, 1) for kind, sec in self.timings.items()})
+        return out
+
+_current: contextvars.ContextVar[Optional[Profile]] = contextvars.ContextVar("profile", default=None)
+
+def current() -> Optional[Profile]:
+    return _current.get()
+
+@contextmanager
+def profiled(name: str):
+    """Collect a Profile for the enclosed block; yields None when profiling is off"""
+    if not enabled():
+        yield None
+        return
+    profile = Profile(name)
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def timer(kind: str):
+    """Add the enclosed block's time to the current profile, if any"""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(kind, time.perf_counter() - started)
+
+# === SQLAlchemy hooks ===
+# Registered on the Engine class, so they cover the sync engine and the
+# async engine's underlying one; a statement outside any profile costs one
+# ContextVar lookup.
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("profile_starts", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    starts = conn.info.get("profile_starts")
+    if profile is not None and starts:
+        profile.queries += 1
+        profile.add("db", time.perf_counter() - starts.pop())
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("profile_starts") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+_hooks_installed = False
+
+def install_hooks():
+    global _hooks_installed
+    if _hooks_installed or not enabled():
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    _hooks_installed = True
+
+# === Aggregates ===
+
+class RouteStats:
+    """Count, latency, SQL and time per kind for each route, process-wide"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, key: str, elapsed: float, profile: Profile, error: bool = False):
+        with self._lock:
+            stat = self._stats.get(key)
+            if stat is None:
+                stat = self._stats[key] = {"count": 0, "errors": 0, "total": 0.0, "max": 0.0,
+                                           "queries": 0, "timings": defaultdict(float)}
+            stat["count"] += 1
+            stat["errors"] += error
+            stat["total"] += elapsed
+            stat["max"] = max(stat["max"], elapsed)
+            stat["queries"] += profile.queries
+            for kind, sec in profile.timings.items():
+                stat["timings"][kind] += sec
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = {}
+            for key, s in self._stats.items():
+                n = s["count"]
+                row = {"count": n, "errors": s["errors"], "avg_ms": round(s["total"] / n * 1000, 1),
+                       "max_ms": round(s["max"] * 1000, 1), "queries_avg": round(s["queries"] / n, 2)}
+                row.update({f"{kind}_avg_ms": round(sec / n * 1000, 2) for kind, sec in s["timings"].items()})
+                out[key] = row
+        return out
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+route_stats = RouteStats()
+
+def _fields(profile: Profile) -> str:
+    return " ".join(f"{k}={v}" for k, v in profile.summary().items())
+
+def record_tick(name: str, profile: Optional[Profile], **fields):
+    """Log a checker tick (always in full mode, when slow in basic mode)"""
+    if profile is None:
+        return
+    elapsed = profile.elapsed()
+    if PROFILE_MODE == "full" or elapsed * 1000 >= PROFILE_SLOW_TICK_MS:
+        extra = " ".join(f"{k}={v}" for k, v in fields.items())
+        logger.info(f"profile tick={name} ms={elapsed * 1000:.1f} {_fields(profile)} {extra}".rstrip())
+
+# === FastAPI ===
+
+class ProfiledRoute(APIRoute):
+    """Names the profile after the route template and splits off serialization time.
+
+    The endpoint is wrapped to note when it returns; what the handler does
+    after that (response_model validation, JSON rendering) is counted as
+    serialize time.
+    """
+
+    # include_router rebuilds routes from route.endpoint, which is already wrapped
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _mark_endpoint_done(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request):
+            profile = _current.get()
+            if profile is None:
+                return await handler(request)
+            profile.name = f"{request.method} {self.path_format}"
+            response = await handler(request)
+            if profile.endpoint_done is not None:
+                profile.add("serialize", time.perf_counter() - profile.endpoint_done)
+            return response
+        return profiled_handler
+
+def _mark_endpoint_done(endpoint):
+    if not callable(endpoint) or getattr(endpoint, "_marks_endpoint_done", False):
+        return endpoint
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _note_endpoint_done()
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                _note_endpoint_done()
+    wrapper._marks_endpoint_done = True
+    return wrapper
+
+def _note_endpoint_done():
+    profile = _current.get()
+    if profile is not None:
+        profile.endpoint_done = time.perf_counter()
+
+class ProfilingMiddleware:
+    """Profile every HTTP request: Server-Timing header, route aggregates, logs.
+
+    Latency is measured to the response start, so long-lived streams
+    (SSE) count their setup rather than their lifetime.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        profile = Profile(f"{scope['method']} unmatched")
+        token = _current.set(profile)
+        state = {"status": 500, "elapsed": None}
+
+        async def send_profiled(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                state["elapsed"] = profile.elapsed()
+                timing = ", ".join(
+                    [f"app;dur={state['elapsed'] * 1000:.1f}", f'db;dur={profile.timings.get("db", 0.0) * 1000:.1f};desc="{profile.queries} queries"']
+                    + [f"{kind};dur={sec * 1000:.1f}" for kind, sec in profile.timings.items() if kind != "db"]
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+            await send(message)
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            _current.reset(token)
+            elapsed = state["elapsed"] if state["elapsed"] is not None else profile.elapsed()
+            route_stats.record(profile.name, elapsed, profile, error=state["status"] >= 500)
+            if PROFILE_MODE == "full" or elapsed * 1000 >= PROFILE_SLOW_REQUEST_MS:
+                logger.info(f"profile route=\"{profile.name}\" status={state['status']} "
+                            f"ms={elapsed * 1000:.1f} {_fields(profile)}")
+
+def install(app):
+    """Add the middleware and SQL hooks when PROFILE_MODE is basic or full"""
+    if not enabled():
+        return
+    install_hooks()
+    app.add_middleware(ProfilingMiddleware)
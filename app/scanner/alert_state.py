@@ -0,0 +1,56 @@
+import os
+from typing import Dict, Optional, Tuple
+
+# Scanner signals are keyed (symbol, tf, signal). With edge triggering a
+# signal only fires on the bar it becomes active, not on every bar it stays
+# active; the cooldown additionally spaces out firings of the same key.
+ALERT_EDGE_TRIGGER = os.getenv("ALERT_EDGE_TRIGGER", "true").lower() in ("1", "true", "yes")
+ALERT_COOLDOWN_SEC = float(os.getenv("ALERT_COOLDOWN_SEC", "0"))
+# Per-signal overrides, matched by prefix: "rsi_touches=3600,orderbook=600"
+ALERT_COOLDOWNS = os.getenv("ALERT_COOLDOWNS", "")
+
+def parse_cooldowns(spec: str) -> Dict[str, float]:
+    rules = {}
+    for item in spec.split(","):
+        if "=" in item:
+            prefix, seconds = item.split("=", 1)
+            rules[prefix.strip()] = float(seconds)
+    return rules
+
+class AlertState:
+    """Remembers which signals were active on the previous bar and when each last fired"""
+
+    def __init__(self, edge: bool = ALERT_EDGE_TRIGGER, cooldown_sec: float = ALERT_COOLDOWN_SEC,
+                 cooldowns: Optional[Dict[str, float]] = None):
+        self.edge = edge
+        self.cooldown_sec = cooldown_sec
+        self.cooldowns = parse_cooldowns(ALERT_COOLDOWNS) if cooldowns is None else cooldowns
+        self._active: Dict[Tuple[str, str], set] = {}
+        self._fired: Dict[Tuple[str, str, str], float] = {}
+
+    def cooldown_for(self, signal: str) -> float:
+        for prefix, seconds in self.cooldowns.items():
+            if signal.startswith(prefix):
+                return seconds
+        return self.cooldown_sec
+
+    def update(self, symbol: str, tf: str, active: Dict[str, str], now: float) -> Dict[str, str]:
+        """Record the signals active on this bar (signal -> text) and return those that should fire"""
+        previous = self._active.get((symbol, tf), set())
+        self._active[(symbol, tf)] = set(active)
+        fired = {}
+        for signal, text in active.items():
+            if self.edge and signal in previous:
+                continue
+            last = self._fired.get((symbol, tf, signal))
+            if last is not None and now - last < self.cooldown_for(signal):
+                continue
+            self._fired[(symbol, tf, signal)] = now
+            fired[signal] = text
+        return fired
+
+    def forget(self, symbol: str, tf: str):
+        """Drop state of a stream that is no longer scanned"""
+        self._active.pop((symbol, tf), None)
+        for key in [k for k in self._fired if k[0] == symbol and k[1] == tf]:
+            del self._fired[key]
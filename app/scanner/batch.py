@@ -0,0 +1,211 @@
+import os
+import time
+import asyncio
+import logging
+from collections import defaultdict, deque
+from typing import Dict, Hashable, List, NamedTuple, Tuple
+import numpy as np
+from app.scanner.schedule import SCANNER_ARRIVAL_SKEW_SEC
+
+logger = logging.getLogger(__name__)
+
+# Longest a close waits for the streams that have not reported it yet; a batch
+# whose tracked streams have all reported is evaluated at once
+INDICATOR_BATCH_WINDOW_SEC = float(os.getenv("INDICATOR_BATCH_WINDOW_SEC", str(SCANNER_ARRIVAL_SKEW_SEC)))
+INDICATOR_BATCH_MAX = int(os.getenv("INDICATOR_BATCH_MAX", "4096"))
+
+class Indicators(NamedTuple):
+    rsi: float
+    rsi_low: bool
+    rsi_high: bool
+    rsi_touches: bool
+    stoch_touches: bool
+
+# Same recurrences as app.services.indicators, one row per stream. Sums run
+# in the same order as the scalar code so thresholds flip on the same bars.
+
+def rsi_matrix(close: np.ndarray, period: int) -> np.ndarray:
+    n, t = close.shape
+    out = np.full((n, t), np.nan)
+    if t < period + 1:
+        return out
+    ch = np.diff(close, axis=1)
+    gains, losses = np.maximum(ch, 0.0), np.maximum(-ch, 0.0)
+    ag, al = np.zeros(n), np.zeros(n)
+    for i in range(period):
+        ag += gains[:, i]; al += losses[:, i]
+    ag /= period; al /= period
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[:, period] = np.where(al == 0, 100.0, 100.0 - 100.0 / (1.0 + ag / al))
+        for i in range(period + 1, t):
+            ag = (ag * (period - 1) + gains[:, i - 1]) / period
+            al = (al * (period - 1) + losses[:, i - 1]) / period
+            out[:, i] = np.where(al == 0, 100.0, 100.0 - 100.0 / (1.0 + ag / al))
+    return out
+
+def stoch_k_matrix(high: np.ndarray, low: np.ndarray, close: np.ndarray, k: int, smooth: int) -> np.ndarray:
+    n, t = close.shape
+    out = np.full((n, t), np.nan)
+    if t < k + smooth - 1:
+        return out
+    hh, ll = high[:, k - 1:].copy(), low[:, k - 1:].copy()
+    for j in range(1, k):
+        np.maximum(hh, high[:, k - 1 - j:t - j], out=hh)
+        np.minimum(ll, low[:, k - 1 - j:t - j], out=ll)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        raw = np.where(hh == ll, 50.0, (close[:, k - 1:] - ll) / (hh - ll) * 100.0)
+    acc = np.zeros((n, raw.shape[1] - smooth + 1))
+    for j in range(smooth):
+        acc += raw[:, j:j + acc.shape[1]]
+    out[:, k + smooth - 2:] = acc / smooth
+    return out
+
+def touches_matrix(hits: np.ndarray, lookback: int, spacing: int) -> np.ndarray:
+    """three_touches for every row: at least 3 hits at least `spacing` bars apart"""
+    window = hits[:, -lookback:]
+    count = np.zeros(len(hits), dtype=int)
+    last = np.full(len(hits), -spacing)
+    for j in range(window.shape[1]):
+        hit = window[:, j] & (j - last >= spacing)
+        count += hit
+        last = np.where(hit, j, last)
+    return count >= 3
+
+class IndicatorBatch:
+    """Collects the bars of all streams closing at one instant and evaluates them in one pass.
+
+    Each stream awaits evaluate(); requests for the same close time are
+    held until every tracked stream closing then has reported (evaluated,
+    or skip() for a bar that needs no indicators) or for at most
+    INDICATOR_BATCH_WINDOW_SEC, stacked into 2-D arrays by history length,
+    and answered together, so the per-boundary cost is a fixed number of
+    NumPy operations rather than one Python loop per stream.
+    Each stream's history is kept as an array and shifted by one row per
+    bar, so candles are not converted again on every close.
+    """
+
+    def __init__(self, rsi_period: int, rsi_low: float, rsi_high: float, stoch_k: int, stoch_smooth: int,
+                 lookback: int, spacing: int, window: float = INDICATOR_BATCH_WINDOW_SEC,
+                 max_size: int = INDICATOR_BATCH_MAX):
+        self.rsi_period = rsi_period
+        self.rsi_low, self.rsi_high = rsi_low, rsi_high
+        self.stoch_k, self.stoch_smooth = stoch_k, stoch_smooth
+        self.lookback, self.spacing = lookback, spacing
+        self.window = window
+        self.max_size = max_size
+        self._pending: Dict[int, List[Tuple[np.ndarray, asyncio.Future]]] = {}
+        self._timers: Dict[int, asyncio.Task] = {}
+        # stream -> bar length in ms; close -> streams still expected, first arrival
+        self._steps: Dict[Hashable, int] = {}
+        self._waiting: Dict[int, int] = {}
+        self._opened: Dict[int, float] = {}
+        # Recently completed closes: a straggler is evaluated alone at once
+        self._done = deque(maxlen=64)
+        # Arrival pattern: max_spread_sec is first to last stream of a complete close
+        self.stats = {"batches": 0, "streams": 0, "complete": 0, "timed_out": 0, "max_spread_sec": 0.0}
+        # stream -> rows of (ts, high, low, close), oldest first
+        self._history: Dict[Hashable, np.ndarray] = {}
+
+    def history(self, key: Hashable, candles) -> np.ndarray:
+        """The stream's candles as an array, shifted by one row when only one bar was added"""
+        rows = self._history.get(key)
+        n = len(candles)
+        last = candles[-1] if n else None
+        if rows is not None and n >= 2 and len(rows) in (n - 1, n) and rows[-1, 0] == candles[-2]["ts"]:
+            row = np.array([[last["ts"], last["high"], last["low"], last["close"]]], dtype=float)
+            shifted = np.concatenate((rows[len(rows) - n + 1:], row))
+            if shifted[0, 0] == candles[0]["ts"]:
+                self._history[key] = shifted
+                return shifted
+        rows = np.array([(c["ts"], c["high"], c["low"], c["close"]) for c in candles], dtype=float).reshape(n, 4)
+        self._history[key] = rows
+        return rows
+
+    def track(self, key: Hashable, step_ms: int):
+        self._steps[key] = step_ms
+
+    def forget(self, key: Hashable):
+        self._history.pop(key, None)
+        self._steps.pop(key, None)
+
+    def _arrive(self, close_ts: int):
+        """Count one stream in for this close and flush what is ready"""
+        if close_ts not in self._waiting:
+            if close_ts in self._done:
+                self._flush(close_ts)
+                return
+            self._waiting[close_ts] = sum(1 for step in self._steps.values() if step and close_ts % step == 0)
+            self._opened[close_ts] = time.monotonic()
+        self._waiting[close_ts] -= 1
+        if self._steps and self._waiting[close_ts] <= 0:
+            timer = self._timers.pop(close_ts, None)
+            if timer is not None:
+                timer.cancel()
+            self.stats["complete"] += 1
+            self.stats["max_spread_sec"] = max(self.stats["max_spread_sec"], time.monotonic() - self._opened[close_ts])
+            self._close(close_ts)
+            return
+        if len(self._pending.get(close_ts, ())) >= self.max_size:
+            self._flush(close_ts)
+        if close_ts not in self._timers:
+            self._timers[close_ts] = asyncio.create_task(self._flush_later(close_ts))
+
+    def skip(self, key: Hashable, close_ts: int):
+        """The stream's bar at close_ts needs no indicators: stop waiting for it"""
+        self._arrive(close_ts)
+
+    async def evaluate(self, key: Hashable, close_ts: int, candles) -> Indicators:
+        """Indicators of the last candle of stream `key`"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(close_ts, []).append((self.history(key, candles), future))
+        self._arrive(close_ts)
+        return await future
+
+    async def _flush_later(self, close_ts: int):
+        await asyncio.sleep(self.window)
+        self._timers.pop(close_ts, None)
+        self.stats["timed_out"] += 1
+        self._close(close_ts)
+
+    def _close(self, close_ts: int):
+        self._waiting.pop(close_ts, None)
+        self._opened.pop(close_ts, None)
+        self._done.append(close_ts)
+        self._flush(close_ts)
+
+    def _flush(self, close_ts: int):
+        batch = self._pending.pop(close_ts, [])
+        if batch:
+            self.stats["batches"] += 1
+            self.stats["streams"] += len(batch)
+        by_length = defaultdict(list)
+        for rows, future in batch:
+            if not future.cancelled():
+                by_length[len(rows)].append((rows, future))
+        for group in by_length.values():
+            try:
+                results = self.compute(np.stack([rows for rows, _ in group]))
+            except Exception as e:
+                logger.error(f"Indicator batch failed: {e}")
+                for _, future in group:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(group, results):
+                future.set_result(result)
+
+    def compute(self, rows: np.ndarray) -> List[Indicators]:
+        """Indicators of the last bar for a stack of equally long histories, shape (streams, bars, 4)"""
+        if rows.shape[1] == 0:
+            return [Indicators(float("nan"), False, False, False, False) for _ in range(len(rows))]
+        high, low, close = rows[:, :, 1], rows[:, :, 2], rows[:, :, 3]
+        rsi = rsi_matrix(close, self.rsi_period)
+        stoch = stoch_k_matrix(high, low, close, self.stoch_k, self.stoch_smooth)
+        last = rsi[:, -1]
+        prev = rsi[:, -2] if rsi.shape[1] > 1 else np.full(len(rsi), np.nan)
+        with np.errstate(invalid="ignore"):
+            rsi_low = (prev >= self.rsi_low) & (last < self.rsi_low)
+            rsi_high = (prev <= self.rsi_high) & (last > self.rsi_high)
+            rsi_touch = touches_matrix((rsi < self.rsi_low) | (rsi > self.rsi_high), self.lookback, self.spacing)
+            stoch_touch = touches_matrix((stoch < 20) | (stoch > 80), self.lookback, self.spacing)
+        return [Indicators(float(last[i]), bool(rsi_low[i]), bool(rsi_high[i]), bool(rsi_touch[i]), bool(stoch_touch[i]))
+                for i in range(len(rows))]
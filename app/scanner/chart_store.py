@@ -0,0 +1,160 @@
+import os
+import io
+import json
+import time
+import html
+import re
+import hashlib
+import logging
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CHART_STORE_MAX_MB = float(os.getenv("CHART_STORE_MAX_MB", "200"))
+CHART_STORE_MAX_AGE_DAYS = float(os.getenv("CHART_STORE_MAX_AGE_DAYS", "7"))
+CHART_INDEX_PER_SYMBOL = int(os.getenv("CHART_INDEX_PER_SYMBOL", "20"))
+# Index files are rewritten at most this often; flush() forces a write
+CHART_INDEX_FLUSH_SEC = float(os.getenv("CHART_INDEX_FLUSH_SEC", "5"))
+
+INDEX_JSON = "index.json"
+INDEX_HTML = "index.html"
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+class ChartStore:
+    """Chart PNGs in one web directory, bounded by total size and age.
+
+    Files are named by a hash of their content, so an identical render is
+    written once. The file LRU and the recent alerts per symbol live in
+    memory and are persisted to index.json (plus a static index.html);
+    the directory itself is only listed once, when no index exists yet.
+    """
+
+    def __init__(self, root: str, max_bytes: float = CHART_STORE_MAX_MB * 1024 * 1024,
+                 max_age_sec: float = CHART_STORE_MAX_AGE_DAYS * 86400, per_symbol: int = CHART_INDEX_PER_SYMBOL):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_sec = max_age_sec
+        self.per_symbol = per_symbol
+        # name -> [size, last used], least recently used first
+        self._files: "OrderedDict[str, list]" = OrderedDict()
+        self._alerts: Dict[str, deque] = {}
+        self._total = 0
+        self._dirty = False
+        self._written = 0.0
+        os.makedirs(root, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        path = os.path.join(self.root, INDEX_JSON)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            for name, (size, used) in sorted(data.get("files", {}).items(), key=lambda kv: kv[1][1]):
+                self._files[name] = [size, used]
+            for symbol, entries in data.get("symbols", {}).items():
+                self._alerts[symbol] = deque(entries, maxlen=self.per_symbol)
+        except FileNotFoundError:
+            # First run: adopt charts left by earlier versions
+            for entry in sorted(os.scandir(self.root), key=lambda e: e.stat().st_mtime):
+                if entry.is_file() and entry.name.endswith(".png"):
+                    self._files[entry.name] = [entry.stat().st_size, entry.stat().st_mtime]
+            self._dirty = True
+        except (ValueError, OSError) as e:
+            logger.error(f"Chart index unreadable, starting empty: {e}")
+        self._total = sum(size for size, _ in self._files.values())
+
+    def save(self, image, symbol: str, tf: str) -> str:
+        """Store a PIL image (or PNG bytes) and return its path"""
+        if isinstance(image, bytes):
+            data = image
+        else:
+            buf = io.BytesIO()
+            image.save(buf, "PNG")
+            data = buf.getvalue()
+        name = f"{symbol}_{tf}_{hashlib.sha1(data).hexdigest()[:16]}.png"
+        path = os.path.join(self.root, name)
+        now = time.time()
+        if name in self._files and os.path.exists(path):
+            self._files[name][1] = now
+            self._files.move_to_end(name)
+        else:
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            if name in self._files:
+                self._total -= self._files[name][0]
+            self._files[name] = [len(data), now]
+            self._files.move_to_end(name)
+            self._total += len(data)
+            self._evict(now, keep=name)
+        self._dirty = True
+        return path
+
+    def _evict(self, now: float, keep: Optional[str] = None):
+        evicted = set()
+        while self._files:
+            name, (size, used) = next(iter(self._files.items()))
+            if name == keep or (self._total <= self.max_bytes and now - used <= self.max_age_sec):
+                break
+            self._files.popitem(last=False)
+            self._total -= size
+            evicted.add(name)
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+        if evicted:
+            for symbol, entries in self._alerts.items():
+                self._alerts[symbol] = deque((e for e in entries if e["file"] not in evicted), maxlen=self.per_symbol)
+
+    def record_alert(self, symbol: str, tf: str, path: str, caption: str, ts: Optional[float] = None):
+        """Add an alert to the symbol's recent list in the index"""
+        entries = self._alerts.setdefault(symbol, deque(maxlen=self.per_symbol))
+        entries.append({"ts": ts or time.time(), "tf": tf, "file": os.path.basename(path), "caption": caption})
+        self._dirty = True
+        if time.monotonic() - self._written >= CHART_INDEX_FLUSH_SEC:
+            self.flush()
+
+    def flush(self):
+        """Write index.json and index.html if anything changed"""
+        if not self._dirty:
+            return
+        self._evict(time.time())
+        data = {
+            "files": {name: meta for name, meta in self._files.items()},
+            "symbols": {symbol: list(entries) for symbol, entries in self._alerts.items()},
+        }
+        self._write(INDEX_JSON, json.dumps(data, ensure_ascii=False))
+        self._write(INDEX_HTML, self._render_html())
+        self._dirty = False
+        self._written = time.monotonic()
+
+    def _write(self, name: str, text: str):
+        path = os.path.join(self.root, name)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(f"{path}.tmp", path)
+
+    def _render_html(self) -> str:
+        sections = []
+        for symbol in sorted(self._alerts):
+            items = []
+            for e in reversed(self._alerts[symbol]):
+                when = time.strftime("%Y-%m-%d %H:%M", time.gmtime(e["ts"]))
+                text = html.escape(_TAG_RE.sub("", e["caption"])).replace("\n", "<br>")
+                items.append(
+                    f'<li><a href="{html.escape(e["file"])}"><img src="{html.escape(e["file"])}" loading="lazy" width="330"></a>'
+                    f'<p>{when} UTC · {html.escape(e["tf"])}m<br>{text}</p></li>'
+                )
+            if items:
+                sections.append(f'<h2 id="{html.escape(symbol)}">{html.escape(symbol)}</h2><ul>{"".join(items)}</ul>')
+        return (
+            '<!doctype html><html><head><meta charset="utf-8"><title>Alerts</title>'
+            '<meta name="viewport" content="width=device-width, initial-scale=1">'
+            '<style>body{font-family:sans-serif;background:#141418;color:#ddd}ul{list-style:none;padding:0;'
+            'display:flex;flex-wrap:wrap;gap:12px}li{width:330px}p{font-size:13px}a{color:#9cf}</style></head>'
+            f'<body><h1>Recent alerts</h1>{"".join(sections)}</body></html>'
+        )
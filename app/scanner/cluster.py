@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import asyncio
+import zlib
+import socket
+import bisect
+import hashlib
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# "single" keeps every worker in one process; "ingest", "detect" or
+# "ingest,detect" run the scanner as a node of a Redis-backed cluster
+SCANNER_MODE = os.getenv("SCANNER_MODE", "single")
+SCANNER_NODE_ID = os.getenv("SCANNER_NODE_ID", f"{socket.gethostname()}-{os.getpid()}")
+# Symbols are spread over this many bar streams; one detector owns a partition at a time
+SCANNER_PARTITIONS = int(os.getenv("SCANNER_PARTITIONS", "16"))
+CLUSTER_PREFIX = os.getenv("CLUSTER_PREFIX", "scanner:")
+CLUSTER_HEARTBEAT_SEC = float(os.getenv("CLUSTER_HEARTBEAT_SEC", "5"))
+CLUSTER_NODE_TTL_SEC = float(os.getenv("CLUSTER_NODE_TTL_SEC", "15"))
+CLUSTER_VNODES = int(os.getenv("CLUSTER_VNODES", "64"))
+# Deliveries unacknowledged this long are taken over from their consumer
+CLUSTER_CLAIM_IDLE_SEC = float(os.getenv("CLUSTER_CLAIM_IDLE_SEC", "30"))
+CLUSTER_STREAM_MAXLEN = int(os.getenv("CLUSTER_STREAM_MAXLEN", "100000"))
+CLUSTER_ALERT_TTL_SEC = int(os.getenv("CLUSTER_ALERT_TTL_SEC", "86400"))
+# An alert claim that is never confirmed expires so another node can send it
+CLUSTER_SEND_CLAIM_SEC = int(os.getenv("CLUSTER_SEND_CLAIM_SEC", "60"))
+
+DETECT_GROUP = "detect"
+
+def scanner_roles(mode: str = SCANNER_MODE) -> set:
+    return {r.strip() for r in mode.split(",") if r.strip()} - {"single"}
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Consistent hashing: a node joining or leaving moves only ~1/N of the keys"""
+
+    def __init__(self, nodes: Iterable[str], vnodes: int = CLUSTER_VNODES):
+        self.nodes = sorted(set(nodes))
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._hashes = [h for h, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._hashes:
+            return None
+        i = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[i]
+
+class Membership:
+    """Live nodes of one role, kept as heartbeats in a sorted set"""
+
+    def __init__(self, redis, role: str, node_id: str = SCANNER_NODE_ID, ttl: float = CLUSTER_NODE_TTL_SEC):
+        self.redis = redis
+        self.key = f"{CLUSTER_PREFIX}nodes:{role}"
+        self.node_id = node_id
+        self.ttl = ttl
+
+    async def beat(self) -> List[str]:
+        """Refresh this node's heartbeat and return all live nodes"""
+        now = time.time()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.key, {self.node_id: now})
+            pipe.zremrangebyscore(self.key, "-inf", now - self.ttl)
+            pipe.zrange(self.key, 0, -1)
+            *_, nodes = await pipe.execute()
+        return sorted(nodes)
+
+    async def leave(self):
+        await self.redis.zrem(self.key, self.node_id)
+
+class BarBus:
+    """Closed bars on Redis: per-stream history plus partitioned event streams.
+
+    Ingest nodes publish each closed bar (with the book snapshot and daily
+    ATR taken at that moment) to the partition of its symbol, so all
+    timeframes of a symbol are consumed in order by the same detector.
+    The bar is also kept in a sorted set by open time, from which a
+    detector that takes over a partition rebuilds the candle history.
+    """
+
+    def __init__(self, redis, partitions: int = SCANNER_PARTITIONS, history: int = 200):
+        self.redis = redis
+        self.partitions = partitions
+        self.history_len = history
+
+    def partition(self, symbol: str) -> int:
+        return zlib.crc32(symbol.encode()) % self.partitions
+
+    def stream(self, partition: int) -> str:
+        return f"{CLUSTER_PREFIX}bars:{partition}"
+
+    def _history_key(self, symbol: str, tf: str) -> str:
+        return f"{CLUSTER_PREFIX}hist:{symbol}:{tf}"
+
+    async def put_history(self, symbol: str, tf: str, bars: List[dict]):
+        if not bars:
+            return
+        key = self._history_key(symbol, tf)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(key, {json.dumps(b, sort_keys=True): b["ts"] for b in bars})
+            pipe.zremrangebyrank(key, 0, -self.history_len - 1)
+            await pipe.execute()
+
+    async def publish(self, symbol: str, tf: str, bar: dict, orderbook=None, atr_prev: Optional[float] = None):
+        key = self._history_key(symbol, tf)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(key, {json.dumps(bar, sort_keys=True): bar["ts"]})
+            pipe.zremrangebyrank(key, 0, -self.history_len - 1)
+            pipe.xadd(self.stream(self.partition(symbol)), {
+                "symbol": symbol, "tf": tf, "bar": json.dumps(bar),
+                "ob": json.dumps(orderbook) if orderbook else "",
+                "atr": "" if atr_prev is None else repr(atr_prev),
+            }, maxlen=CLUSTER_STREAM_MAXLEN, approximate=True)
+            await pipe.execute()
+
+    async def history(self, symbol: str, tf: str, before_ts: int) -> List[dict]:
+        rows = await self.redis.zrangebyscore(self._history_key(symbol, tf), "-inf", f"({before_ts}")
+        return [json.loads(r) for r in rows]
+
+    async def ensure_group(self, partition: int):
+        try:
+            await self.redis.xgroup_create(self.stream(partition), DETECT_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def claim(self, partition: int, consumer: str, min_idle_sec: float) -> List[Tuple[str, dict]]:
+        """Take over deliveries left unacknowledged by any consumer (including a previous run of this one)"""
+        messages, start = [], "0-0"
+        while True:
+            result = await self.redis.xautoclaim(self.stream(partition), DETECT_GROUP, consumer,
+                                                 int(min_idle_sec * 1000), start_id=start, count=100)
+            start, batch = result[0], result[1]
+            messages += [(msg_id, fields) for msg_id, fields in batch if fields]
+            if start in ("0-0", b"0-0"):
+                return messages
+
+    async def read(self, partitions: Iterable[int], consumer: str, block_ms: int = 1000,
+                   count: int = 100) -> List[Tuple[int, str, dict]]:
+        streams = {self.stream(p): ">" for p in partitions}
+        if not streams:
+            await asyncio.sleep(block_ms / 1000)
+            return []
+        result = await self.redis.xreadgroup(DETECT_GROUP, consumer, streams, count=count, block=block_ms)
+        by_stream = {self.stream(p): p for p in partitions}
+        return [(by_stream[stream], msg_id, fields) for stream, entries in result or [] for msg_id, fields in entries]
+
+    async def ack(self, partition: int, ids: List[str]):
+        if ids:
+            await self.redis.xack(self.stream(partition), DETECT_GROUP, *ids)
+
+def decode_bar(fields: dict) -> Tuple[str, str, dict, Optional[Tuple[float, float]], Optional[float]]:
+    ob = json.loads(fields["ob"]) if fields.get("ob") else None
+    return (fields["symbol"], fields["tf"], json.loads(fields["bar"]),
+            tuple(ob) if ob else None, float(fields["atr"]) if fields.get("atr") else None)
+
+class AlertLedger:
+    """Cluster-wide once-only sending for redelivered bars.
+
+    A sender claims a key with SET NX for CLUSTER_SEND_CLAIM_SEC, sends,
+    then confirms it for CLUSTER_ALERT_TTL_SEC. A failed send releases
+    the key; a node dying mid-send leaves a claim that simply expires.
+    """
+
+    def __init__(self, redis, ttl: int = CLUSTER_ALERT_TTL_SEC, claim_ttl: int = CLUSTER_SEND_CLAIM_SEC):
+        self.redis = redis
+        self.ttl = ttl
+        self.claim_ttl = claim_ttl
+
+    def _key(self, key: str) -> str:
+        return f"{CLUSTER_PREFIX}sent:{key}"
+
+    async def claim(self, key: str) -> bool:
+        return bool(await self.redis.set(self._key(key), "sending", nx=True, ex=self.claim_ttl))
+
+    async def confirm(self, key: str):
+        await self.redis.set(self._key(key), "sent", ex=self.ttl)
+
+    async def release(self, key: str):
+        await self.redis.delete(self._key(key))
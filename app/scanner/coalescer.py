@@ -0,0 +1,96 @@
+import os
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from app.scanner.schedule import SCANNER_ARRIVAL_SKEW_SEC
+
+logger = logging.getLogger(__name__)
+
+# How long a symbol's first report waits for other timeframes closing at the same
+# instant; they are polled at the same close, so the arrival skew bounds the gap
+COALESCE_MAX_WAIT_SEC = float(os.getenv("COALESCE_MAX_WAIT_SEC", str(SCANNER_ARRIVAL_SKEW_SEC)))
+
+def interval_ms(tf: str) -> int:
+    """Bybit kline interval in milliseconds; 0 for calendar months"""
+    if tf.isdigit():
+        return int(tf) * 60_000
+    return {"D": 86_400_000, "W": 604_800_000}.get(tf, 0)
+
+class BarReport:
+    __slots__ = ("tf", "lines", "chart")
+
+    def __init__(self, tf: str, lines: List[str], chart=None):
+        self.tf = tf
+        self.lines = lines
+        # Whatever the flush callback needs to render this timeframe's chart
+        self.chart = chart
+
+class Coalescer:
+    """Merges alerts of one symbol's timeframes that close at the same instant.
+
+    Every worker reports each closed bar, with or without alert lines. A
+    (symbol, close time) group is flushed as soon as all tracked timeframes
+    that close at that instant have reported, or after max_wait, and the
+    flush callback sends one message with one chart for the whole group.
+    """
+
+    def __init__(self, flush: Callable[[str, int, List[BarReport]], Awaitable[None]],
+                 max_wait: float = COALESCE_MAX_WAIT_SEC, tf_ms: Callable[[str], int] = interval_ms,
+                 settled: Optional[Callable[[str, int], Awaitable[None]]] = None):
+        self._flush = flush
+        # Called once a group is done with, sent or not (e.g. to acknowledge its input)
+        self._settled = settled
+        self.max_wait = max_wait
+        self._tf_ms = tf_ms
+        self._timeframes: Dict[str, Set[str]] = {}
+        self._pending: Dict[Tuple[str, int], Dict[str, BarReport]] = {}
+        self._timers: Dict[Tuple[str, int], asyncio.Task] = {}
+
+    def track(self, symbol: str, tf: str):
+        self._timeframes.setdefault(symbol, set()).add(tf)
+
+    def untrack(self, symbol: str, tf: str):
+        tfs = self._timeframes.get(symbol)
+        if tfs:
+            tfs.discard(tf)
+            if not tfs:
+                del self._timeframes[symbol]
+
+    def _expected(self, symbol: str, tf: str, close_ts: int) -> Set[str]:
+        expected = {tf}
+        for other in self._timeframes.get(symbol, ()):
+            step = self._tf_ms(other)
+            if step and close_ts % step == 0:
+                expected.add(other)
+        return expected
+
+    async def submit(self, symbol: str, tf: str, close_ts: int, lines: List[str], chart=None):
+        key = (symbol, close_ts)
+        group = self._pending.setdefault(key, {})
+        group[tf] = BarReport(tf, lines, chart)
+        if self._expected(symbol, tf, close_ts) <= group.keys():
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+            await self._send(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._flush_later(key))
+
+    async def _flush_later(self, key):
+        await asyncio.sleep(self.max_wait)
+        self._timers.pop(key, None)
+        await self._send(key)
+
+    async def _send(self, key):
+        group = self._pending.pop(key, None)
+        reports = [r for r in (group or {}).values() if r.lines]
+        if reports:
+            try:
+                await self._flush(key[0], key[1], reports)
+            except Exception as e:
+                logger.error(f"Failed to send alerts for {key[0]}: {e}")
+        if self._settled is not None:
+            try:
+                await self._settled(key[0], key[1])
+            except Exception as e:
+                logger.error(f"Failed to settle alerts for {key[0]}: {e}")
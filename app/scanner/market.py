@@ -0,0 +1,247 @@
+import os
+import math
+import asyncio
+import logging
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+import numpy as np
+from app.scanner.schedule import SCANNER_ARRIVAL_SKEW_SEC
+
+logger = logging.getLogger(__name__)
+
+# Bars of history behind beta/correlation, per timeframe
+MARKET_WINDOW = int(os.getenv("MARKET_WINDOW", "100"))
+# Fewer symbols than this on a bar and there is no market return for it;
+# 0 means a majority of the symbols tracked on the timeframe (at least 2)
+MARKET_MIN_SYMBOLS = int(os.getenv("MARKET_MIN_SYMBOLS", "0"))
+MARKET_MIN_BARS = int(os.getenv("MARKET_MIN_BARS", "20"))
+MARKET_Z_THRESHOLD = float(os.getenv("MARKET_Z_THRESHOLD", "2.5"))
+MARKET_MIN_CORR = float(os.getenv("MARKET_MIN_CORR", "0.3"))
+# How long a bar waits for the other symbols' bars of the same close
+MARKET_WAIT_SEC = float(os.getenv("MARKET_WAIT_SEC", str(SCANNER_ARRIVAL_SKEW_SEC)))
+
+MARKET_MOVE = "market"
+IDIOSYNCRATIC_MOVE = "idiosyncratic"
+
+class MarketContext(NamedTuple):
+    label: Optional[str]
+    market_z: float
+    residual_z: float
+    beta: float
+    corr: float
+    cross_z: float
+    volume_z: float
+
+    def text(self) -> str:
+        def f(v, fmt):
+            return "n/a" if math.isnan(v) else format(v, fmt)
+        head = {MARKET_MOVE: "Market move", IDIOSYNCRATIC_MOVE: "Idiosyncratic move"}.get(self.label, "Market")
+        return (f"{head}: market {f(self.market_z, '+.1f')}σ, residual {f(self.residual_z, '+.1f')}σ, "
+                f"β {f(self.beta, '.2f')}, ρ {f(self.corr, '.2f')}, volume {f(self.volume_z, '+.1f')}σ")
+
+class MarketMatrix:
+    """Rolling returns/volume matrix of one timeframe: rows are bar closes, columns symbols.
+
+    Per-symbol sums against the equal-weighted market return are updated
+    when a row enters or leaves the window (and when a late symbol fills
+    its cell), so a bar costs O(symbols) rather than O(symbols x window);
+    they are recomputed exactly once per window to shed rounding drift.
+    """
+
+    def __init__(self, window: int = MARKET_WINDOW, capacity: int = 64):
+        self.window = window
+        self.cols: Dict[str, int] = {}
+        self.ret = np.full((window, capacity), np.nan)
+        self.vol = np.full((window, capacity), np.nan)
+        self.market = np.full(window, np.nan)
+        self.slot_ts: Dict[int, int] = {}
+        self._ts = np.full(window, -1, dtype=np.int64)
+        self._rows = 0
+        # n, Σr, Σr², Σm, Σm², Σrm over cells where both r and m are known; Σv, Σv², nv for log volume
+        self._sums = np.zeros((9, capacity))
+
+    def column(self, symbol: str) -> int:
+        col = self.cols.get(symbol)
+        if col is None:
+            col = self.cols[symbol] = len(self.cols)
+            if col >= self.ret.shape[1]:
+                grow = self.ret.shape[1]
+                self.ret = np.hstack((self.ret, np.full((self.window, grow), np.nan)))
+                self.vol = np.hstack((self.vol, np.full((self.window, grow), np.nan)))
+                self._sums = np.hstack((self._sums, np.zeros((9, grow))))
+        return col
+
+    def _accumulate(self, slot: int, cols, sign: float):
+        r, v, m = self.ret[slot, cols], self.vol[slot, cols], self.market[slot]
+        s = self._sums
+        ok = ~np.isnan(r) & ~np.isnan(m)
+        rr = np.where(ok, r, 0.0)
+        mm = np.where(ok, m, 0.0)
+        s[0, cols] += sign * ok
+        s[1, cols] += sign * rr
+        s[2, cols] += sign * rr * rr
+        s[3, cols] += sign * mm
+        s[4, cols] += sign * mm * mm
+        s[5, cols] += sign * rr * mm
+        vok = ~np.isnan(v)
+        vv = np.where(vok, v, 0.0)
+        s[6, cols] += sign * vv
+        s[7, cols] += sign * vv * vv
+        s[8, cols] += sign * vok
+
+    def _recompute(self):
+        self._sums[:] = 0.0
+        cols = np.arange(self.ret.shape[1])
+        for slot in range(self.window):
+            if self._ts[slot] >= 0:
+                self._accumulate(slot, cols, 1.0)
+
+    def add_row(self, close_ts: int, cells: Dict[str, Tuple[float, float]], min_symbols: int = 2) -> int:
+        """Append the bar closing at close_ts: symbol -> (log return, log volume)"""
+        for symbol in cells:
+            self.column(symbol)
+        slot = self._rows % self.window
+        cols = np.arange(self.ret.shape[1])
+        if self._ts[slot] >= 0:
+            self._accumulate(slot, cols, -1.0)
+            self.slot_ts.pop(int(self._ts[slot]), None)
+        self.ret[slot] = np.nan
+        self.vol[slot] = np.nan
+        for symbol, (r, v) in cells.items():
+            self.ret[slot, self.cols[symbol]] = r
+            self.vol[slot, self.cols[symbol]] = v
+        known = np.count_nonzero(~np.isnan(self.ret[slot]))
+        self.market[slot] = np.nanmean(self.ret[slot]) if known >= min_symbols else np.nan
+        self._ts[slot] = close_ts
+        self.slot_ts[close_ts] = slot
+        self._rows += 1
+        if self._rows % self.window == 0:
+            self._recompute()
+        else:
+            self._accumulate(slot, cols, 1.0)
+        return slot
+
+    def fill(self, slot: int, symbol: str, ret: float, log_volume: float):
+        """A symbol's bar arriving after its row was closed: counts toward its own stats only"""
+        col = self.column(symbol)
+        if not math.isnan(self.ret[slot, col]):
+            return
+        self.ret[slot, col] = ret
+        self.vol[slot, col] = log_volume
+        self._accumulate(slot, np.array([col]), 1.0)
+
+    def context(self, slot: int, symbols: List[str], z_threshold: float = MARKET_Z_THRESHOLD,
+                min_bars: int = MARKET_MIN_BARS, min_corr: float = MARKET_MIN_CORR) -> List[MarketContext]:
+        cols = np.array([self.cols[s] for s in symbols])
+        n, sr, srr, sm, smm, srm, sv, svv, nv = self._sums[:, cols]
+        r, v, m = self.ret[slot, cols], self.vol[slot, cols], self.market[slot]
+        others = np.delete(self.market, slot)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            market_z = (m - np.nanmean(others)) / np.nanstd(others) if np.count_nonzero(~np.isnan(others)) >= min_bars else np.nan
+            mean_r, mean_m = sr / n, sm / n
+            var_r = srr / n - mean_r ** 2
+            var_m = smm / n - mean_m ** 2
+            cov = srm / n - mean_r * mean_m
+            beta = cov / var_m
+            corr = cov / np.sqrt(var_r * var_m)
+            resid_sd = np.sqrt(np.maximum(var_r - beta * cov, 0.0))
+            residual_z = (r - (mean_r - beta * mean_m) - beta * m) / resid_sd
+            row = self.ret[slot]
+            cross_z = (r - np.nanmean(row)) / np.nanstd(row)
+            # Volume against the symbol's own rolling mean
+            vol_dev = v - sv / nv
+            vol_sd = np.sqrt(np.maximum(svv / nv - (sv / nv) ** 2, 0.0))
+            volume_z = vol_dev / vol_sd
+        enough = n >= min_bars
+        out = []
+        for i in range(len(symbols)):
+            ok = bool(enough[i])
+            rz = float(residual_z[i]) if ok else math.nan
+            label = None
+            if ok and abs(rz) >= z_threshold:
+                label = IDIOSYNCRATIC_MOVE
+            elif ok and not math.isnan(market_z) and abs(market_z) >= z_threshold and corr[i] >= min_corr:
+                label = MARKET_MOVE
+            out.append(MarketContext(label, float(market_z), rz, float(beta[i]) if ok else math.nan,
+                                     float(corr[i]) if ok else math.nan, float(cross_z[i]), float(volume_z[i])))
+        return out
+
+class MarketDetector:
+    """Cross-symbol context for each stream's closed bar, one matrix per timeframe.
+
+    observe() waits until every tracked symbol of the timeframe has
+    reported the same close (at most MARKET_WAIT_SEC), closes the row and
+    answers all of them from one vectorized pass. A symbol reporting after
+    that is answered at once against the closed row.
+    """
+
+    def __init__(self, window: int = MARKET_WINDOW, wait: float = MARKET_WAIT_SEC,
+                 min_symbols: int = MARKET_MIN_SYMBOLS):
+        self.window = window
+        self.wait = wait
+        self.min_symbols = min_symbols
+        self._matrices: Dict[str, MarketMatrix] = {}
+        self._symbols: Dict[str, Set[str]] = {}
+        self._pending: Dict[Tuple[str, int], Dict[str, Tuple[float, float, asyncio.Future]]] = {}
+        self._timers: Dict[Tuple[str, int], asyncio.Task] = {}
+        self._prev: Dict[Tuple[str, str], float] = {}
+
+    def track(self, symbol: str, tf: str):
+        self._symbols.setdefault(tf, set()).add(symbol)
+
+    def untrack(self, symbol: str, tf: str):
+        self._symbols.get(tf, set()).discard(symbol)
+        self._prev.pop((symbol, tf), None)
+
+    def quorum(self, tf: str) -> int:
+        """Symbols a bar needs for a market return on this timeframe"""
+        if self.min_symbols:
+            return self.min_symbols
+        return max(2, len(self._symbols.get(tf, ())) // 2 + 1)
+
+    async def observe(self, symbol: str, tf: str, close_ts: int, candle: dict) -> Optional[MarketContext]:
+        prev = self._prev.get((symbol, tf))
+        self._prev[(symbol, tf)] = candle["close"]
+        if prev is None:
+            prev = candle["open"]
+        if prev <= 0 or candle["close"] <= 0:
+            return None
+        ret = math.log(candle["close"] / prev)
+        log_volume = math.log(candle["volume"]) if candle.get("volume", 0) > 0 else math.nan
+        matrix = self._matrices.setdefault(tf, MarketMatrix(self.window))
+        slot = matrix.slot_ts.get(close_ts)
+        if slot is not None:
+            matrix.fill(slot, symbol, ret, log_volume)
+            return matrix.context(slot, [symbol])[0]
+        key = (tf, close_ts)
+        future = asyncio.get_running_loop().create_future()
+        group = self._pending.setdefault(key, {})
+        group[symbol] = (ret, log_volume, future)
+        if self._symbols.get(tf, set()) <= group.keys():
+            timer = self._timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+            self._close(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._close_later(key))
+        return await future
+
+    async def _close_later(self, key):
+        await asyncio.sleep(self.wait)
+        self._timers.pop(key, None)
+        self._close(key)
+
+    def _close(self, key):
+        tf, close_ts = key
+        group = self._pending.pop(key, {})
+        if not group:
+            return
+        matrix = self._matrices[tf]
+        try:
+            slot = matrix.add_row(close_ts, {s: (r, v) for s, (r, v, _) in group.items()}, self.quorum(tf))
+            results = matrix.context(slot, list(group))
+        except Exception as e:
+            logger.error(f"Market context failed for {tf} at {close_ts}: {e}")
+            results = [None] * len(group)
+        for (_, _, future), result in zip(group.values(), results):
+            if not future.done():
+                future.set_result(result)
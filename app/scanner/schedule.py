@@ -0,0 +1,22 @@
+import os
+import time
+from typing import Optional
+
+# Streams poll just after their bar closes instead of on a free-running timer,
+# so every stream closing at one instant delivers its bar within the same few
+# seconds and the per-close batches (coalescer, market matrix, indicators)
+# see them together.
+
+# Seconds after a close before the bar is fetched; the exchange needs a moment to roll the kline
+POLL_CLOSE_OFFSET_SEC = float(os.getenv("POLL_CLOSE_OFFSET_SEC", "1"))
+# Retry delay while the closed bar is not served yet or the request failed
+POLL_RETRY_SEC = float(os.getenv("POLL_RETRY_SEC", "2"))
+# Spread between the first and last stream delivering the same close:
+# fetch latency, rate-limit queueing and a retry or two
+SCANNER_ARRIVAL_SKEW_SEC = float(os.getenv("SCANNER_ARRIVAL_SKEW_SEC", "5"))
+
+def next_close_delay(step_ms: int, offset: float = POLL_CLOSE_OFFSET_SEC, now: Optional[float] = None) -> float:
+    """Seconds until `offset` past the next bar close of a `step_ms` interval (closes aligned to the epoch)"""
+    now = time.time() if now is None else now
+    step = step_ms / 1000
+    return (int((now - offset) // step) + 1) * step + offset - now
@@ -1,7 +1,10 @@
 from pydantic import BaseModel, EmailStr, validator
-from typing import Optional
-from datetime import datetime
+from typing import List, Optional
+from datetime import date, datetime
 import uuid
+from app.services import expressions
+from app.services.indicator_cache import CONDITION_TYPES, EXPRESSION_CONDITION, KLINE_INTERVALS, MAX_INDICATOR_PERIOD, MIN_INDICATOR_PERIOD
+from app.services.trigger_state import MAX_HYSTERESIS_PCT, TRIGGER_MODES
 
 class UserBase(BaseModel):
     email: EmailStr
@@ -26,6 +29,14 @@ class StrategyBase(BaseModel):
     condition_value: float
     check_interval: int = 300
     notification_type: str = "both"
+    interval: str = "1h"
+    indicator_period: int = 14
+    expression: Optional[str] = None
+    # "edge" fires once per crossing, "once" until edited, "level" on every check
+    trigger_mode: str = "edge"
+    # Price must come back this far (percent of condition_value) before the strategy re-arms
+    hysteresis_pct: float = 0.0
+    rearm_after_sec: int = 0
 
     @validator('check_interval')
     def check_interval_min_value(cls, v):
@@ -34,7 +45,72 @@ class StrategyBase(BaseModel):
         return v
 
 class StrategyCreate(StrategyBase):
-    pass
+    # Checked on input only, so rows stored before a rule existed still serialize
+    @validator('condition_type')
+    def condition_type_known(cls, v):
+        if v not in CONDITION_TYPES:
+            raise ValueError(f"Condition type must be one of {', '.join(sorted(CONDITION_TYPES))}")
+        return v
+
+    @validator('interval')
+    def interval_supported(cls, v):
+        if v not in KLINE_INTERVALS:
+            raise ValueError(f"Interval must be one of {', '.join(sorted(KLINE_INTERVALS))}")
+        return v
+
+    @validator('expression', always=True)
+    def expression_valid(cls, v, values):
+        if values.get('condition_type') == EXPRESSION_CONDITION and not v:
+            raise ValueError('Expression is required for expression conditions')
+        if v:
+            try:
+                expressions.parse(v)
+            except expressions.ExpressionError as e:
+                raise ValueError(str(e))
+        return v
+
+    @validator('trigger_mode')
+    def trigger_mode_known(cls, v):
+        if v not in TRIGGER_MODES:
+            raise ValueError(f"Trigger mode must be one of {', '.join(sorted(TRIGGER_MODES))}")
+        return v
+
+    @validator('hysteresis_pct')
+    def hysteresis_range(cls, v):
+        if not 0 <= v <= MAX_HYSTERESIS_PCT:
+            raise ValueError(f'Hysteresis must be between 0 and {MAX_HYSTERESIS_PCT} percent')
+        return v
+
+    @validator('rearm_after_sec')
+    def rearm_after_non_negative(cls, v):
+        if v < 0:
+            raise ValueError('Re-arm delay cannot be negative')
+        return v
+
+    @validator('indicator_period')
+    def indicator_period_range(cls, v):
+        if not MIN_INDICATOR_PERIOD <= v <= MAX_INDICATOR_PERIOD:
+            raise ValueError(f'Indicator period must be between {MIN_INDICATOR_PERIOD} and {MAX_INDICATOR_PERIOD}')
+        return v
+
+class StrategyUpdateItem(StrategyCreate):
+    id: uuid.UUID
+
+class StrategyIds(BaseModel):
+    ids: List[uuid.UUID]
+
+class StrategyBulkToggle(StrategyIds):
+    # None flips each strategy, True/False sets it
+    is_active: Optional[bool] = None
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[uuid.UUID] = None
+    status: str
+    detail: Optional[str] = None
+
+class BulkResult(BaseModel):
+    results: List[BulkItemResult]
 
 class Strategy(StrategyBase):
     id: uuid.UUID
@@ -42,6 +118,8 @@ class Strategy(StrategyBase):
     is_active: bool
     created_at: datetime
     last_checked: Optional[datetime] = None
+    trigger_state: str = "armed"
+    triggered_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -59,6 +137,17 @@ class Alert(AlertBase):
     class Config:
         from_attributes = True
 
+class AlertDailyStat(BaseModel):
+    day: date
+    strategy_id: uuid.UUID
+    alert_count: int
+    min_trigger: Optional[float] = None
+    max_trigger: Optional[float] = None
+    last_alert_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -0,0 +1,96 @@
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+# bcrypt is CPU bound; it runs in a dedicated process pool so login storms
+# cannot tie up the request threadpool or the event loop.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(HASH_WORKERS * 2)))
+HASH_WAIT_SEC = float(os.getenv("PASSWORD_HASH_WAIT_SEC", "2"))
+
+class HashingBusy(Exception):
+    """Raised when too many hash operations are already queued"""
+
+_pwd_context = None
+
+def _context():
+    # Lives in the worker processes; passlib is imported there on first use
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__rounds=BCRYPT_ROUNDS,
+            # Hashes made with any other cost are flagged for rehash on login
+            bcrypt__min_rounds=BCRYPT_ROUNDS,
+            bcrypt__max_rounds=BCRYPT_ROUNDS,
+        )
+    return _pwd_context
+
+def _hash(password: str) -> str:
+    return _context().hash(password)
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return _context().verify_and_update(password, hashed_password)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(HASH_MAX_PENDING)
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            _pool_pid = os.getpid()
+        return _pool
+
+def _run(fn, *args):
+    if not _slots.acquire(timeout=HASH_WAIT_SEC):
+        raise HashingBusy()
+    try:
+        return _get_pool().submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+async def _arun(fn, *args):
+    # The slots are shared with sync callers; wait for one in a thread, not on the event loop
+    acquire = asyncio.get_running_loop().run_in_executor(None, _slots.acquire, True, HASH_WAIT_SEC)
+    try:
+        acquired = await asyncio.shield(acquire)
+    except asyncio.CancelledError:
+        # Hand back a slot the thread still gets after the request went away
+        acquire.add_done_callback(lambda f: f.result() and _slots.release())
+        raise
+    if not acquired:
+        raise HashingBusy()
+    try:
+        return await asyncio.wrap_future(_get_pool().submit(fn, *args))
+    finally:
+        _slots.release()
+
+def hash_password(password: str) -> str:
+    return _run(_hash, password)
+
+def verify_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Check a password; the second item is a replacement hash when the stored one is outdated"""
+    return _run(_verify_and_update, password, hashed_password)
+
+async def ahash_password(password: str) -> str:
+    return await _arun(_hash, password)
+
+async def averify_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _arun(_verify_and_update, password, hashed_password)
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
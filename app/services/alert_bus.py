@@ -0,0 +1,107 @@
+import json
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Optional, Set
+from app.services.redis_client import REDIS_URL, get_redis, redis_enabled
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "alerts:"
+CLIENT_QUEUE_SIZE = 100
+
+def alert_payload(alert) -> dict:
+    return {
+        "id": str(alert.id),
+        "strategy_id": str(alert.strategy_id),
+        "user_id": str(alert.user_id),
+        "message": alert.message,
+        "trigger_value": alert.trigger_value,
+        "created_at": alert.created_at.isoformat() if alert.created_at else None,
+    }
+
+def publish_alert(alert) -> None:
+    """Publish a new alert to its owner's channel (called from the checker)"""
+    payload = alert_payload(alert)
+    r = get_redis()
+    if r is not None:
+        try:
+            r.publish(f"{CHANNEL_PREFIX}{payload['user_id']}", json.dumps(payload))
+        except Exception as e:
+            logger.error(f"Error publishing alert {payload['id']}: {e}")
+    else:
+        hub.dispatch_threadsafe(payload["user_id"], payload)
+
+class AlertHub:
+    """Fans alerts out to every open connection of a user in this API process"""
+
+    def __init__(self):
+        self._clients: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._warned_no_loop = False
+
+    def connect(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self._clients[str(user_id)].add(queue)
+        return queue
+
+    def disconnect(self, user_id: str, queue: asyncio.Queue):
+        clients = self._clients.get(str(user_id))
+        if clients is not None:
+            clients.discard(queue)
+            if not clients:
+                del self._clients[str(user_id)]
+
+    def dispatch(self, user_id: str, payload: dict):
+        for queue in list(self._clients.get(str(user_id), ())):
+            if queue.full():
+                # Slow client: drop its oldest alert rather than block the others
+                queue.get_nowait()
+            queue.put_nowait(payload)
+
+    def dispatch_threadsafe(self, user_id: str, payload: dict):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self.dispatch, user_id, payload)
+        elif not self._warned_no_loop:
+            # Without Redis only a checker running inside the API process can push
+            self._warned_no_loop = True
+            logger.warning("No API event loop in this process; push delivery of alerts needs REDIS_URL")
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+        while True:
+            client = aioredis.Redis.from_url(REDIS_URL, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    user_id = message["channel"][len(CHANNEL_PREFIX):]
+                    if user_id in self._clients:
+                        self.dispatch(user_id, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Alert subscription error: {e}; resubscribing")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+                await client.close()
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        if redis_enabled() and self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+hub = AlertHub()
@@ -0,0 +1,115 @@
+import os
+import re
+import logging
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.engine import Connection
+from app import models
+
+logger = logging.getLogger(__name__)
+
+# On Postgres alerts is range-partitioned by month on created_at; old months
+# are dropped whole. Other databases (SQLite in tests) keep one table and
+# retention falls back to a DELETE.
+ALERT_RETENTION_DAYS = int(os.getenv("ALERT_RETENTION_DAYS", "90"))
+ALERT_PARTITIONS_AHEAD = int(os.getenv("ALERT_PARTITIONS_AHEAD", "2"))
+ROLLUP_RETENTION_DAYS = int(os.getenv("ALERT_ROLLUP_RETENTION_DAYS", "730"))
+
+_PARTITION_RE = re.compile(r"^alerts_y(\d{4})m(\d{2})$")
+
+def retention_cutoff(now: Optional[datetime] = None) -> Optional[datetime]:
+    """Oldest created_at still served, or None when alerts are kept forever"""
+    if ALERT_RETENTION_DAYS <= 0:
+        return None
+    return (now or datetime.utcnow()) - timedelta(days=ALERT_RETENTION_DAYS)
+
+def _month_start(d) -> date:
+    return date(d.year, d.month, 1)
+
+def _next_month(d: date) -> date:
+    return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"alerts_y{month.year:04d}m{month.month:02d}"
+
+def _is_postgres(conn: Connection) -> bool:
+    return conn.dialect.name == "postgresql"
+
+def ensure_partitions(conn: Connection, start: Optional[date] = None, ahead: int = ALERT_PARTITIONS_AHEAD) -> List[str]:
+    """Create monthly partitions from start (default: this month) up to `ahead` months out"""
+    if not _is_postgres(conn):
+        return []
+    conn.execute(text("CREATE TABLE IF NOT EXISTS alerts_default PARTITION OF alerts DEFAULT"))
+    month = _month_start(start or date.today())
+    last = _month_start(date.today())
+    for _ in range(ahead):
+        last = _next_month(last)
+    created = []
+    while month <= last:
+        name = partition_name(month)
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF alerts "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        ))
+        created.append(name)
+        month = _next_month(month)
+    return created
+
+def apply_retention(conn: Connection, now: Optional[datetime] = None) -> int:
+    """Drop (Postgres) or delete (other databases) alerts older than the retention window"""
+    cutoff = retention_cutoff(now)
+    if cutoff is None:
+        return 0
+    removed = 0
+    if _is_postgres(conn):
+        names = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = 'alerts'"
+        )).scalars().all()
+        for name in names:
+            m = _PARTITION_RE.match(name)
+            if not m:
+                continue
+            upper = _next_month(date(int(m.group(1)), int(m.group(2)), 1))
+            if datetime.combine(upper, datetime.min.time()) <= cutoff:
+                conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                removed += 1
+                logger.info(f"Dropped alert partition {name}")
+        # Rows that landed in the default partition are trimmed row by row
+        conn.execute(text("DELETE FROM alerts_default WHERE created_at < :cutoff"), {"cutoff": cutoff})
+    else:
+        removed = conn.execute(delete(models.Alert).where(models.Alert.created_at < cutoff)).rowcount
+    if ROLLUP_RETENTION_DAYS > 0:
+        conn.execute(delete(models.AlertDailyRollup).where(
+            models.AlertDailyRollup.day < (now or datetime.utcnow()).date() - timedelta(days=ROLLUP_RETENTION_DAYS)
+        ))
+    return removed
+
+def refresh_rollups(conn: Connection, since: date):
+    """Recompute per user/strategy daily rollups for days >= since"""
+    since_ts = datetime.combine(since, datetime.min.time())
+    day = func.date(models.Alert.created_at)
+    conn.execute(delete(models.AlertDailyRollup).where(models.AlertDailyRollup.day >= since))
+    conn.execute(insert(models.AlertDailyRollup).from_select(
+        ["day", "user_id", "strategy_id", "alert_count", "min_trigger", "max_trigger", "last_alert_at"],
+        select(
+            day,
+            models.Alert.user_id,
+            models.Alert.strategy_id,
+            func.count(),
+            func.min(models.Alert.trigger_value),
+            func.max(models.Alert.trigger_value),
+            func.max(models.Alert.created_at),
+        ).where(models.Alert.created_at >= since_ts).group_by(day, models.Alert.user_id, models.Alert.strategy_id)
+    ))
+
+def maintain(engine, now: Optional[datetime] = None):
+    """Periodic upkeep: future partitions, retention, and the last two days of rollups"""
+    now = now or datetime.utcnow()
+    with engine.begin() as conn:
+        ensure_partitions(conn)
+        refresh_rollups(conn, now.date() - timedelta(days=1))
+        removed = apply_retention(conn, now)
+    logger.info(f"Alert storage maintained, {removed} partitions/rows expired")
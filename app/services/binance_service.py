@@ -1,17 +1,29 @@
-import requests
+import os
 import logging
-from typing import Optional
+from typing import List, Optional
+from app.exchanges.binance import get_client
+from app.services import loop_thread, price_cache
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on a blocking call, including retries and rate-limit waits
+BINANCE_CALL_TIMEOUT = float(os.getenv("BINANCE_CALL_TIMEOUT", "30"))
+
 def get_binance_price(symbol: str) -> Optional[float]:
-    """Get current price from Binance API"""
-    url = f"https://api.binance.com/api/v3/ticker/price?symbol={symbol.upper()}"
+    """Get current price, from the streaming cache when fresh, else from Binance API"""
+    cached = price_cache.get_cached_price(symbol)
+    if cached is not None:
+        return cached
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        return float(data['price'])
+        return loop_thread.run(get_client().get_price(symbol), BINANCE_CALL_TIMEOUT)
     except Exception as e:
         logger.error(f"Error fetching price from Binance for {symbol}: {e}")
         return None
+
+def get_binance_klines(symbol: str, interval: str, limit: int = 200) -> Optional[List[dict]]:
+    """Closed klines, oldest first; the still-forming last bar is dropped"""
+    try:
+        return loop_thread.run(get_client().get_klines(symbol, interval, limit), BINANCE_CALL_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Error fetching klines from Binance for {symbol} {interval}: {e}")
+        return None
@@ -0,0 +1,170 @@
+import ast
+import math
+import logging
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, FrozenSet, Optional, Tuple
+import numpy as np
+from app.services.indicator_cache import MAX_INDICATOR_PERIOD, MIN_INDICATOR_PERIOD, IndicatorCache
+
+logger = logging.getLogger(__name__)
+
+# Strategy condition expressions, e.g. "close > 25000 and rsi(14) < 30".
+#
+# An expression is parsed once into a template where every numeric literal
+# becomes a parameter slot: "close > 25000 and rsi(14) < 30" and
+# "close > 60000 and rsi(14) < 25" share the template
+# "((env['close'] > p[0]) & (env['rsi_14'] < p[1]))". Each template is
+# compiled once and evaluated per (symbol, interval) with NumPy over the
+# parameter matrix of all strategies sharing it.
+
+MAX_EXPRESSION_LENGTH = 500
+MAX_EXPRESSION_NODES = 100
+
+# Values of the last closed bar
+FIELDS = {"open", "high", "low", "close", "volume"}
+# Function name -> IndicatorCache series
+FUNCTIONS = {"rsi": "rsi", "stoch": "stoch", "atr_ratio": "atr", "volume_ratio": "volume"}
+
+_COMPARE = {ast.Gt: ">", ast.GtE: ">=", ast.Lt: "<", ast.LtE: "<=", ast.Eq: "==", ast.NotEq: "!="}
+_ARITH = {ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.Div: "/"}
+
+class ExpressionError(ValueError):
+    pass
+
+class Plan:
+    """Parsed expression: shared template, this strategy's parameters, series it reads"""
+
+    __slots__ = ("template", "params", "series")
+
+    def __init__(self, template: str, params: Tuple[float, ...], series: FrozenSet[Tuple[str, int]]):
+        self.template = template
+        self.params = params
+        self.series = series
+
+    @property
+    def max_period(self) -> int:
+        return max((period for _, period in self.series), default=MIN_INDICATOR_PERIOD)
+
+def _emit(node, params: list, series: set) -> Tuple[str, str]:
+    """Translate a whitelisted AST node to NumPy source; returns (source, 'bool' | 'num')"""
+    if isinstance(node, ast.BoolOp):
+        parts = [_expect(v, "bool", params, series) for v in node.values]
+        op = " & " if isinstance(node.op, ast.And) else " | "
+        return "(" + op.join(parts) + ")", "bool"
+    if isinstance(node, ast.UnaryOp):
+        if isinstance(node.op, ast.Not):
+            # Not ~: a comparison without parameters is a plain bool, and ~True == -2
+            return f"logical_not({_expect(node.operand, 'bool', params, series)})", "bool"
+        if isinstance(node.op, (ast.USub, ast.UAdd)):
+            sign = "-" if isinstance(node.op, ast.USub) else "+"
+            return f"({sign}{_expect(node.operand, 'num', params, series)})", "num"
+    if isinstance(node, ast.Compare):
+        left = _expect(node.left, "num", params, series)
+        parts = []
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in _COMPARE:
+                raise ExpressionError(f"Unsupported comparison: {type(op).__name__}")
+            right = _expect(comparator, "num", params, series)
+            parts.append(f"({left} {_COMPARE[type(op)]} {right})")
+            left = right
+        return (parts[0] if len(parts) == 1 else "(" + " & ".join(parts) + ")"), "bool"
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITH:
+        left = _expect(node.left, "num", params, series)
+        right = _expect(node.right, "num", params, series)
+        return f"({left} {_ARITH[type(node.op)]} {right})", "num"
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        params.append(float(node.value))
+        return f"p[{len(params) - 1}]", "num"
+    if isinstance(node, ast.Name):
+        if node.id not in FIELDS:
+            raise ExpressionError(f"Unknown name '{node.id}', expected one of {', '.join(sorted(FIELDS))}")
+        return f"env['{node.id}']", "num"
+    if isinstance(node, ast.Call):
+        name = node.func.id if isinstance(node.func, ast.Name) else None
+        if name not in FUNCTIONS:
+            raise ExpressionError(f"Unknown function, expected one of {', '.join(sorted(FUNCTIONS))}")
+        if node.keywords or len(node.args) != 1 or not isinstance(node.args[0], ast.Constant) \
+                or not isinstance(node.args[0].value, int) or isinstance(node.args[0].value, bool):
+            raise ExpressionError(f"{name}() takes a single integer period")
+        period = node.args[0].value
+        if not MIN_INDICATOR_PERIOD <= period <= MAX_INDICATOR_PERIOD:
+            raise ExpressionError(f"{name}() period must be between {MIN_INDICATOR_PERIOD} and {MAX_INDICATOR_PERIOD}")
+        series.add((FUNCTIONS[name], period))
+        return f"env['{FUNCTIONS[name]}_{period}']", "num"
+    raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+
+def _expect(node, kind: str, params: list, series: set) -> str:
+    source, actual = _emit(node, params, series)
+    if actual != kind:
+        raise ExpressionError("Expected a condition" if kind == "bool" else "Expected a number")
+    return source
+
+@lru_cache(maxsize=4096)
+def parse(expression: str) -> Plan:
+    """Validate an expression and split it into template and parameters"""
+    if not expression or len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError(f"Expression must be 1-{MAX_EXPRESSION_LENGTH} characters")
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid expression: {e.msg}")
+    if sum(1 for _ in ast.walk(tree)) > MAX_EXPRESSION_NODES:
+        raise ExpressionError("Expression is too complex")
+    params, series = [], set()
+    template = _expect(tree.body, "bool", params, series)
+    return Plan(template, tuple(params), frozenset(series))
+
+@lru_cache(maxsize=1024)
+def compile_template(template: str):
+    # Templates are generated by _emit from whitelisted nodes only
+    return eval(f"lambda env, p: {template}", {"__builtins__": {}, "logical_not": np.logical_not})
+
+def _environment(cache: IndicatorCache, symbol: str, interval: str, series) -> Optional[Dict[str, float]]:
+    candles = cache.klines(symbol, interval)
+    if not candles:
+        return None
+    env = {field: candles[-1][field] for field in FIELDS}
+    for indicator, period in series:
+        value = cache.series(symbol, interval, indicator, period)
+        if isinstance(value, list):
+            value = value[-1] if value else math.nan
+        if math.isnan(value):
+            return None
+        env[f"{indicator}_{period}"] = value
+    return env
+
+def evaluate_batch(strategies, cache: IndicatorCache) -> dict:
+    """Evaluate expression strategies on their last closed bar.
+
+    Returns {strategy id: (condition met, close, description)}; strategies
+    without data, or whose bar was already evaluated, are left out.
+    """
+    groups = defaultdict(list)
+    for strategy in strategies:
+        try:
+            plan = parse(strategy.expression)
+        except ExpressionError as e:
+            logger.error(f"Strategy {strategy.id} has an invalid expression: {e}")
+            continue
+        cache.require(strategy.symbol, strategy.interval, plan.max_period)
+        groups[(strategy.symbol, strategy.interval, plan.template)].append((strategy, plan))
+
+    results = {}
+    for (symbol, interval, template), members in groups.items():
+        closed_at = cache.last_close_time(symbol, interval)
+        if closed_at is None:
+            continue
+        members = [(s, plan) for s, plan in members if not (s.last_checked and s.last_checked >= closed_at)]
+        if not members:
+            continue
+        env = _environment(cache, symbol, interval, members[0][1].series)
+        if env is None:
+            continue
+        # One row per parameter slot, one column per strategy
+        params = np.array([plan.params for _, plan in members], dtype=float).reshape(len(members), -1).T
+        with np.errstate(all="ignore"):
+            hits = np.broadcast_to(compile_template(template)(env, params), (len(members),))
+        for (strategy, _), hit in zip(members, hits):
+            results[strategy.id] = (bool(hit), env["close"], f"{symbol} {interval} {strategy.expression} (close {env['close']:g})")
+    return results
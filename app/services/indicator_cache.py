@@ -0,0 +1,135 @@
+import os
+import math
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from app import profiling
+from app.services.indicators import compute_atr, compute_rsi, compute_stoch, detect_patterns, true_range, volume_ratio
+
+logger = logging.getLogger(__name__)
+
+# Condition types evaluated on closed klines rather than the spot price
+INDICATOR_CONDITIONS = {
+    "rsi_cross_below", "rsi_cross_above",
+    "stoch_below", "stoch_above",
+    "atr_anomaly", "volume_spike", "pattern",
+}
+PRICE_CONDITIONS = {"price_above", "price_below"}
+# Free-form rule in Strategy.expression, see app.services.expressions
+EXPRESSION_CONDITION = "expression"
+CONDITION_TYPES = PRICE_CONDITIONS | INDICATOR_CONDITIONS | {EXPRESSION_CONDITION}
+
+KLINE_INTERVALS = {"1m", "3m", "5m", "15m", "30m", "1h", "2h", "4h", "6h", "8h", "12h", "1d"}
+MIN_INDICATOR_PERIOD, MAX_INDICATOR_PERIOD = 2, 200
+
+# Bars fetched per (symbol, interval): enough history for Wilder smoothing to settle
+KLINE_HISTORY = int(os.getenv("INDICATOR_KLINE_HISTORY", "200"))
+STOCH_D, STOCH_SMOOTH = 3, 3
+
+# Which series each condition reads
+_INDICATOR_FOR = {
+    "rsi_cross_below": "rsi", "rsi_cross_above": "rsi",
+    "stoch_below": "stoch", "stoch_above": "stoch",
+    "atr_anomaly": "atr", "volume_spike": "volume", "pattern": "pattern",
+}
+
+class IndicatorCache:
+    """Per-tick cache of klines and indicator series.
+
+    Klines are fetched once per (symbol, interval) and each series is
+    computed once per (symbol, interval, indicator, period), so the work
+    grows with distinct keys rather than with the number of strategies.
+    """
+
+    def __init__(self, strategies=()):
+        self._klines: Dict[Tuple[str, str], list] = {}
+        self._series: Dict[Tuple[str, str, str, int], object] = {}
+        # Size each kline request for the longest period that needs it
+        self._limits: Dict[Tuple[str, str], int] = {}
+        for s in strategies:
+            if s.condition_type in INDICATOR_CONDITIONS:
+                self.require(s.symbol, s.interval, s.indicator_period)
+
+    def require(self, symbol: str, interval: str, period: int):
+        """Make sure klines fetched for (symbol, interval) cover this period"""
+        key = (symbol, interval)
+        self._limits[key] = max(self._limits.get(key, 0), self._history(period))
+
+    @staticmethod
+    def _history(period: int) -> int:
+        return min(1000, max(KLINE_HISTORY, period * 3 + STOCH_D + STOCH_SMOOTH + 2))
+
+    def klines(self, symbol: str, interval: str) -> list:
+        key = (symbol, interval)
+        if key not in self._klines:
+            limit = self._limits.get(key, KLINE_HISTORY)
+            # Imported here so the API, which only needs the constants above, skips aiohttp
+            from app.services import binance_service
+            with profiling.timer("fetch"):
+                self._klines[key] = binance_service.get_binance_klines(symbol, interval, limit) or []
+        return self._klines[key]
+
+    def series(self, symbol: str, interval: str, indicator: str, period: int):
+        key = (symbol, interval, indicator, period)
+        if key not in self._series:
+            self._series[key] = self._compute(self.klines(symbol, interval), indicator, period)
+        return self._series[key]
+
+    @staticmethod
+    def _compute(candles: list, indicator: str, period: int):
+        closes = [c["close"] for c in candles]
+        highs = [c["high"] for c in candles]
+        lows = [c["low"] for c in candles]
+        if indicator == "rsi":
+            return compute_rsi(closes, period)
+        if indicator == "stoch":
+            return compute_stoch(highs, lows, closes, period, STOCH_D, STOCH_SMOOTH)[0]
+        if indicator == "atr":
+            # Last bar's true range against the ATR as of the bar before it
+            atr = compute_atr(highs, lows, closes, period)
+            if len(candles) < 2 or math.isnan(atr[-2]) or atr[-2] <= 0:
+                return math.nan
+            return true_range(highs[-1], lows[-1], closes[-2]) / atr[-2]
+        if indicator == "volume":
+            return volume_ratio([c["volume"] for c in candles], period)
+        if indicator == "pattern":
+            return detect_patterns(candles)
+        raise ValueError(f"Unknown indicator {indicator}")
+
+    def last_close_time(self, symbol: str, interval: str) -> Optional[datetime]:
+        candles = self.klines(symbol, interval)
+        return datetime.utcfromtimestamp(candles[-1]["close_ts"] / 1000) if candles else None
+
+    def evaluate(self, strategy) -> Optional[Tuple[bool, float, str]]:
+        """(condition met, trigger value, description) on the last closed bar.
+
+        Returns None when there is no data or the bar was already evaluated
+        at the strategy's previous check, so a bar fires at most once.
+        """
+        closed_at = self.last_close_time(strategy.symbol, strategy.interval)
+        if closed_at is None or (strategy.last_checked and strategy.last_checked >= closed_at):
+            return None
+        ctype, value, period = strategy.condition_type, strategy.condition_value, strategy.indicator_period
+        data = self.series(strategy.symbol, strategy.interval, _INDICATOR_FOR[ctype], period)
+        label = f"{strategy.symbol} {strategy.interval}"
+
+        if ctype == "pattern":
+            return (bool(data), float(len(data or [])), f"{label} pattern(s): {', '.join(data or [])}")
+        if ctype in ("atr_anomaly", "volume_spike"):
+            if math.isnan(data):
+                return None
+            name = "ATR anomaly" if ctype == "atr_anomaly" else "volume spike"
+            return (data >= value, data, f"{label} {name} x{data:.2f} (threshold x{value:g})")
+
+        if len(data) < 2 or math.isnan(data[-1]):
+            return None
+        last, prev = data[-1], data[-2]
+        if ctype == "rsi_cross_below":
+            return (not math.isnan(prev) and prev >= value and last < value, last,
+                    f"{label} RSI({period}) crossed below {value:g}: {last:.2f}")
+        if ctype == "rsi_cross_above":
+            return (not math.isnan(prev) and prev <= value and last > value, last,
+                    f"{label} RSI({period}) crossed above {value:g}: {last:.2f}")
+        if ctype == "stoch_below":
+            return (last < value, last, f"{label} Stoch %K({period}) below {value:g}: {last:.2f}")
+        return (last > value, last, f"{label} Stoch %K({period}) above {value:g}: {last:.2f}")
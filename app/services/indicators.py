@@ -0,0 +1,82 @@
+import math
+
+# Pure indicator functions shared by the scanner scripts and the strategy
+# checker. Candles are dicts with ts/open/high/low/close/volume.
+
+def compute_rsi(close, period=14):
+    n = len(close)
+    if n < period + 1: return [math.nan]*n
+    gains=[0.0]; losses=[0.0]
+    for i in range(1,n):
+        ch=close[i]-close[i-1]
+        gains.append(max(ch,0.0)); losses.append(max(-ch,0.0))
+    ag=sum(gains[1:period+1])/period; al=sum(losses[1:period+1])/period
+    rsi=[math.nan]*period
+    rsi.append(100.0 if al==0 else 100.0 - (100.0/(1.0+ag/al)))
+    for i in range(period+1,n):
+        ag=(ag*(period-1)+gains[i])/period
+        al=(al*(period-1)+losses[i])/period
+        rsi.append(100.0 if al==0 else 100.0 - (100.0/(1.0+ag/al)))
+    return rsi
+
+def compute_stoch(h,l,c,k=14,d=3,s=3):
+    n=len(c)
+    if n<k: return [math.nan]*n, [math.nan]*n
+    raw=[math.nan]*n
+    for i in range(k-1,n):
+        hh=max(h[i-k+1:i+1]); ll=min(l[i-k+1:i+1])
+        raw[i]=50.0 if hh==ll else (c[i]-ll)/(hh-ll)*100.0
+    ksm=[math.nan]*n
+    for i in range(k-1+s-1,n):
+        ksm[i]=sum(raw[i-s+1:i+1])/s
+    dsm=[math.nan]*n
+    for i in range(k-1+s-1+d-1,n):
+        dsm[i]=sum(ksm[i-d+1:i+1])/d
+    return ksm,dsm
+
+def true_range(h,l,prev_close): return max(h-l, abs(h-prev_close), abs(l-prev_close))
+def compute_atr(h,l,c,period):
+    n=len(c)
+    if n<period+1: return [math.nan]*n
+    trs=[math.nan]+[true_range(h[i],l[i],c[i-1]) for i in range(1,n)]
+    atr=[math.nan]*period
+    atr.append(sum(trs[1:period+1])/period)
+    for i in range(period+1,n):
+        atr.append((atr[-1]*(period-1)+trs[i])/period)
+    return atr
+
+def three_touches(binary_series, lookback, spacing):
+    idxs=[i for i,v in enumerate(binary_series[-lookback:]) if v]
+    if len(idxs)<3: return False
+    cnt,last=1,idxs[0]
+    for i in idxs[1:]:
+        if i-last>=spacing:
+            cnt+=1; last=i
+            if cnt>=3: return True
+    return False
+
+def volume_ratio(volumes, window):
+    """Last volume over the average of the `window` volumes before it"""
+    prev = volumes[-(window+1):-1]
+    if len(volumes) < 2 or not prev: return math.nan
+    avg = sum(prev)/len(prev)
+    return volumes[-1]/avg if avg > 0 else math.nan
+
+def detect_patterns(candles):
+    if len(candles)<4: return None
+    c2,c3,c4 = candles[-3],candles[-2],candles[-1]
+    out=[]
+    body=lambda c: abs(c["close"]-c["open"])
+    rng=lambda c: c["high"]-c["low"]
+    if rng(c4)>0 and body(c4)/rng(c4) < 0.1:
+        out.append("Doji")
+    if c3["close"]<c3["open"] and c4["close"]>c4["open"] and c4["close"]>c3["open"] and c4["open"]<c3["close"]:
+        out.append("Bullish Engulfing")
+    if c3["close"]>c3["open"] and c4["close"]<c4["open"] and c4["close"]<c3["open"] and c4["open"]>c3["close"]:
+        out.append("Bearish Engulfing")
+    if all(c["close"]>c["open"] for c in [c2,c3,c4]):
+        out.append("Three White Soldiers")
+    if all(c["close"]<c["open"] for c in [c2,c3,c4]):
+        out.append("Three Black Crows")
+    return out if out else None
+
@@ -0,0 +1,28 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+# One background event loop per process, for async clients used from sync code
+# (Celery tasks, sync endpoints). Re-created after fork.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+_lock = threading.Lock()
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_pid
+    with _lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            threading.Thread(target=_loop.run_forever, name="async-loop", daemon=True).start()
+        return _loop
+
+def submit(coro) -> Future:
+    """Schedule a coroutine on the background loop and return a concurrent Future"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+def run(coro, timeout: Optional[float] = None):
+    """Run a coroutine on the background loop and wait for its result"""
+    return submit(coro).result(timeout)
@@ -0,0 +1,58 @@
+import os
+import time
+import threading
+import logging
+from typing import Dict, Optional, Tuple
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+PRICE_CACHE_KEY = "prices:binance"
+PRICE_MAX_AGE_SEC = float(os.getenv("PRICE_MAX_AGE_SEC", "5"))
+
+# In-process store used when Redis is not configured. Only readers in the
+# feeding process see it: a separate checker process falls back to REST.
+_local_prices: Dict[str, Tuple[float, float]] = {}
+_local_lock = threading.Lock()
+
+def _encode(price: float, ts: float) -> str:
+    return f"{price}|{ts}"
+
+def _decode(raw: str) -> Tuple[float, float]:
+    price, ts = raw.split("|", 1)
+    return float(price), float(ts)
+
+def set_prices(prices: Dict[str, float], ts: Optional[float] = None):
+    """Store latest prices; ts is the exchange event time in seconds"""
+    if not prices:
+        return
+    ts = ts or time.time()
+    r = get_redis()
+    if r is not None:
+        r.hset(PRICE_CACHE_KEY, mapping={s.upper(): _encode(p, ts) for s, p in prices.items()})
+    else:
+        with _local_lock:
+            for s, p in prices.items():
+                _local_prices[s.upper()] = (p, ts)
+
+def get_cached_price(symbol: str, max_age: float = PRICE_MAX_AGE_SEC) -> Optional[float]:
+    """Latest cached price, or None when missing or older than max_age seconds"""
+    symbol = symbol.upper()
+    r = get_redis()
+    if r is not None:
+        try:
+            raw = r.hget(PRICE_CACHE_KEY, symbol)
+        except Exception as e:
+            logger.error(f"Error reading cached price for {symbol}: {e}")
+            return None
+        if raw is None:
+            return None
+        price, ts = _decode(raw)
+    else:
+        entry = _local_prices.get(symbol)
+        if entry is None:
+            return None
+        price, ts = entry
+    if time.time() - ts > max_age:
+        return None
+    return price
@@ -0,0 +1,83 @@
+"""Long-running Binance price feeder.
+
+Subscribes to the all-market mini ticker stream (or per-symbol streams when
+PRICE_FEED_SYMBOLS is set) and writes the latest prices into the shared
+price cache read by binance_service.get_binance_price.
+
+The cache is shared through Redis; without it the prices stay in this
+process, where the checker cannot see them, so the standalone feeder
+refuses to start.
+
+Run with: python -m app.services.price_feeder
+"""
+import os
+import sys
+import json
+import asyncio
+import logging
+from typing import Dict, List, Optional
+import websockets
+from dotenv import load_dotenv
+from app.services import price_cache
+from app.services.redis_client import redis_enabled
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BINANCE_WS_URL = os.getenv("BINANCE_WS_URL", "wss://stream.binance.com:9443")
+PRICE_FEED_SYMBOLS = [s.strip().lower() for s in os.getenv("PRICE_FEED_SYMBOLS", "").split(",") if s.strip()]
+RECONNECT_MAX_SEC = 30
+
+def stream_url(symbols: Optional[List[str]] = None) -> str:
+    if symbols:
+        streams = "/".join(f"{s.lower()}@miniTicker" for s in symbols)
+        return f"{BINANCE_WS_URL}/stream?streams={streams}"
+    return f"{BINANCE_WS_URL}/ws/!miniTicker@arr"
+
+def parse_tickers(raw: str) -> Dict[str, tuple]:
+    """Map symbol -> (close price, event time in seconds) from a stream message"""
+    data = json.loads(raw)
+    if isinstance(data, dict) and "data" in data:
+        data = data["data"]
+    if isinstance(data, dict):
+        data = [data]
+    out = {}
+    for t in data:
+        if "s" in t and "c" in t:
+            out[t["s"]] = (float(t["c"]), t.get("E", 0) / 1000.0)
+    return out
+
+async def run_feeder(symbols: Optional[List[str]] = None, stop: Optional[asyncio.Event] = None):
+    """Keep the price cache fed, reconnecting with backoff on errors"""
+    url = stream_url(symbols)
+    backoff = 1
+    while stop is None or not stop.is_set():
+        try:
+            async with websockets.connect(url, ping_interval=20, max_size=2 ** 22) as ws:
+                logger.info(f"Price feeder connected to {url}")
+                backoff = 1
+                async for raw in ws:
+                    tickers = parse_tickers(raw)
+                    if not tickers:
+                        continue
+                    ts = max(t for _, t in tickers.values()) or None
+                    price_cache.set_prices({s: p for s, (p, _) in tickers.items()}, ts)
+                    if stop is not None and stop.is_set():
+                        break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Price feeder error: {e}; reconnecting in {backoff}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_SEC)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if not redis_enabled():
+        logger.error("Price feeder needs REDIS_URL: without Redis the checker cannot read its prices")
+        sys.exit(1)
+    try:
+        asyncio.run(run_feeder(PRICE_FEED_SYMBOLS or None))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,78 @@
+import uuid
+import asyncio
+import logging
+from typing import Optional
+from app.cache import principal_cache
+from app.services.redis_client import REDIS_URL, get_async_redis, get_redis, redis_enabled
+
+logger = logging.getLogger(__name__)
+
+# Every API process drops its cached principal when a user id is published
+# here, so a deactivated user is refused by all workers at once rather than
+# after PRINCIPAL_CACHE_TTL.
+INVALIDATE_CHANNEL = "principals:invalidate"
+
+def invalidate(user_id) -> None:
+    """Drop a user's cached principal in this process and broadcast it (sync callers)"""
+    principal_cache.invalidate(user_id)
+    r = get_redis()
+    if r is not None:
+        try:
+            r.publish(INVALIDATE_CHANNEL, str(user_id))
+        except Exception as e:
+            logger.error(f"Error broadcasting principal invalidation for {user_id}: {e}")
+
+async def ainvalidate(user_id) -> None:
+    principal_cache.invalidate(user_id)
+    r = get_async_redis()
+    if r is not None:
+        try:
+            await r.publish(INVALIDATE_CHANNEL, str(user_id))
+        except Exception as e:
+            logger.error(f"Error broadcasting principal invalidation for {user_id}: {e}")
+
+class InvalidationListener:
+    """Applies invalidations published by other processes to this process's cache"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+        while True:
+            client = aioredis.Redis.from_url(REDIS_URL, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATE_CHANNEL)
+                # Invalidations published while not subscribed are lost: start clean
+                principal_cache.clear()
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        principal_cache.invalidate(uuid.UUID(message["data"]))
+                    except ValueError:
+                        continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Principal invalidation subscription error: {e}; resubscribing")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+                await client.close()
+
+    async def start(self):
+        if redis_enabled() and self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+listener = InvalidationListener()
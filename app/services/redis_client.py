@@ -0,0 +1,42 @@
+import os
+import logging
+from typing import TYPE_CHECKING, Optional
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    import redis
+    import redis.asyncio
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+_client = None
+
+def redis_enabled() -> bool:
+    """Redis is optional: an empty URL or the in-memory broker means single-process mode"""
+    return bool(REDIS_URL) and not REDIS_URL.startswith("memory://")
+
+def get_redis() -> Optional["redis.Redis"]:
+    """Shared Redis client, or None when running without Redis"""
+    global _client
+    if not redis_enabled():
+        return None
+    if _client is None:
+        import redis
+        _client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+    return _client
+
+_async_client = None
+
+def get_async_redis() -> Optional["redis.asyncio.Redis"]:
+    """Shared asyncio Redis client for the API process, or None without Redis"""
+    global _async_client
+    if not redis_enabled():
+        return None
+    if _async_client is None:
+        import redis.asyncio as aioredis
+        _async_client = aioredis.Redis.from_url(REDIS_URL, decode_responses=True)
+    return _async_client
@@ -0,0 +1,125 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app import models
+from app.database import SessionLocal
+from app.services.indicator_cache import INDICATOR_CONDITIONS
+
+logger = logging.getLogger(__name__)
+
+# How often the scanner re-reads active strategies
+SCANNER_REFRESH_SEC = float(os.getenv("SCANNER_REFRESH_SEC", "30"))
+# Strategy sources the scanner's Bybit feed stands in for; their symbols are
+# checked against Bybit's instrument list before a stream is started
+SCANNER_SOURCES = {s.strip().lower() for s in os.getenv("SCANNER_SOURCES", "bybit,binance").split(",") if s.strip()}
+# Price and expression strategies are checked by the API workers; the scanner
+# only serves conditions on closed klines
+SCANNER_CONDITIONS = INDICATOR_CONDITIONS
+# How long the exchange's symbol list is trusted
+SCANNER_SYMBOLS_TTL_SEC = float(os.getenv("SCANNER_SYMBOLS_TTL_SEC", "3600"))
+
+# Strategy.interval (Binance notation) -> Bybit kline interval; 8h has no Bybit equivalent
+BYBIT_INTERVALS = {
+    "1m": "1", "3m": "3", "5m": "5", "15m": "15", "30m": "30",
+    "1h": "60", "2h": "120", "4h": "240", "6h": "360", "12h": "720", "1d": "D",
+}
+
+Stream = Tuple[str, str]
+
+def load_streams(db: Session) -> Dict[Stream, int]:
+    """Distinct (symbol, Bybit interval) streams of active scanner strategies with their subscriber counts"""
+    rows = db.query(
+        models.Strategy.symbol, models.Strategy.interval, models.Strategy.source, func.count(models.Strategy.id)
+    ).filter(
+        models.Strategy.is_active == True,
+        models.Strategy.condition_type.in_(SCANNER_CONDITIONS),
+    ).group_by(
+        models.Strategy.symbol, models.Strategy.interval, models.Strategy.source
+    ).all()
+    streams: Dict[Stream, int] = {}
+    for symbol, interval, source, count in rows:
+        tf = BYBIT_INTERVALS.get(interval)
+        if tf is None or (source or "").lower() not in SCANNER_SOURCES:
+            continue
+        key = (symbol.upper(), tf)
+        streams[key] = streams.get(key, 0) + count
+    return streams
+
+class SymbolDirectory:
+    """Symbols the exchange lists, re-read every SCANNER_SYMBOLS_TTL_SEC"""
+
+    def __init__(self, fetch: Callable[[], Awaitable[Set[str]]], ttl: float = SCANNER_SYMBOLS_TTL_SEC):
+        self._fetch = fetch
+        self.ttl = ttl
+        self._symbols: Optional[Set[str]] = None
+        self._fetched = 0.0
+
+    async def get(self) -> Optional[Set[str]]:
+        """The listed symbols, or None if they were never fetched successfully"""
+        if self._symbols is None or time.monotonic() - self._fetched >= self.ttl:
+            try:
+                self._symbols = set(await self._fetch())
+                self._fetched = time.monotonic()
+            except Exception as e:
+                # Keep the previous list; retried on the next refresh
+                logger.error(f"Error fetching exchange symbols: {e}")
+        return self._symbols
+
+class SubscriptionRegistry:
+    """The scanner's set of streams: static ones plus those derived from active strategies.
+
+    Any number of strategies on the same (symbol, interval) map to one
+    stream; refresh() reports which streams appeared and disappeared so the
+    scanner can start and stop workers without a restart. With `listed`,
+    derived streams on symbols the exchange does not list are left out;
+    while the list is unavailable only already running streams are kept.
+    """
+
+    def __init__(self, static: Iterable[Stream] = (),
+                 listed: Optional[Callable[[], Awaitable[Optional[Set[str]]]]] = None):
+        self.static = set(static)
+        self.streams: Dict[Stream, int] = {key: 0 for key in self.static}
+        self.listed = listed
+        self.unlisted: Set[str] = set()
+
+    def apply(self, live: Dict[Stream, int], listed: Optional[Set[str]] = None) -> Tuple[List[Stream], List[Stream]]:
+        if self.listed is not None:
+            live = self._validate(live, listed)
+        streams = dict(live)
+        for key in self.static:
+            streams.setdefault(key, 0)
+        added = sorted(streams.keys() - self.streams.keys())
+        removed = sorted(self.streams.keys() - streams.keys())
+        self.streams = streams
+        if added or removed:
+            logger.info(f"Scanner streams: +{len(added)} -{len(removed)}, {len(streams)} total")
+        return added, removed
+
+    def _validate(self, live: Dict[Stream, int], listed: Optional[Set[str]]) -> Dict[Stream, int]:
+        if listed is None:
+            return {key: n for key, n in live.items() if key in self.static or key in self.streams}
+        unlisted = {key[0] for key in live if key not in self.static and key[0] not in listed}
+        if unlisted - self.unlisted:
+            logger.warning(f"Scanner skips strategies on unlisted symbols: {', '.join(sorted(unlisted - self.unlisted))}")
+        self.unlisted = unlisted
+        return {key: n for key, n in live.items() if key in self.static or key[0] in listed}
+
+    def load(self) -> Dict[Stream, int]:
+        db = SessionLocal()
+        try:
+            return load_streams(db)
+        finally:
+            db.close()
+
+    def refresh(self, listed: Optional[Set[str]] = None) -> Tuple[List[Stream], List[Stream]]:
+        return self.apply(self.load(), listed)
+
+    async def arefresh(self) -> Tuple[List[Stream], List[Stream]]:
+        live = await asyncio.to_thread(self.load)
+        # The exchange is only asked once a strategy wants a stream beyond the static ones
+        listed = await self.listed() if self.listed is not None and live.keys() - self.static else None
+        return self.apply(live, listed)
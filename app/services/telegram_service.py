@@ -0,0 +1,227 @@
+import asyncio
+import httpx
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from app.services import loop_thread
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_SEND_CONCURRENCY = int(os.getenv("TELEGRAM_SEND_CONCURRENCY", "8"))
+TELEGRAM_QUEUE_SIZE = int(os.getenv("TELEGRAM_QUEUE_SIZE", "5000"))
+TELEGRAM_COALESCE_SEC = float(os.getenv("TELEGRAM_COALESCE_SEC", "1.0"))
+TELEGRAM_CHAT_INTERVAL_SEC = float(os.getenv("TELEGRAM_CHAT_INTERVAL_SEC", "1.0"))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+# Per-chat rate-limit state is dropped once a chat has been idle this long
+TELEGRAM_CHAT_IDLE_SEC = float(os.getenv("TELEGRAM_CHAT_IDLE_SEC", "300"))
+# How long a stopping worker process waits for queued messages to go out
+TELEGRAM_SHUTDOWN_TIMEOUT_SEC = float(os.getenv("TELEGRAM_SHUTDOWN_TIMEOUT_SEC", "10"))
+TELEGRAM_MAX_TEXT = 4096
+
+class TelegramDispatcher:
+    """Queued Telegram sender running on the background event loop.
+
+    Messages to the same chat within the coalesce window are merged into one,
+    each chat is limited to one send per chat interval, and 429 responses are
+    retried after the returned retry_after. The queue lives in process
+    memory: call shutdown() before the process exits to send what is left.
+    """
+
+    def __init__(self, concurrency: int = TELEGRAM_SEND_CONCURRENCY, queue_size: int = TELEGRAM_QUEUE_SIZE,
+                 coalesce_sec: float = TELEGRAM_COALESCE_SEC, chat_interval_sec: float = TELEGRAM_CHAT_INTERVAL_SEC):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.coalesce_sec = coalesce_sec
+        self.chat_interval_sec = chat_interval_sec
+        self._backlog = 0
+        self._backlog_lock = threading.Lock()
+        self._pending: Dict[str, List[str]] = {}
+        self._next_send: Dict[str, float] = {}
+        self._chat_locks: Dict[str, asyncio.Lock] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._started = False
+        self.stats = {"queued": 0, "dropped": 0, "sent": 0, "failed": 0, "retried": 0}
+
+    def _bot_url(self, method: str) -> Optional[str]:
+        bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
+        if not bot_token:
+            logger.error("TELEGRAM_BOT_TOKEN not set")
+            return None
+        return f"{TELEGRAM_API_URL}/bot{bot_token}/{method}"
+
+    def _ensure_started(self):
+        # Runs on the loop thread
+        if self._started:
+            return
+        self._queue = asyncio.Queue()
+        self._client = httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+        )
+        loop = asyncio.get_running_loop()
+        for _ in range(self.concurrency):
+            loop.create_task(self._worker())
+        loop.create_task(self._prune_idle_chats())
+        self._started = True
+
+    def enqueue(self, chat_id: str, message: str) -> bool:
+        """Queue a message without blocking; False when the queue is full"""
+        if not chat_id:
+            logger.error("Chat ID not provided")
+            return False
+        with self._backlog_lock:
+            if self._backlog >= self.queue_size:
+                self.stats["dropped"] += 1
+                logger.warning(f"Telegram queue full, dropping message for chat {chat_id}")
+                return False
+            self._backlog += 1
+            self.stats["queued"] += 1
+        loop_thread.get_loop().call_soon_threadsafe(self._add, str(chat_id), message)
+        return True
+
+    def _add(self, chat_id: str, message: str):
+        self._ensure_started()
+        if chat_id in self._pending:
+            self._pending[chat_id].append(message)
+            return
+        self._pending[chat_id] = [message]
+        asyncio.get_running_loop().call_later(self.coalesce_sec, self._flush, chat_id)
+
+    def _flush(self, chat_id: str):
+        messages = self._pending.pop(chat_id, [])
+        for text in _join_messages(messages):
+            self._queue.put_nowait((chat_id, text))
+        self._release(len(messages))
+
+    def _release(self, n: int):
+        with self._backlog_lock:
+            self._backlog -= n
+
+    async def _worker(self):
+        while True:
+            chat_id, text = await self._queue.get()
+            try:
+                if await self._send_with_retry(chat_id, text):
+                    self.stats["sent"] += 1
+                else:
+                    self.stats["failed"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Error sending Telegram message: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _prune_idle_chats(self):
+        while True:
+            await asyncio.sleep(TELEGRAM_CHAT_IDLE_SEC)
+            cutoff = time.monotonic() - TELEGRAM_CHAT_IDLE_SEC
+            for chat_id in [c for c, t in self._next_send.items() if t < cutoff]:
+                lock = self._chat_locks.get(chat_id)
+                if chat_id not in self._pending and (lock is None or not lock.locked()):
+                    self._next_send.pop(chat_id, None)
+                    self._chat_locks.pop(chat_id, None)
+
+    async def _send_with_retry(self, chat_id: str, text: str) -> bool:
+        url = self._bot_url("sendMessage")
+        if url is None:
+            return False
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": "HTML"}
+        for attempt in range(TELEGRAM_MAX_RETRIES + 1):
+            async with self._chat_locks.setdefault(chat_id, asyncio.Lock()):
+                wait = self._next_send.get(chat_id, 0.0) - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_send[chat_id] = time.monotonic() + self.chat_interval_sec
+                try:
+                    response = await self._client.post(url, json=payload)
+                except httpx.HTTPError as e:
+                    logger.warning(f"Telegram request failed (attempt {attempt + 1}): {e}")
+                    response = None
+                if response is not None:
+                    if response.status_code == 200:
+                        return True
+                    if response.status_code == 429:
+                        try:
+                            retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+                        except ValueError:
+                            retry_after = 1
+                        # Keep the chat blocked so other sends to it also wait
+                        self._next_send[chat_id] = time.monotonic() + retry_after
+                        self.stats["retried"] += 1
+                        continue
+                    if response.status_code < 500:
+                        logger.error(f"Telegram rejected message for chat {chat_id}: {response.status_code} {response.text}")
+                        return False
+            self.stats["retried"] += 1
+            await asyncio.sleep(min(2 ** attempt, 30) * (0.5 + random.random()))
+        return False
+
+    async def _send_now(self, chat_id: str, message: str) -> bool:
+        self._ensure_started()
+        return await self._send_with_retry(chat_id, message)
+
+    async def _join(self):
+        while self._pending:
+            await asyncio.sleep(self.coalesce_sec / 2 or 0.01)
+        if self._queue is not None:
+            await self._queue.join()
+
+    def drain(self, timeout: Optional[float] = None):
+        """Wait until every queued message has been sent or given up on"""
+        loop_thread.run(self._join(), timeout)
+
+    async def _flush_all(self):
+        for chat_id in list(self._pending):
+            self._flush(chat_id)
+        await self._join()
+
+    def shutdown(self, timeout: float = TELEGRAM_SHUTDOWN_TIMEOUT_SEC):
+        """Send coalescing and queued messages now, waiting up to timeout"""
+        with self._backlog_lock:
+            idle = not self._backlog
+        if idle and (self._queue is None or self._queue.empty()):
+            return
+        try:
+            loop_thread.run(self._flush_all(), timeout)
+        except Exception as e:
+            left = self._backlog + (self._queue.qsize() if self._queue is not None else 0)
+            logger.error(f"Telegram dispatcher stopped with {left} messages undelivered: {e!r}")
+
+def _join_messages(messages: List[str]) -> List[str]:
+    """Merge messages into as few texts as fit Telegram's length limit"""
+    out, current = [], ""
+    for m in messages:
+        candidate = f"{current}\n\n{m}" if current else m
+        if len(candidate) > TELEGRAM_MAX_TEXT and current:
+            out.append(current)
+            current = m
+        else:
+            current = candidate
+    if current:
+        out.append(current)
+    return out
+
+dispatcher = TelegramDispatcher()
+
+def queue_telegram_message(chat_id: str, message: str) -> bool:
+    """Queue message for coalesced, rate-limited delivery without blocking"""
+    return dispatcher.enqueue(chat_id, message)
+
+def send_telegram_message(chat_id: str, message: str) -> bool:
+    """Send message to Telegram chat"""
+    if not chat_id:
+        logger.error("Chat ID not provided")
+        return False
+    try:
+        return loop_thread.run(dispatcher._send_now(str(chat_id), message), timeout=60)
+    except Exception as e:
+        logger.error(f"Error sending Telegram message: {e}")
+        return False
@@ -0,0 +1,213 @@
+import os
+import time
+import zlib
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+from sqlalchemy import update
+from app import models
+from app.services.redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+# A strategy fires when its condition becomes true while armed, then stays
+# fired (no alert rows, no messages) until it re-arms:
+#   edge  - re-arms once the condition is false again, beyond the
+#           hysteresis band for price conditions, and rearm_after_sec
+#           after firing at the earliest
+#   once  - never re-arms on its own; editing or toggling the strategy re-arms it
+#   level - fires on every check while the condition holds (the old behaviour)
+EDGE, ONCE, LEVEL = "edge", "once", "level"
+TRIGGER_MODES = {EDGE, ONCE, LEVEL}
+ARMED, FIRED = "armed", "fired"
+
+TRIGGER_STATE_KEY = "trigger:state"
+# With Redis the hash is authoritative and rows are updated at most this
+# often; without it every tick's changes go to the rows at once
+TRIGGER_PERSIST_SEC = float(os.getenv("TRIGGER_PERSIST_SEC", "60"))
+# Upper bound on the hysteresis band, in percent of condition_value
+MAX_HYSTERESIS_PCT = float(os.getenv("MAX_HYSTERESIS_PCT", "50"))
+
+class TriggerState(NamedTuple):
+    state: str = ARMED
+    fired_at: Optional[float] = None
+
+def fingerprint(strategy) -> str:
+    """Changes whenever the condition does, so state kept for an older condition is ignored"""
+    key = (strategy.condition_type, strategy.condition_value, strategy.expression, strategy.interval,
+           strategy.indicator_period, strategy.trigger_mode, strategy.hysteresis_pct)
+    return format(zlib.crc32(repr(key).encode()), "08x")
+
+def _encode(state: TriggerState, fp: str) -> str:
+    return f"{state.state[0]}:{'' if state.fired_at is None else int(state.fired_at)}:{fp}"
+
+def _decode(raw, fp: str) -> Optional[TriggerState]:
+    if not raw:
+        return None
+    if isinstance(raw, bytes):
+        raw = raw.decode()
+    code, fired_at, stored_fp = raw.split(":")
+    if stored_fp != fp:
+        return None
+    return TriggerState(FIRED if code == "f" else ARMED, float(fired_at) if fired_at else None)
+
+def _rearm_ready(strategy, value: Optional[float]) -> bool:
+    """Whether the value has left the hysteresis band on the far side of the threshold"""
+    band = strategy.condition_value * (strategy.hysteresis_pct or 0.0) / 100
+    if value is None or not band:
+        return True
+    if strategy.condition_type == "price_above":
+        return value <= strategy.condition_value - band
+    if strategy.condition_type == "price_below":
+        return value >= strategy.condition_value + band
+    return True
+
+def step(strategy, state: TriggerState, met: bool, value: Optional[float], now: float) -> Tuple[bool, TriggerState]:
+    """(fire now, next state) for one check of the strategy's condition"""
+    mode = strategy.trigger_mode or EDGE
+    if mode == LEVEL:
+        return met, state
+    if state.state == ARMED:
+        return (True, TriggerState(FIRED, now)) if met else (False, state)
+    if mode == ONCE or met or not _rearm_ready(strategy, value):
+        return False, state
+    if state.fired_at is not None and now - state.fired_at < (strategy.rearm_after_sec or 0):
+        return False, state
+    return False, TriggerState(ARMED, state.fired_at)
+
+class TriggerStore:
+    """Trigger state of all strategies as one compact hash, written back to strategies in batches.
+
+    The hash (Redis, or this process without it) is what the checker reads
+    each tick; a value is "<a|f>:<fired epoch>:<condition fingerprint>".
+    Changed states are also queued and written to the strategy rows'
+    trigger_state/triggered_at with one statement per TRIGGER_PERSIST_SEC;
+    the rows are used when the hash has no current entry (Redis flushed,
+    or no Redis and a restarted worker). A firing is instead committed
+    with its alert and put in the hash at once (store()), so a tick that
+    fails later cannot send it again. Editing or toggling a strategy
+    resets its row and drops its entry here.
+    """
+
+    def __init__(self, key: str = TRIGGER_STATE_KEY, persist_sec: float = TRIGGER_PERSIST_SEC):
+        self.key = key
+        self.persist_sec = persist_sec
+        self._local: Dict[str, str] = {}
+        self._pending: Dict[object, TriggerState] = {}
+        self._last_persist = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, strategies) -> Dict:
+        strategies = list(strategies)
+        if not strategies:
+            return {}
+        fields = [str(s.id) for s in strategies]
+        raw = None
+        r = get_redis()
+        if r is not None:
+            try:
+                raw = r.hmget(self.key, fields)
+            except Exception as e:
+                logger.error(f"Error loading trigger state: {e}")
+        if raw is None:
+            with self._lock:
+                raw = [self._local.get(f) for f in fields]
+        states = {}
+        for strategy, value in zip(strategies, raw):
+            state = _decode(value, fingerprint(strategy))
+            if state is None:
+                fired_at = strategy.triggered_at.timestamp() if strategy.triggered_at else None
+                state = TriggerState(strategy.trigger_state or ARMED, fired_at)
+            states[strategy.id] = state
+        return states
+
+    def _write(self, changes: Dict[object, Tuple[TriggerState, str]]) -> bool:
+        """Put states in the hash; False if Redis is configured but failed"""
+        mapping = {str(sid): _encode(state, fp) for sid, (state, fp) in changes.items()}
+        r = get_redis()
+        if r is None:
+            with self._lock:
+                self._local.update(mapping)
+            return True
+        try:
+            r.hset(self.key, mapping=mapping)
+            return True
+        except Exception as e:
+            logger.error(f"Error storing trigger state: {e}")
+            return False
+
+    def store(self, changes: Dict[object, Tuple[TriggerState, str]]):
+        """Put states whose rows the caller has already committed in the hash at once"""
+        if not changes:
+            return
+        self._write(changes)
+        with self._lock:
+            # A state queued earlier must not overwrite the committed row
+            for sid in changes:
+                self._pending.pop(sid, None)
+
+    def save(self, db, changes: Dict[object, Tuple[TriggerState, str]]):
+        """Store changed states (strategy id -> (state, condition fingerprint)) and persist when due"""
+        stored = get_redis() is not None
+        if changes:
+            stored = self._write(changes) and stored
+            with self._lock:
+                self._pending.update({sid: state for sid, (state, _) in changes.items()})
+        self.persist(db, force=not stored)
+
+    def persist(self, db, force: bool = False):
+        """Write queued states to the strategy rows in one statement"""
+        now = time.monotonic()
+        with self._lock:
+            if not self._pending or (not force and now - self._last_persist < self.persist_sec):
+                return
+            pending, self._pending = self._pending, {}
+            self._last_persist = now
+        try:
+            db.execute(update(models.Strategy), [
+                {"id": sid, "trigger_state": state.state,
+                 "triggered_at": datetime.utcfromtimestamp(state.fired_at) if state.fired_at is not None else None}
+                for sid, state in pending.items()
+            ])
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error persisting trigger state of {len(pending)} strategies: {e}")
+            db.rollback()
+            with self._lock:
+                self._pending = {**pending, **self._pending}
+
+    def _forget_local(self, fields):
+        with self._lock:
+            for f in fields:
+                self._local.pop(f, None)
+            for sid in list(self._pending):
+                if str(sid) in fields:
+                    del self._pending[sid]
+
+    def forget(self, strategy_ids: Iterable):
+        """Drop the state of edited or deleted strategies (sync callers)"""
+        fields = {str(sid) for sid in strategy_ids}
+        if not fields:
+            return
+        r = get_redis()
+        if r is not None:
+            try:
+                r.hdel(self.key, *fields)
+            except Exception as e:
+                logger.error(f"Error clearing trigger state: {e}")
+        self._forget_local(fields)
+
+    async def aforget(self, strategy_ids: Iterable):
+        fields = {str(sid) for sid in strategy_ids}
+        if not fields:
+            return
+        r = get_async_redis()
+        if r is not None:
+            try:
+                await r.hdel(self.key, *fields)
+            except Exception as e:
+                logger.error(f"Error clearing trigger state: {e}")
+        self._forget_local(fields)
+
+trigger_store = TriggerStore()
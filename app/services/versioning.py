@@ -0,0 +1,59 @@
+import time
+import logging
+from typing import Optional
+from app.services.redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+# Per-user version counters for cached listings ("strategies", "alerts"),
+# kept in Redis so writes from every API worker and the Celery checker
+# count. Counters start from a time-based epoch so a reset store can never
+# hand out a version a client has already seen. Without Redis there is no
+# shared counter and listings are served without an ETag.
+STRATEGIES = "strategies"
+ALERTS = "alerts"
+
+def _key(user_id) -> str:
+    return f"user_versions:{user_id}"
+
+def _epoch() -> int:
+    return time.time_ns() // 1000
+
+def bump_version(user_id, kind: str):
+    """Mark a user's listing as changed (sync writers: Celery, scripts)"""
+    r = get_redis()
+    if r is not None:
+        try:
+            pipe = r.pipeline()
+            pipe.hsetnx(_key(user_id), kind, _epoch())
+            pipe.hincrby(_key(user_id), kind, 1)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error bumping {kind} version for {user_id}: {e}")
+
+async def abump_version(user_id, kind: str):
+    r = get_async_redis()
+    if r is None:
+        return
+    try:
+        pipe = r.pipeline()
+        pipe.hsetnx(_key(user_id), kind, _epoch())
+        pipe.hincrby(_key(user_id), kind, 1)
+        await pipe.execute()
+    except Exception as e:
+        logger.error(f"Error bumping {kind} version for {user_id}: {e}")
+
+async def get_version(user_id, kind: str) -> Optional[int]:
+    """Current listing version, or None without Redis or when it is unreachable (no ETag then)"""
+    r = get_async_redis()
+    if r is None:
+        return None
+    try:
+        pipe = r.pipeline()
+        pipe.hsetnx(_key(user_id), kind, _epoch())
+        pipe.hget(_key(user_id), kind)
+        _, version = await pipe.execute()
+    except Exception as e:
+        logger.error(f"Error reading {kind} version for {user_id}: {e}")
+        return None
+    return int(version)
@@ -1,76 +1,192 @@
 from celery import Celery
+from celery.signals import worker_process_shutdown
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app import crud, models
-from app.services import binance_service, telegram_service
+from app.database import SessionLocal, get_engine
+from app import crud, models, profiling
+from app.services import alert_bus, alert_storage, binance_service, expressions, telegram_service, versioning
+from app.services.indicator_cache import EXPRESSION_CONDITION, INDICATOR_CONDITIONS, IndicatorCache
+from app.services.redis_client import REDIS_URL
+from app.services.trigger_state import fingerprint, step, trigger_store
+from app.workers.sharding import SHARD_COUNT, ShardLease, record_shard_stats, symbols_for_shard
 from datetime import datetime
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 # Create Celery instance
 celery = Celery(__name__)
-celery.conf.broker_url = "redis://localhost:6379/0"
-celery.conf.result_backend = "redis://localhost:6379/0"
+celery.conf.broker_url = REDIS_URL or "memory://"
+celery.conf.result_backend = REDIS_URL if REDIS_URL and not REDIS_URL.startswith("memory://") else None
+# SQL statement counting for tick profiles (no-op unless PROFILE_MODE is set)
+profiling.install_hooks()
 
-@celery.task(name="check_strategies")
-def check_strategies():
-    """Check all active strategies for conditions"""
-    db: Session = SessionLocal()
-    try:
-        active_strategies = db.query(models.Strategy).filter(
-            models.Strategy.is_active == True
-        ).all()
-        
-        for strategy in active_strategies:
-            # Check if it's time to check this strategy
-            if strategy.last_checked and (
-                (datetime.utcnow() - strategy.last_checked).total_seconds() < strategy.check_interval
-            ):
-                continue
-                
+def _check_strategy_batch(db: Session, strategies) -> dict:
+    """Check a batch of strategies, fetching each symbol's price once"""
+    stats = {"scanned": len(strategies), "due": 0, "checked": 0, "triggered": 0, "held": 0}
+    prices = {}
+    touched_users = set()
+    # Check if it's time to check each strategy
+    now = datetime.utcnow()
+    due = [
+        s for s in strategies
+        if not s.last_checked or (now - s.last_checked).total_seconds() >= s.check_interval
+    ]
+    stats["due"] = len(due)
+    # Armed/fired state: only a strategy that is armed when its condition holds fires
+    states = trigger_store.load(due)
+    changes = {}
+    indicators = IndicatorCache(due)
+    # Expression strategies sharing a template are evaluated together per symbol
+    expression_results = expressions.evaluate_batch(
+        [s for s in due if s.condition_type == EXPRESSION_CONDITION], indicators
+    )
+    for strategy in due:
+        condition_met = evaluated = False
+        if strategy.condition_type == EXPRESSION_CONDITION:
+            result = expression_results.get(strategy.id)
+            if result is not None:
+                stats["checked"] += 1
+                evaluated = True
+                condition_met, trigger_value, detail = result
+                message = f"🚨 Alert: {detail}"
+        elif strategy.condition_type in INDICATOR_CONDITIONS:
+            # Series are shared by every strategy on the same (symbol, interval, indicator, period)
+            result = indicators.evaluate(strategy)
+            if result is not None:
+                stats["checked"] += 1
+                evaluated = True
+                condition_met, trigger_value, detail = result
+                message = f"🚨 Alert: {detail}"
+        else:
             # Get current price
-            price = binance_service.get_binance_price(strategy.symbol)
+            if strategy.symbol not in prices:
+                with profiling.timer("fetch"):
+                    prices[strategy.symbol] = binance_service.get_binance_price(strategy.symbol)
+            price = prices[strategy.symbol]
             if price is None:
                 continue
-                
+            stats["checked"] += 1
+            evaluated = True
+
             # Check condition
-            condition_met = False
             if strategy.condition_type == "price_above" and price > strategy.condition_value:
                 condition_met = True
             elif strategy.condition_type == "price_below" and price < strategy.condition_value:
                 condition_met = True
-                
-            if condition_met:
-                # Create alert
-                message = f"🚨 Alert: {strategy.symbol} {strategy.condition_type.replace('_', ' ')} {strategy.condition_value}. Current price: {price}"
-                alert = crud.create_alert(
-                    db, 
-                    message=message, 
-                    trigger_value=price, 
-                    strategy_id=strategy.id,
-                    user_id=strategy.user_id
-                )
-                
-                # Send notifications
-                user = db.query(models.User).filter(models.User.id == strategy.user_id).first()
+            trigger_value = price
+            message = f"🚨 Alert: {strategy.symbol} {strategy.condition_type.replace('_', ' ')} {strategy.condition_value}. Current price: {price}"
+
+        fired = {}
+        if evaluated:
+            state = states[strategy.id]
+            fire, new_state = step(strategy, state, condition_met, trigger_value, time.time())
+            if new_state != state and fire:
+                # Committed with the alert row: a failure later in the tick cannot fire it twice
+                strategy.trigger_state = new_state.state
+                strategy.triggered_at = datetime.utcfromtimestamp(new_state.fired_at)
+                fired[strategy.id] = (new_state, fingerprint(strategy))
+            elif new_state != state:
+                # Re-arming is recomputed next tick if lost, so it is batched
+                changes[strategy.id] = (new_state, fingerprint(strategy))
+            if condition_met and not fire:
+                stats["held"] += 1
+            condition_met = fire
+
+        if condition_met:
+            stats["triggered"] += 1
+            # Create alert
+            alert = crud.create_alert(
+                db,
+                message=message,
+                trigger_value=trigger_value,
+                strategy_id=strategy.id,
+                user_id=strategy.user_id
+            )
+            trigger_store.store(fired)
+
+            # Send notifications
+            user = db.query(models.User).filter(models.User.id == strategy.user_id).first()
+            with profiling.timer("notify"):
                 if user and "telegram" in strategy.notification_type and user.telegram_chat_id:
-                    telegram_service.send_telegram_message(user.telegram_chat_id, message)
-                    
-                # TODO: Send WebSocket notification for web clients
-                
-            # Update last checked time
-            strategy.last_checked = datetime.utcnow()
+                    telegram_service.queue_telegram_message(user.telegram_chat_id, message)
+
+                # Push to connected web clients
+                alert_bus.publish_alert(alert)
+
+        # Update last checked time
+        strategy.last_checked = datetime.utcnow()
+        with profiling.timer("commit"):
             db.commit()
-            
+        touched_users.add(strategy.user_id)
+    with profiling.timer("commit"):
+        trigger_store.save(db, changes)
+    # last_checked (and trigger_state) is part of the strategy listing
+    for user_id in touched_users:
+        versioning.bump_version(user_id, versioning.STRATEGIES)
+    return stats
+
+@celery.task(name="check_strategies")
+def check_strategies():
+    """Fan out strategy checking into one task per shard"""
+    for shard in range(SHARD_COUNT):
+        check_strategy_shard.delay(shard)
+
+@celery.task(name="check_strategy_shard")
+def check_strategy_shard(shard: int):
+    """Check active strategies whose symbol hashes to this shard"""
+    lease = ShardLease(shard)
+    started = time.monotonic()
+    db: Session = SessionLocal()
+    try:
+        if not lease.acquire():
+            logger.info(f"Shard {shard} is still being processed, skipping")
+            return
+        with profiling.profiled(f"shard:{shard}") as profile:
+            symbols = [row[0] for row in db.query(models.Strategy.symbol).filter(
+                models.Strategy.is_active == True
+            ).distinct()]
+            shard_symbols = symbols_for_shard(symbols, shard)
+            stats = {"shard": shard, "symbols": len(shard_symbols), "scanned": 0, "due": 0, "checked": 0,
+                     "triggered": 0, "held": 0}
+            if shard_symbols:
+                active_strategies = db.query(models.Strategy).filter(
+                    models.Strategy.is_active == True,
+                    models.Strategy.symbol.in_(shard_symbols)
+                ).all()
+                stats.update(_check_strategy_batch(db, active_strategies))
+        stats["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+        if profile is not None:
+            # queries, db_ms (statement time), commit_ms, fetch_ms (prices and klines), notify_ms
+            stats.update(profile.summary())
+            profiling.record_tick(profile.name, profile, scanned=stats["scanned"], due=stats["due"],
+                                  triggered=stats["triggered"])
+        record_shard_stats(shard, stats)
+        logger.info(f"Shard {shard} checked: {stats}")
     except Exception as e:
-        logger.error(f"Error in check_strategies task: {e}")
+        logger.error(f"Error in check_strategy_shard task (shard {shard}): {e}")
         db.rollback()
     finally:
         db.close()
+        lease.release()
+
+@celery.task(name="maintain_alert_storage")
+def maintain_alert_storage():
+    """Create upcoming alert partitions, refresh rollups and apply retention"""
+    try:
+        alert_storage.maintain(get_engine())
+    except Exception as e:
+        logger.error(f"Error in maintain_alert_storage task: {e}")
+
+@worker_process_shutdown.connect
+def flush_notifications(**kwargs):
+    """Telegram messages are queued in memory; send them before a child exits or recycles"""
+    telegram_service.dispatcher.shutdown()
 
 @celery.on_after_configure.connect
 def setup_periodic_tasks(sender, **kwargs):
     """Setup periodic tasks"""
     # Check strategies every 30 seconds
     sender.add_periodic_task(30.0, check_strategies.s(), name='check-strategies-every-30s')
+    # Alert partitions, rollups and retention every 15 minutes
+    sender.add_periodic_task(900.0, maintain_alert_storage.s(), name='maintain-alert-storage-every-15m')
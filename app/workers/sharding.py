@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import uuid
+import zlib
+import threading
+import logging
+from typing import Dict, Iterable, List
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+SHARD_COUNT = int(os.getenv("CHECKER_SHARDS", "8"))
+SHARD_LEASE_SEC = int(os.getenv("CHECKER_SHARD_LEASE_SEC", "60"))
+SHARD_STATS_KEY = "checker:shard_stats"
+
+# Fallback leases for runs without Redis (tests, eager/in-memory broker)
+_local_leases: Dict[str, tuple] = {}
+_local_lock = threading.Lock()
+_local_stats: Dict[str, dict] = {}
+
+def shard_for_symbol(symbol: str, shard_count: int = SHARD_COUNT) -> int:
+    """Stable shard number for a symbol, identical across worker processes"""
+    return zlib.crc32(symbol.upper().encode()) % shard_count
+
+def symbols_for_shard(symbols: Iterable[str], shard: int, shard_count: int = SHARD_COUNT) -> List[str]:
+    return [s for s in symbols if shard_for_symbol(s, shard_count) == shard]
+
+# Compare-and-delete / compare-and-extend, so a worker never touches a
+# lease that expired and was taken over by another worker
+_RELEASE_LUA = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+_RENEW_LUA = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('expire', KEYS[1], ARGV[2]) end return 0"
+
+class ShardLease:
+    """Time-limited exclusive lease on a shard.
+
+    Overlapping beats (or a retried task) skip a shard whose previous run
+    still holds the lease. While held, a background thread extends it every
+    ttl/3, so a tick longer than the ttl keeps its shard; the lease expires
+    on its own if the worker dies.
+    """
+
+    def __init__(self, shard: int, ttl: int = SHARD_LEASE_SEC):
+        self.key = f"checker:shard_lease:{shard}"
+        self.ttl = ttl
+        self.token = uuid.uuid4().hex
+        self.acquired = False
+        self._stop = threading.Event()
+        self._renewer = None
+
+    def acquire(self) -> bool:
+        r = get_redis()
+        if r is not None:
+            self.acquired = bool(r.set(self.key, self.token, nx=True, ex=self.ttl))
+        else:
+            now = time.monotonic()
+            with _local_lock:
+                held = _local_leases.get(self.key)
+                if held and held[1] > now:
+                    return False
+                _local_leases[self.key] = (self.token, now + self.ttl)
+            self.acquired = True
+        if self.acquired:
+            self._stop.clear()
+            self._renewer = threading.Thread(target=self._keep_alive, name=f"lease:{self.key}", daemon=True)
+            self._renewer.start()
+        return self.acquired
+
+    def renew(self) -> bool:
+        """Extend the lease by ttl if it is still ours"""
+        r = get_redis()
+        if r is not None:
+            return bool(r.eval(_RENEW_LUA, 1, self.key, self.token, self.ttl))
+        with _local_lock:
+            held = _local_leases.get(self.key)
+            if not held or held[0] != self.token:
+                return False
+            _local_leases[self.key] = (self.token, time.monotonic() + self.ttl)
+        return True
+
+    def _keep_alive(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                if not self.renew():
+                    logger.warning(f"Lost lease {self.key}, another worker may process the shard")
+                    return
+            except Exception as e:
+                logger.error(f"Error renewing lease {self.key}: {e}")
+
+    def release(self):
+        if not self.acquired:
+            return
+        self._stop.set()
+        if self._renewer is not None:
+            self._renewer.join()
+            self._renewer = None
+        self.acquired = False
+        r = get_redis()
+        if r is not None:
+            try:
+                r.eval(_RELEASE_LUA, 1, self.key, self.token)
+            except Exception as e:
+                # The lease expires on its own after ttl
+                logger.error(f"Error releasing lease {self.key}: {e}")
+        else:
+            with _local_lock:
+                held = _local_leases.get(self.key)
+                if held and held[0] == self.token:
+                    del _local_leases[self.key]
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+def record_shard_stats(shard: int, stats: dict):
+    """Store the latest timing stats for a shard"""
+    stats = dict(stats, finished_at=time.time())
+    r = get_redis()
+    if r is not None:
+        try:
+            r.hset(SHARD_STATS_KEY, str(shard), json.dumps(stats))
+        except Exception as e:
+            logger.error(f"Error storing stats for shard {shard}: {e}")
+    else:
+        _local_stats[str(shard)] = stats
+
+def get_shard_stats() -> Dict[str, dict]:
+    r = get_redis()
+    if r is not None:
+        return {k: json.loads(v) for k, v in r.hgetall(SHARD_STATS_KEY).items()}
+    return dict(_local_stats)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Bybit v5 market API.
+
+Serves deterministic synthetic klines and orderbooks with configurable
+latency and error injection. Every interval closes a bar each --bar-sec
+seconds of wall clock, aligned to the epoch, so a client can tell exactly
+when a bar closed.
+
+    python -m bench.fake_exchange --port 8801 --bar-sec 5 --latency-ms 20 --error-rate 0.01
+"""
+import time
+import zlib
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+from aiohttp import web
+
+def _seed(*parts) -> int:
+    return zlib.crc32("|".join(map(str, parts)).encode())
+
+def synthetic_bar(symbol: str, interval: str, index: int, bar_ms: int, mode: str) -> list:
+    """One Bybit kline row [start, open, high, low, close, volume, turnover] for bar `index`.
+
+    "trend" makes every bar a large green candle (a Three White Soldiers
+    pattern on every close); "random" is a seeded random walk.
+    """
+    rng = random.Random(_seed(symbol, interval, index))
+    base = 10 + _seed(symbol) % 1000
+    if mode == "trend":
+        open_ = base * (1 + 0.0001 * (index % 10000))
+        close = open_ * 1.015
+    else:
+        open_ = base * (1 + 0.05 * random.Random(_seed(symbol, interval, index - 1)).uniform(-1, 1))
+        close = base * (1 + 0.05 * rng.uniform(-1, 1))
+    high = max(open_, close) * (1 + rng.uniform(0, 0.004))
+    low = min(open_, close) * (1 - rng.uniform(0, 0.004))
+    volume = 1000 + rng.uniform(0, 500)
+    return [str(index * bar_ms), f"{open_:.6f}", f"{high:.6f}", f"{low:.6f}", f"{close:.6f}", f"{volume:.3f}", f"{volume * close:.3f}"]
+
+class FakeExchange:
+    def __init__(self, bar_sec: float, latency_ms: float, jitter_ms: float, error_rate: float,
+                 rate_limit_rate: float, mode: str, seed: int):
+        self.bar_ms = int(bar_sec * 1000)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.mode = mode
+        self.rng = random.Random(seed)
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.requests = defaultdict(int)
+        self.errors = defaultdict(int)
+
+    async def _delay_or_fail(self, key: str):
+        delay = self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        self.requests[key] += 1
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            self.errors["429"] += 1
+            return web.Response(status=429, headers={"Retry-After": "1"})
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.errors["500"] += 1
+            return web.Response(status=500)
+        return None
+
+    async def kline(self, request):
+        q = request.query
+        symbol, interval = q.get("symbol", ""), q.get("interval", "")
+        failure = await self._delay_or_fail(f"kline:{symbol}:{interval}")
+        if failure is not None:
+            return failure
+        limit = min(int(q.get("limit", "200")), 1000)
+        current = int(time.time() * 1000) // self.bar_ms
+        # Newest first, including the still-forming bar, like Bybit
+        rows = [synthetic_bar(symbol, interval, i, self.bar_ms, self.mode) for i in range(current, current - limit, -1)]
+        return web.json_response({"retCode": 0, "retMsg": "OK", "result": {"symbol": symbol, "list": rows}})
+
+    async def orderbook(self, request):
+        symbol = request.query.get("symbol", "")
+        failure = await self._delay_or_fail(f"orderbook:{symbol}")
+        if failure is not None:
+            return failure
+        # Constant depth: never an orderbook anomaly
+        return web.json_response({"retCode": 0, "retMsg": "OK", "result": {
+            "s": symbol, "b": [["100.0", "10.0"]], "a": [["100.1", "10.0"]], "ts": int(time.time() * 1000)
+        }})
+
+    async def stats(self, request):
+        return web.json_response({
+            "elapsed_sec": time.time() - self.started,
+            "requests": dict(self.requests),
+            "errors": dict(self.errors),
+        })
+
+    async def do_reset(self, request):
+        self.reset()
+        return web.json_response({"ok": True})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/v5/market/kline", self.kline)
+        app.router.add_get("/v5/market/orderbook", self.orderbook)
+        app.router.add_get("/stats", self.stats)
+        app.router.add_post("/reset", self.do_reset)
+        return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8801)
+    parser.add_argument("--bar-sec", type=float, default=5.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests answered with HTTP 429")
+    parser.add_argument("--mode", choices=["trend", "random"], default="trend")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    exchange = FakeExchange(args.bar_sec, args.latency_ms, args.jitter_ms, args.error_rate,
+                            args.rate_limit_rate, args.mode, args.seed)
+    web.run_app(exchange.app(), host=args.host, port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Telegram Bot API that timestamps every message.
+
+Each caption names the close of the bar it reports, so the close-to-send
+latency of a message is its arrival time minus that close, however late
+it is. Messages later than one bar and repeated (stream, close) pairs are
+counted as such. Bars on bench.fake_exchange close on multiples of
+--bar-sec (whole seconds), so /stats also counts, for every stream that
+reported, the closes since the last reset that it never reported.
+
+    python -m bench.fake_telegram --port 8802 --bar-sec 5
+"""
+import re
+import time
+import asyncio
+import argparse
+from collections import defaultdict
+from aiohttp import web
+
+# Captions start with the symbol; each timeframe's pattern alert is its own
+# line, e.g. "<b>SOLUSDT</b> 12:00 UTC\n5m Pattern(s): Doji"
+SYMBOL_RE = re.compile(r"^(?:<b>)?([A-Z0-9]+)")
+PATTERN_LINE_RE = re.compile(r"^(?:• )?(\w+?)m (?:Pattern|Паттерны)")
+# Close time on the first line, with seconds for bars not closing on a minute
+CLOSE_RE = re.compile(r"\b(\d{2}):(\d{2})(?::(\d{2}))? UTC")
+DAY_MS = 86_400_000
+
+def close_ms(caption: str, received_ms: float):
+    """The close a caption names, on the day that puts it at or before its arrival"""
+    match = CLOSE_RE.search(caption.split("\n", 1)[0])
+    if not match:
+        return None
+    hours, minutes, seconds = int(match.group(1)), int(match.group(2)), int(match.group(3) or 0)
+    ts = received_ms // DAY_MS * DAY_MS + ((hours * 60 + minutes) * 60 + seconds) * 1000
+    # Small clock differences aside, a close after arrival belongs to the previous day
+    return ts - DAY_MS if ts > received_ms + 60_000 else ts
+
+class FakeTelegram:
+    def __init__(self, bar_sec: float, latency_ms: float):
+        self.bar_ms = bar_sec * 1000
+        self.latency_ms = latency_ms
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.messages = 0
+        self.latencies_ms = []
+        self.bars = defaultdict(set)
+        self.late = 0
+        self.duplicates = 0
+
+    async def send(self, request):
+        received_ms = time.time() * 1000
+        try:
+            form = await request.post()
+        except ConnectionResetError:
+            # Scanner stopped mid-upload at the end of a run
+            return web.Response(status=499)
+        text = form.get("caption") or form.get("text") or ""
+        self.messages += 1
+        symbol = SYMBOL_RE.match(str(text))
+        close = close_ms(str(text), received_ms)
+        for line in str(text).splitlines()[1:]:
+            match = PATTERN_LINE_RE.match(line)
+            if symbol and match and close is not None:
+                reported = self.bars[symbol.group(1), match.group(1)]
+                if close in reported:
+                    self.duplicates += 1
+                    continue
+                reported.add(close)
+                self.latencies_ms.append(received_ms - close)
+                if received_ms - close > self.bar_ms:
+                    self.late += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return web.json_response({"ok": True, "result": {"message_id": self.messages}})
+
+    def expected_closes(self, now_ms: float) -> set:
+        """Closes since the reset that every stream should have reported by now (a bar of grace)"""
+        first = int(self.started * 1000 // self.bar_ms + 1)
+        last = int((now_ms - self.bar_ms) // self.bar_ms)
+        return {i * self.bar_ms for i in range(first, last + 1)}
+
+    async def stats(self, request):
+        now_ms = time.time() * 1000
+        expected = self.expected_closes(now_ms)
+        return web.json_response({
+            "elapsed_sec": now_ms / 1000 - self.started,
+            "messages": self.messages,
+            "latencies_ms": self.latencies_ms,
+            "streams": len(self.bars),
+            "bars_reported": sum(len(v) for v in self.bars.values()),
+            "closes_expected": len(expected),
+            # Only streams that reported at least once; the caller knows how many there should be
+            "missing": sum(len(expected - v) for v in self.bars.values()),
+            "late": self.late,
+            "duplicates": self.duplicates,
+        })
+
+    async def do_reset(self, request):
+        self.reset()
+        return web.json_response({"ok": True})
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.send)
+        app.router.add_get("/stats", self.stats)
+        app.router.add_post("/reset", self.do_reset)
+        return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8802)
+    parser.add_argument("--bar-sec", type=float, default=5.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay before answering each call")
+    args = parser.parse_args()
+    web.run_app(FakeTelegram(args.bar_sec, args.latency_ms).app(), host=args.host, port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""CPU per bar boundary: per-stream indicators vs the batched NumPy pass.
+
+Builds synthetic candle histories for N streams, closes one bar on all of
+them, and times the scanner's RSI/Stoch detection done stream by stream
+(app.services.indicators) and through app.scanner.batch.IndicatorBatch.
+
+    python -m bench.indicators --streams 16 200 2000 --bars 200
+"""
+import math
+import time
+import random
+import asyncio
+import argparse
+from collections import deque
+from app.scanner.batch import IndicatorBatch
+from app.services.indicators import compute_rsi, compute_stoch, three_touches
+
+RSI_PERIOD, RSI_LOW, RSI_HIGH = 14, 23.0, 77.0
+STOCH_K, STOCH_D, STOCH_SMOOTH = 14, 3, 3
+LOOKBACK, SPACING = 120, 5
+
+def scalar(candles) -> tuple:
+    closes = [c["close"] for c in candles]
+    highs = [c["high"] for c in candles]
+    lows = [c["low"] for c in candles]
+    rsi = compute_rsi(closes, RSI_PERIOD)
+    st_k, _ = compute_stoch(highs, lows, closes, STOCH_K, STOCH_D, STOCH_SMOOTH)
+    low = high = False
+    if len(rsi) > 1 and not math.isnan(rsi[-1]):
+        low = rsi[-2] >= RSI_LOW and rsi[-1] < RSI_LOW
+        high = rsi[-2] <= RSI_HIGH and rsi[-1] > RSI_HIGH
+    rsi_bin = [(v < RSI_LOW or v > RSI_HIGH) if not math.isnan(v) else False for v in rsi]
+    stoch_bin = [(k < 20 or k > 80) if not math.isnan(k) else False for k in st_k]
+    return low, high, three_touches(rsi_bin, LOOKBACK, SPACING), three_touches(stoch_bin, LOOKBACK, SPACING)
+
+def synthetic(streams: int, bars: int, seed: int):
+    rng = random.Random(seed)
+    histories = []
+    for _ in range(streams):
+        price, candles = 100.0, deque(maxlen=bars)
+        for i in range(bars + 1):
+            open_, price = price, price * (1 + rng.gauss(0, 0.02))
+            candles.append({"ts": i * 60_000, "open": open_, "close": price,
+                            "high": max(open_, price) * 1.004, "low": min(open_, price) * 0.996})
+        histories.append(candles)
+    return histories
+
+async def run(streams: int, bars: int, rounds: int, seed: int) -> dict:
+    histories = synthetic(streams, bars, seed)
+    rng = random.Random(seed + 1)
+    batch = IndicatorBatch(RSI_PERIOD, RSI_LOW, RSI_HIGH, STOCH_K, STOCH_SMOOTH, LOOKBACK, SPACING, window=0)
+    # Warm the per-stream arrays, as after the scanner's first bar
+    await asyncio.gather(*(batch.evaluate(i, 0, h) for i, h in enumerate(histories)))
+    scalar_sec, batch_sec, mismatches = [], [], 0
+    for r in range(1, rounds + 1):
+        for h in histories:
+            last = h[-1]
+            price = last["close"] * (1 + rng.gauss(0, 0.02))
+            h.append({"ts": last["ts"] + 60_000, "open": last["close"], "close": price,
+                      "high": max(last["close"], price) * 1.004, "low": min(last["close"], price) * 0.996})
+        t0 = time.process_time()
+        expected = [scalar(h) for h in histories]
+        scalar_sec.append(time.process_time() - t0)
+        t0 = time.process_time()
+        got = await asyncio.gather(*(batch.evaluate(i, r, h) for i, h in enumerate(histories)))
+        batch_sec.append(time.process_time() - t0)
+        mismatches += sum(e != (g.rsi_low, g.rsi_high, g.rsi_touches, g.stoch_touches) for e, g in zip(expected, got))
+    return {
+        "streams": streams,
+        "scalar_ms": round(sorted(scalar_sec)[len(scalar_sec) // 2] * 1000, 1),
+        "batch_ms": round(sorted(batch_sec)[len(batch_sec) // 2] * 1000, 1),
+        "mismatches": mismatches,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, nargs="+", default=[16, 200, 2000])
+    parser.add_argument("--bars", type=int, default=200, help="history length per stream (scanner MAX_CANDLES)")
+    parser.add_argument("--rounds", type=int, default=5, help="bar closes measured per stream count")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    for streams in args.streams:
+        result = asyncio.run(run(streams, args.bars, args.rounds, args.seed))
+        print(f"{result['streams']:>5} streams  per-stream {result['scalar_ms']:>8} ms  "
+              f"batched {result['batch_ms']:>7} ms  mismatches {result['mismatches']}", flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Close-to-notification latency of the scanner against local stubs.
+
+Starts bench.fake_exchange and bench.fake_telegram, then for each stream
+count runs the scanner (full_main by default) in a child process pointed
+at them through BYBIT_BASE_URL / TELEGRAM_API_URL. The synthetic market
+prints a pattern on every bar and the scanner runs with only pattern
+alerts enabled, so each stream should deliver one message per closed bar.
+
+    python -m bench.latency --streams 16 200 2000 --duration 60 --bar-sec 5
+
+Reported per run: p50/p99 close-to-send latency, exchange requests per
+stream per minute, bars that never produced a message, bars reported
+more than one bar after their close, and bars reported twice. --indicators
+also runs the batched RSI/Stoch pass and reports how each close's bars
+reached the batch.
+"""
+import os
+import sys
+import json
+import math
+import time
+import signal
+import socket
+import asyncio
+import argparse
+import tempfile
+import importlib
+import subprocess
+import urllib.request
+
+TIMEFRAMES = ["5", "15", "60", "240"]
+
+def _wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port}")
+
+def _call(port: int, path: str, method: str = "GET") -> dict:
+    req = urllib.request.Request(f"http://127.0.0.1:{port}{path}", method=method, data=b"" if method == "POST" else None)
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.loads(resp.read())
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+def bench_symbols(streams: int):
+    return [f"BENCH{i:04d}USDT" for i in range(math.ceil(streams / len(TIMEFRAMES)))]
+
+def run_scanner(module: str, streams: int, bar_sec: float):
+    """Child process: run the scanner on synthetic symbols until terminated"""
+    from app.database import Base, get_engine
+    # The subscription registry reads strategies; an empty table leaves only the static streams
+    Base.metadata.create_all(bind=get_engine())
+    scanner = importlib.import_module(module)
+    scanner.SYMBOLS = bench_symbols(streams)
+    scanner.TF_LIST = TIMEFRAMES
+    # Every synthetic interval closes each bar_sec: the scanner polls and stamps bars by that
+    scanner.tf_ms = lambda tf: int(bar_sec * 1000)
+    # One message per closed bar: the synthetic market prints a pattern on every bar
+    scanner.ENABLE_VOLUME_FILTER = False
+    scanner.ENABLE_INDICATORS = os.getenv("BENCH_INDICATORS") == "1"
+    scanner.ENABLE_ATR_ANOMALY = False
+
+    def dump_stats(signum, frame):
+        # How the bars of one close actually reached the indicator batch
+        with open(os.environ["BENCH_STATS_FILE"], "w") as f:
+            json.dump(scanner.indicator_batch.stats, f)
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, dump_stats)
+    asyncio.run(scanner.main())
+
+def run_once(args, streams: int, workdir: str) -> dict:
+    env = dict(
+        os.environ,
+        BYBIT_BASE_URL=f"http://127.0.0.1:{args.exchange_port}",
+        TELEGRAM_API_URL=f"http://127.0.0.1:{args.telegram_port}",
+        TELEGRAM_BOT_TOKEN="bench", TELEGRAM_CHAT_ID="1", TELEGRAM_CHANNEL_ID="2",
+        HTML_OUTPUT_DIR=os.path.join(workdir, "charts"),
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        REDIS_URL="memory://",
+        POLL_CLOSE_OFFSET_SEC=str(args.close_offset_sec), POLL_RETRY_SEC=str(args.retry_sec),
+        SCANNER_ARRIVAL_SKEW_SEC=str(args.skew_sec),
+        SCANNER_REFRESH_SEC="3600",
+        # The synthetic pattern stays active, so let it fire on every bar
+        ALERT_EDGE_TRIGGER="false", ALERT_COOLDOWN_SEC="0",
+        BENCH_INDICATORS="1" if args.indicators else "0",
+        BENCH_STATS_FILE=os.path.join(workdir, "scanner_stats.json"),
+    )
+    if args.bybit_limit:
+        env["BYBIT_REQUESTS_PER_WINDOW"] = str(args.bybit_limit)
+    child = subprocess.Popen(
+        [sys.executable, "-m", "bench.latency", "--child", args.scanner, str(streams), str(args.bar_sec)],
+        env=env, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    try:
+        time.sleep(args.warmup)
+        _call(args.exchange_port, "/reset", "POST")
+        _call(args.telegram_port, "/reset", "POST")
+        time.sleep(args.duration)
+        exchange = _call(args.exchange_port, "/stats")
+        telegram = _call(args.telegram_port, "/stats")
+    finally:
+        child.terminate()
+        child.wait(timeout=30)
+    try:
+        with open(env["BENCH_STATS_FILE"]) as f:
+            batch = json.load(f)
+    except (OSError, ValueError):
+        batch = {}
+
+    actual_streams = len(bench_symbols(streams)) * len(TIMEFRAMES)
+    latencies = telegram["latencies_ms"]
+    expected_bars = actual_streams * telegram["closes_expected"]
+    silent_streams = actual_streams - telegram["streams"]
+    requests = sum(exchange["requests"].values())
+    return {
+        "streams": actual_streams,
+        "alerts": len(latencies),
+        "messages": telegram["messages"],
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(max(latencies), 1) if latencies else math.nan,
+        "req_per_stream_min": round(requests / actual_streams / (exchange["elapsed_sec"] / 60), 2),
+        "exchange_errors": exchange["errors"],
+        "missed_bars": telegram["missing"] + silent_streams * telegram["closes_expected"],
+        "expected_bars": expected_bars,
+        "late_bars": telegram["late"],
+        "duplicate_bars": telegram["duplicates"],
+        "indicator_batch": batch,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, nargs="+", default=[16, 200, 2000])
+    parser.add_argument("--duration", type=float, default=60.0, help="measured seconds per run")
+    parser.add_argument("--warmup", type=float, default=15.0, help="seconds before measuring (startup fetches and charts)")
+    parser.add_argument("--bar-sec", type=float, default=5.0)
+    parser.add_argument("--close-offset-sec", type=float, default=0.2, help="scanner polls this long after each close")
+    parser.add_argument("--retry-sec", type=float, default=0.5, help="scanner retry delay while a closed bar is not served")
+    parser.add_argument("--skew-sec", type=float, default=1.0,
+                        help="scanner's per-close batch waits; keep well under --bar-sec")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="fake exchange response latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--bybit-limit", type=int, default=0, help="override BYBIT_REQUESTS_PER_WINDOW for the scanner")
+    parser.add_argument("--indicators", action="store_true", help="also run the batched RSI/Stoch pass")
+    parser.add_argument("--scanner", default="full_main")
+    parser.add_argument("--exchange-port", type=int, default=8801)
+    parser.add_argument("--telegram-port", type=int, default=8802)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show scanner stderr")
+    parser.add_argument("--child", nargs=3, metavar=("MODULE", "STREAMS", "BAR_SEC"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_scanner(args.child[0], int(args.child[1]), float(args.child[2]))
+        return
+
+    stubs = [
+        subprocess.Popen([sys.executable, "-m", "bench.fake_exchange", "--port", str(args.exchange_port),
+                          "--bar-sec", str(args.bar_sec), "--latency-ms", str(args.latency_ms),
+                          "--jitter-ms", str(args.jitter_ms), "--error-rate", str(args.error_rate),
+                          "--rate-limit-rate", str(args.rate_limit_rate)]),
+        subprocess.Popen([sys.executable, "-m", "bench.fake_telegram", "--port", str(args.telegram_port),
+                          "--bar-sec", str(args.bar_sec)]),
+    ]
+    results = []
+    try:
+        _wait_for_port(args.exchange_port)
+        _wait_for_port(args.telegram_port)
+        with tempfile.TemporaryDirectory() as workdir:
+            for streams in args.streams:
+                result = run_once(args, streams, workdir)
+                results.append(result)
+                if not args.json:
+                    print(f"{result['streams']:>5} streams  p50 {result['p50_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+                          f"req/stream/min {result['req_per_stream_min']:>6}  "
+                          f"missed {result['missed_bars']}/{result['expected_bars']} bars  "
+                          f"late {result['late_bars']}  duplicate {result['duplicate_bars']}", flush=True)
+                batch = result["indicator_batch"]
+                if batch.get("batches"):
+                    print(f"       indicator batches {batch['batches']}  streams/batch "
+                          f"{batch['streams'] / batch['batches']:.1f}  complete {batch['complete']}  "
+                          f"timed out {batch['timed_out']}  arrival spread max {batch['max_spread_sec']:.2f} s", flush=True)
+    finally:
+        for stub in stubs:
+            stub.terminate()
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
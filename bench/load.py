@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Load suite: generate data, drive the API, run the checker, compare to a baseline.
+
+Populates a database (a fresh SQLite file unless --database-url is given)
+with bench.load_data, runs bench.load_api against the API started on it,
+then bench.load_checker on the same data. Results can be stored as a
+baseline and later runs compared against it: throughput or latency worse
+than --tolerance, or more queries per request, is reported as a
+regression and the exit status is 1.
+
+    python -m bench.load --users 10000 --strategies-per-user 100 --save-baseline bench/load_baseline.json
+    python -m bench.load --users 10000 --strategies-per-user 100 --baseline bench/load_baseline.json
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+import tempfile
+
+# metric -> True when higher is better
+METRICS = {
+    "rps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False, "queries_per_request": False,
+    "round_ms": False, "slowest_shard_ms": False, "strategies_per_sec": True, "queries_per_strategy": False,
+}
+# Statement counts do not jitter like timings: any rise beyond this many per request counts
+QUERY_SLACK = 0.1
+PARAMS = ("users", "strategies_per_user", "alerts_per_user", "symbols", "concurrency", "duration", "pages", "page_size")
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """(section, name, metric, baseline, current, change) for each metric that got worse beyond tolerance"""
+    regressions = []
+    sections = [("checker", "checker", result.get("checker", {}), baseline.get("checker", {}))]
+    sections += [("api", name, stats, baseline.get("api", {}).get(name, {})) for name, stats in result.get("api", {}).items()]
+    for section, name, current, before in sections:
+        for metric, higher_better in METRICS.items():
+            old, new = before.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            if metric.startswith("queries_"):
+                worse = new - old > QUERY_SLACK
+            else:
+                worse = change < -tolerance if higher_better else change > tolerance
+            if worse:
+                regressions.append((section, name, metric, old, new, change))
+    return regressions
+
+def main():
+    from bench.load_api import print_api, run_api, start_server
+    from bench.load_checker import print_checker
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="e.g. a local Postgres; default a temporary SQLite file")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--strategies-per-user", type=int, default=10)
+    parser.add_argument("--alerts-per-user", type=int, default=20)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--via-crud", action="store_true")
+    parser.add_argument("--skip-populate", action="store_true", help="reuse the data already in --database-url")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8821)
+    parser.add_argument("--checker-rounds", type=int, default=3)
+    parser.add_argument("--exchange-latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default=None, help="compare against this stored result")
+    parser.add_argument("--save-baseline", default=None, metavar="PATH", help="store this run's result")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="load-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'load.db')}"
+    os.environ.setdefault("REDIS_URL", "memory://")
+    # Imported only now: app.database reads DATABASE_URL at import
+    from app.database import SessionLocal
+    from bench.load_checker import run_checker
+    from bench.load_data import populate, prepare_schema
+
+    result = {"params": {k: getattr(args, k) for k in PARAMS}}
+    if not args.skip_populate:
+        prepare_schema()
+        db = SessionLocal()
+        try:
+            result["data"] = populate(db, args.users, args.strategies_per_user, args.alerts_per_user,
+                                      args.symbols, seed=args.seed, via_crud=args.via_crud)
+        finally:
+            db.close()
+        print(f"populated {result['data']}", file=sys.stderr, flush=True)
+
+    server = start_server(args.port, dict(os.environ))
+    try:
+        result["api"] = asyncio.run(run_api(f"http://127.0.0.1:{args.port}", args.users, args.concurrency,
+                                            args.duration, args.warmup, args.page_size, args.pages,
+                                            args.symbols, args.seed))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    result["checker"] = run_checker(args.checker_rounds, args.exchange_latency_ms, args.seed)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_api(result["api"])
+        print_checker(result["checker"])
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != result["params"]:
+            print(f"warning: baseline was run with {baseline.get('params')}", file=sys.stderr)
+        regressions = compare(result, baseline, args.tolerance)
+        for section, name, metric, old, new, change in regressions:
+            print(f"REGRESSION {section}/{name} {metric}: {old} -> {new} ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
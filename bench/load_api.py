@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Scripted HTTP load against app.main:app.
+
+Virtual users log in as accounts made by bench.load_data, then loop over
+weighted scenarios until the duration is up: list strategies (following
+X-Next-Cursor), create a strategy, page the alert feed, log in again.
+With --serve the API is started here under uvicorn with a SQLAlchemy
+cursor hook that returns each request's statement count in
+X-Query-Count; against --url the count is reported only if the server
+sends that header.
+
+    python -m bench.load_api --serve --users 1000 --concurrency 50 --duration 30
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+import contextvars
+from collections import defaultdict
+from bench.latency import _wait_for_port, percentile
+from bench.load_data import LOAD_PASSWORD, strategy_spec, symbols, user_email
+
+SCENARIOS = {"login": 1, "list_strategies": 5, "create_strategy": 1, "page_alerts": 3}
+QUERY_HEADER = "x-query-count"
+
+_queries = contextvars.ContextVar("load_queries", default=None)
+
+def _count_statement(*args):
+    counter = _queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+def counted(app):
+    """ASGI wrapper putting the request's SQL statement count in X-Query-Count"""
+    async def wrapper(scope, receive, send):
+        if scope["type"] != "http":
+            return await app(scope, receive, send)
+        counter = [0]
+        token = _queries.set(counter)
+
+        async def send_counted(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(QUERY_HEADER.encode(), str(counter[0]).encode())]
+            await send(message)
+        try:
+            await app(scope, receive, send_counted)
+        finally:
+            _queries.reset(token)
+    return wrapper
+
+def serve(port: int):
+    """Child process: the API under uvicorn with statement counting"""
+    import uvicorn
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app.main import app
+    event.listen(Engine, "before_cursor_execute", _count_statement)
+    uvicorn.run(counted(app), host="127.0.0.1", port=port, log_level="warning")
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.measuring = False
+
+    def add(self, scenario: str, started: float, response):
+        if not self.measuring:
+            return
+        self.latencies[scenario].append((time.perf_counter() - started) * 1000)
+        if response is None or response.status_code >= 400:
+            self.errors[scenario] += 1
+        elif QUERY_HEADER in response.headers:
+            self.queries[scenario].append(int(response.headers[QUERY_HEADER]))
+
+    def report(self, elapsed: float) -> dict:
+        out = {}
+        for scenario in sorted(self.latencies):
+            values, queries = self.latencies[scenario], self.queries[scenario]
+            out[scenario] = {
+                "requests": len(values),
+                "errors": self.errors[scenario],
+                "rps": round(len(values) / elapsed, 1),
+                "p50_ms": round(percentile(values, 50), 1),
+                "p95_ms": round(percentile(values, 95), 1),
+                "p99_ms": round(percentile(values, 99), 1),
+                "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+            }
+        return out
+
+async def _request(client, recorder: Recorder, scenario: str, method: str, path: str, **kwargs):
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, path, **kwargs)
+    except Exception:
+        response = None
+    recorder.add(scenario, started, response)
+    return response
+
+async def _login(client, recorder, email: str):
+    response = await _request(client, recorder, "login", "POST", "/auth/login",
+                              data={"username": email, "password": LOAD_PASSWORD})
+    if response is None or response.status_code != 200:
+        return None
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def _pages(client, recorder, scenario: str, path: str, headers: dict, limit: int, pages: int):
+    params = {"limit": limit}
+    for _ in range(pages):
+        response = await _request(client, recorder, scenario, "GET", path, params=params, headers=headers)
+        cursor = response.headers.get("x-next-cursor") if response is not None and response.status_code == 200 else None
+        if not cursor:
+            return
+        params = {"limit": limit, "cursor": cursor}
+
+async def virtual_user(client, recorder: Recorder, rng: random.Random, email: str, deadline: float,
+                       page_size: int, pages: int, symbol_pool):
+    headers = await _login(client, recorder, email)
+    names, weights = list(SCENARIOS), list(SCENARIOS.values())
+    while time.monotonic() < deadline:
+        if headers is None:
+            await asyncio.sleep(0.5)
+            headers = await _login(client, recorder, email)
+            continue
+        scenario = rng.choices(names, weights)[0]
+        if scenario == "login":
+            headers = await _login(client, recorder, email) or headers
+        elif scenario == "list_strategies":
+            await _pages(client, recorder, scenario, "/strategies/", headers, page_size, pages)
+        elif scenario == "page_alerts":
+            await _pages(client, recorder, scenario, "/alerts/", headers, page_size, pages)
+        else:
+            await _request(client, recorder, scenario, "POST", "/strategies/", headers=headers,
+                           json=strategy_spec(rng, rng.choice(symbol_pool)))
+
+async def run_api(url: str, users: int, concurrency: int, duration: float, warmup: float,
+                  page_size: int = 50, pages: int = 3, symbol_count: int = 200, seed: int = 1) -> dict:
+    import httpx
+    recorder = Recorder()
+    rng = random.Random(seed)
+    pool = symbols(symbol_count)
+    accounts = rng.sample(range(users), min(users, concurrency))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        deadline = time.monotonic() + warmup + duration
+        tasks = [asyncio.create_task(virtual_user(client, recorder, random.Random(seed + i), user_email(i), deadline,
+                                                  page_size, pages, pool))
+                 for i in accounts]
+        await asyncio.sleep(warmup)
+        recorder.measuring = True
+        started = time.monotonic()
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - started
+    report = recorder.report(elapsed)
+    requests = sum(s["requests"] for s in report.values())
+    report["total"] = {
+        "requests": requests,
+        "errors": sum(s["errors"] for s in report.values()),
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile([v for vs in recorder.latencies.values() for v in vs], 50), 1),
+        "p95_ms": round(percentile([v for vs in recorder.latencies.values() for v in vs], 95), 1),
+        "p99_ms": round(percentile([v for vs in recorder.latencies.values() for v in vs], 99), 1),
+    }
+    return report
+
+def start_server(port: int, env: dict = None) -> subprocess.Popen:
+    server = subprocess.Popen([sys.executable, "-m", "bench.load_api", "--child", str(port)], env=env or dict(os.environ))
+    try:
+        _wait_for_port(port, timeout=60)
+    except Exception:
+        server.terminate()
+        raise
+    return server
+
+def print_api(report: dict):
+    for scenario, s in report.items():
+        queries = "" if s.get("queries_per_request") is None else f"  queries/req {s['queries_per_request']:>6}"
+        print(f"{scenario:>16}  {s['requests']:>7} req  {s['rps']:>8} rps  p50 {s['p50_ms']:>7} ms  "
+              f"p95 {s['p95_ms']:>7} ms  p99 {s['p99_ms']:>7} ms  errors {s['errors']}{queries}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="target an already running API")
+    parser.add_argument("--serve", action="store_true", help="start the API here against DATABASE_URL")
+    parser.add_argument("--port", type=int, default=8821)
+    parser.add_argument("--users", type=int, default=1000, help="accounts made by bench.load_data")
+    parser.add_argument("--concurrency", type=int, default=50, help="virtual users, one account each")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=3, help="cursor pages followed per listing")
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--child", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        serve(args.child)
+        return
+    server = start_server(args.port) if args.serve else None
+    try:
+        report = asyncio.run(run_api(args.url or f"http://127.0.0.1:{args.port}", args.users, args.concurrency,
+                                     args.duration, args.warmup, args.page_size, args.pages, args.symbols, args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_api(report)
+
+if __name__ == "__main__":
+    main()
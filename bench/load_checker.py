@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""The strategy checker against the load data set, with binance_service stubbed.
+
+Every round marks all strategies due and runs check_strategy_shard for each
+shard in turn, as one Celery worker would; prices and klines come from a
+synthetic random walk (with --latency-ms per exchange call) instead of
+Binance. Reported: time per round and for the slowest shard, strategies
+per second, SQL statements per strategy, exchange calls and alerts fired.
+
+    DATABASE_URL=sqlite:///load.db python -m bench.load_checker --rounds 3
+"""
+import json
+import time
+import random
+import argparse
+from collections import Counter
+from unittest import mock
+from bench.latency import percentile
+from bench.load_data import base_price
+
+class StubMarket:
+    """Deterministic prices and klines that move a little every round"""
+
+    def __init__(self, seed: int = 1, latency_ms: float = 0.0):
+        self.seed = seed
+        self.round = 0
+        self.latency = latency_ms / 1000
+        self.calls = Counter()
+
+    def _rng(self, *key) -> random.Random:
+        return random.Random(f"{self.seed}:{self.round}:{':'.join(map(str, key))}")
+
+    def price(self, symbol: str):
+        self.calls["price"] += 1
+        time.sleep(self.latency)
+        return round(base_price(symbol) * (1 + self._rng(symbol).gauss(0, 0.03)), 4)
+
+    def klines(self, symbol: str, interval: str, limit: int = 200):
+        self.calls["klines"] += 1
+        time.sleep(self.latency)
+        rng = self._rng(symbol, interval)
+        price, candles = base_price(symbol), []
+        for i in range(limit):
+            open_, price = price, price * (1 + rng.gauss(0, 0.01))
+            candles.append({"ts": i * 60_000, "open": open_, "close": price, "high": max(open_, price) * 1.002,
+                            "low": min(open_, price) * 0.998, "volume": rng.uniform(100, 1000),
+                            "close_ts": (i + 1) * 60_000 - 1})
+        return candles
+
+def run_checker(rounds: int = 3, latency_ms: float = 0.0, seed: int = 1) -> dict:
+    from sqlalchemy import event, func, update
+    from sqlalchemy.engine import Engine
+    from app import models
+    from app.database import SessionLocal
+    from app.services import binance_service
+    from app.workers import celery_worker
+    from app.workers.sharding import SHARD_COUNT, get_shard_stats
+
+    market = StubMarket(seed, latency_ms)
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    event.listen(Engine, "before_cursor_execute", count)
+    round_ms, shard_ms, checked, triggered = [], [], 0, 0
+    try:
+        with mock.patch.object(binance_service, "get_binance_price", market.price), \
+                mock.patch.object(binance_service, "get_binance_klines", market.klines):
+            db = SessionLocal()
+            try:
+                active = db.query(func.count(models.Strategy.id)).filter(models.Strategy.is_active == True).scalar()
+                for r in range(rounds):
+                    market.round = r
+                    db.execute(update(models.Strategy).values(last_checked=None))
+                    db.commit()
+                    statements[0] = 0
+                    started = time.perf_counter()
+                    for shard in range(SHARD_COUNT):
+                        shard_started = time.perf_counter()
+                        celery_worker.check_strategy_shard(shard)
+                        shard_ms.append((time.perf_counter() - shard_started) * 1000)
+                        stats = get_shard_stats().get(str(shard), {})
+                        checked += stats.get("checked", 0)
+                        triggered += stats.get("triggered", 0)
+                    round_ms.append((time.perf_counter() - started) * 1000)
+            finally:
+                db.close()
+    finally:
+        event.remove(Engine, "before_cursor_execute", count)
+    return {
+        "strategies": active,
+        "rounds": rounds,
+        "round_ms": round(percentile(round_ms, 50), 1),
+        "slowest_shard_ms": round(max(shard_ms), 1) if shard_ms else 0.0,
+        "strategies_per_sec": round(active / (percentile(round_ms, 50) / 1000), 1) if round_ms and active else 0.0,
+        # Statements of the last round; every round checks every strategy
+        "queries_per_strategy": round(statements[0] / active, 2) if active else None,
+        "checked_per_round": checked // max(rounds, 1),
+        "alerts_per_round": triggered // max(rounds, 1),
+        "exchange_calls_per_round": sum(market.calls.values()) // max(rounds, 1),
+    }
+
+def print_checker(result: dict):
+    print(f"{'checker':>16}  {result['strategies']:>7} strategies  round {result['round_ms']:>9} ms  "
+          f"slowest shard {result['slowest_shard_ms']:>8} ms  {result['strategies_per_sec']:>9} strategies/s  "
+          f"queries/strategy {result['queries_per_strategy']}  alerts/round {result['alerts_per_round']}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated Binance response time per call")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    result = run_checker(args.rounds, args.latency_ms, args.seed)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_checker(result)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Synthetic users, strategies and alerts for the load suite.
+
+Users go through crud.create_user; they all share LOAD_PASSWORD, which is
+hashed once. Strategies and alerts are validated through the same schemas
+and inserted in chunks, since crud's commit-and-refresh per row would take
+hours at a million rows; --via-crud sends them through
+crud.create_user_strategy / crud.create_alert as well.
+
+    DATABASE_URL=sqlite:///load.db python -m bench.load_data --users 10000 --strategies-per-user 100
+"""
+import time
+import uuid
+import random
+import argparse
+from datetime import datetime, timedelta
+from unittest import mock
+
+LOAD_PASSWORD = "load-password"
+CHUNK = 5000
+
+def user_email(i: int) -> str:
+    return f"load{i:07d}@example.com"
+
+def symbols(count: int):
+    return [f"LOAD{i:04d}USDT" for i in range(count)]
+
+def base_price(symbol: str) -> float:
+    """Price level the checker stub quotes around, so price conditions trigger at a steady rate"""
+    return 10.0 + (uuid.uuid5(uuid.NAMESPACE_OID, symbol).int % 50_000) / 10
+
+def strategy_spec(rng: random.Random, symbol: str) -> dict:
+    price = base_price(symbol)
+    kind = rng.choices(["price", "rsi", "stoch", "expression"], weights=[5, 2, 1, 2])[0]
+    spec = {"name": f"{symbol} {kind}", "source": "binance", "symbol": symbol,
+            "interval": rng.choice(["5m", "15m", "1h", "4h"]), "indicator_period": 14}
+    if kind == "price":
+        above = rng.random() < 0.5
+        spec.update(condition_type="price_above" if above else "price_below",
+                    condition_value=round(price * (1 + rng.uniform(-0.05, 0.05)), 2))
+    elif kind == "rsi":
+        spec.update(condition_type=rng.choice(["rsi_cross_below", "rsi_cross_above"]),
+                    condition_value=rng.choice([20.0, 25.0, 30.0, 70.0, 75.0, 80.0]))
+    elif kind == "stoch":
+        spec.update(condition_type=rng.choice(["stoch_below", "stoch_above"]), condition_value=rng.choice([20.0, 80.0]))
+    else:
+        spec.update(condition_type="expression", condition_value=0.0,
+                    expression=f"close > {round(price * rng.uniform(0.9, 1.1), 2)} and rsi(14) < {rng.randint(25, 45)}")
+    return spec
+
+def _flush(db, model, rows):
+    from sqlalchemy import insert
+    if rows:
+        db.execute(insert(model), rows)
+        db.commit()
+        rows.clear()
+
+def populate(db, users: int, strategies_per_user: int, alerts_per_user: int, symbol_count: int = 200,
+             alert_days: int = 30, seed: int = 1, via_crud: bool = False, progress: bool = True) -> dict:
+    from app import crud, models, schemas, security
+    rng = random.Random(seed)
+    pool = symbols(symbol_count)
+    now = datetime.utcnow()
+    started = time.monotonic()
+    hashed = security.hash_password(LOAD_PASSWORD)
+    strategy_rows, alert_rows = [], []
+    counts = {"users": 0, "strategies": 0, "alerts": 0}
+    with mock.patch.object(security, "hash_password", lambda password: hashed):
+        for i in range(users):
+            user = crud.get_user_by_email(db, user_email(i)) or crud.create_user(
+                db, schemas.UserCreate(email=user_email(i), password=LOAD_PASSWORD))
+            counts["users"] += 1
+            owned = []
+            for _ in range(strategies_per_user):
+                spec = schemas.StrategyCreate(**strategy_spec(rng, rng.choice(pool)))
+                if via_crud:
+                    owned.append(crud.create_user_strategy(db, spec, user.id).id)
+                else:
+                    row = dict(spec.dict(), id=uuid.uuid4(), user_id=user.id, is_active=True,
+                               created_at=now - timedelta(seconds=rng.uniform(0, 180 * 86400)))
+                    strategy_rows.append(row)
+                    owned.append(row["id"])
+            counts["strategies"] += len(owned)
+            for _ in range(alerts_per_user if owned else 0):
+                strategy_id, value = rng.choice(owned), round(rng.uniform(1, 5000), 2)
+                message = f"🚨 Alert: load test {value}"
+                if via_crud:
+                    crud.create_alert(db, message, value, strategy_id, user.id)
+                else:
+                    alert_rows.append({"id": uuid.uuid4(), "strategy_id": strategy_id, "user_id": user.id,
+                                       "message": message, "trigger_value": value,
+                                       "created_at": now - timedelta(seconds=rng.uniform(0, alert_days * 86400))})
+                counts["alerts"] += 1
+            # Alerts reference strategies, so those go in first
+            if len(strategy_rows) >= CHUNK or len(alert_rows) >= CHUNK:
+                _flush(db, models.Strategy, strategy_rows)
+                _flush(db, models.Alert, alert_rows)
+            if progress and (i + 1) % 1000 == 0:
+                print(f"{i + 1}/{users} users, {counts['strategies']} strategies, {counts['alerts']} alerts "
+                      f"({time.monotonic() - started:.0f}s)", flush=True)
+    _flush(db, models.Strategy, strategy_rows)
+    _flush(db, models.Alert, alert_rows)
+    counts["duration_sec"] = round(time.monotonic() - started, 1)
+    return counts
+
+def prepare_schema(alert_days: int = 30):
+    """Tables, plus alert partitions back to the oldest generated alert on Postgres"""
+    from app.database import Base, get_engine
+    from app.services import alert_storage
+    Base.metadata.create_all(bind=get_engine())
+    with get_engine().begin() as conn:
+        alert_storage.ensure_partitions(conn, start=(datetime.utcnow() - timedelta(days=alert_days)).date())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--strategies-per-user", type=int, default=10)
+    parser.add_argument("--alerts-per-user", type=int, default=20)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--alert-days", type=int, default=30, help="alerts are spread over this many past days")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--via-crud", action="store_true", help="one crud call (and commit) per strategy and alert")
+    args = parser.parse_args()
+    from app.database import SessionLocal
+    prepare_schema(args.alert_days)
+    db = SessionLocal()
+    try:
+        counts = populate(db, args.users, args.strategies_per_user, args.alerts_per_user, args.symbols,
+                          args.alert_days, args.seed, args.via_crud)
+    finally:
+        db.close()
+    print(f"{counts['users']} users, {counts['strategies']} strategies, {counts['alerts']} alerts "
+          f"in {counts['duration_sec']}s")
+
+if __name__ == "__main__":
+    main()
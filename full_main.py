@@ -1,18 +1,32 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os, asyncio, math, time
-from collections import deque
+import os, asyncio, functools, math, time
+from collections import defaultdict, deque
 from dotenv import load_dotenv
 import aiohttp
 from aiohttp import resolver
 from PIL import Image, ImageDraw
+from app.exchanges.base import ExchangeError
+from app.exchanges.bybit import BybitClient
+from app.scanner.alert_state import AlertState
+from app.scanner.batch import IndicatorBatch
+from app.scanner.chart_store import ChartStore
+from app.scanner.cluster import (SCANNER_MODE, SCANNER_NODE_ID, CLUSTER_HEARTBEAT_SEC, CLUSTER_CLAIM_IDLE_SEC,
+                                 scanner_roles, HashRing, Membership, BarBus, AlertLedger, decode_bar)
+from app.scanner.coalescer import Coalescer, interval_ms
+from app.scanner.market import MarketDetector
+from app.scanner.schedule import POLL_RETRY_SEC, next_close_delay
+from app.services.redis_client import get_async_redis
+from app.services.subscriptions import SCANNER_REFRESH_SEC, SubscriptionRegistry, SymbolDirectory
+from app.services.indicators import true_range, compute_atr, detect_patterns
 
 # === .env ===
 load_dotenv()
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID   = os.getenv("TELEGRAM_CHAT_ID")
 HTML_OUTPUT_DIR    = os.getenv("HTML_OUTPUT_DIR", "/data/data/com.termux/files/home/www")
+TELEGRAM_API_URL   = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
 if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
     raise RuntimeError("В .env должны быть TELEGRAM_BOT_TOKEN и TELEGRAM_CHAT_ID")
 
@@ -22,6 +36,7 @@ ENABLE_INDICATORS = True
 ENABLE_ATR_ANOMALY = True
 ENABLE_VOLUME_FILTER = True
 ENABLE_ORDERBOOK_ANOMALY = True
+ENABLE_MARKET_CONTEXT = True
 
 # === НАСТРОЙКИ ===
 SYMBOLS = ["SOLUSDT","INJUSDT","WIFUSDT","ADAUSDT"]
@@ -48,65 +63,12 @@ VOL_GROWTH_WINDOW = 50
 ORDERBOOK_WINDOW = 30
 ORDERBOOK_FACTOR = 2.0
 
-POLL_SEC_FAST = 60
-POLL_SEC_SLOW = 180
-
-BASE_URL = "https://api.bybit.com"
+# Минутные/часовые/дневные ТФ опрашиваются по закрытию бара (app.scanner.schedule);
+# эти интервалы — для недель и месяцев
+POLL_SEC_FAST = float(os.getenv("POLL_SEC_FAST", "60"))
+POLL_SEC_SLOW = float(os.getenv("POLL_SEC_SLOW", "180"))
 
 # === УТИЛИТЫ ===
-def ensure_dir(p): os.makedirs(p, exist_ok=True)
-
-def compute_rsi(close, period=14):
-    n = len(close)
-    if n < period + 1: return [math.nan]*n
-    gains=[0.0]; losses=[0.0]
-    for i in range(1,n):
-        ch=close[i]-close[i-1]
-        gains.append(max(ch,0.0)); losses.append(max(-ch,0.0))
-    ag=sum(gains[1:period+1])/period; al=sum(losses[1:period+1])/period
-    rsi=[math.nan]*period
-    rsi.append(100.0 if al==0 else 100.0 - (100.0/(1.0+ag/al)))
-    for i in range(period+1,n):
-        ag=(ag*(period-1)+gains[i])/period
-        al=(al*(period-1)+losses[i])/period
-        rsi.append(100.0 if al==0 else 100.0 - (100.0/(1.0+ag/al)))
-    return rsi
-
-def compute_stoch(h,l,c,k=14,d=3,s=3):
-    n=len(c)
-    if n<k: return [math.nan]*n, [math.nan]*n
-    raw=[math.nan]*n
-    for i in range(k-1,n):
-        hh=max(h[i-k+1:i+1]); ll=min(l[i-k+1:i+1])
-        raw[i]=50.0 if hh==ll else (c[i]-ll)/(hh-ll)*100.0
-    ksm=[math.nan]*n
-    for i in range(k-1+s-1,n):
-        ksm[i]=sum(raw[i-s+1:i+1])/s
-    dsm=[math.nan]*n
-    for i in range(k-1+s-1+d-1,n):
-        dsm[i]=sum(ksm[i-d+1:i+1])/d
-    return ksm,dsm
-
-def true_range(h,l,prev_close): return max(h-l, abs(h-prev_close), abs(l-prev_close))
-def compute_atr(h,l,c,period):
-    n=len(c)
-    if n<period+1: return [math.nan]*n
-    trs=[math.nan]+[true_range(h[i],l[i],c[i-1]) for i in range(1,n)]
-    atr=[math.nan]*period
-    atr.append(sum(trs[1:period+1])/period)
-    for i in range(period+1,n):
-        atr.append((atr[-1]*(period-1)+trs[i])/period)
-    return atr
-
-def three_touches(binary_series, lookback, spacing):
-    idxs=[i for i,v in enumerate(binary_series[-lookback:]) if v]
-    if len(idxs)<3: return False
-    cnt,last=1,idxs[0]
-    for i in idxs[1:]:
-        if i-last>=spacing:
-            cnt+=1; last=i
-            if cnt>=3: return True
-    return False
 
 def candle_effective_size(c):
     o,h,l,cl = c["open"], c["high"], c["low"], c["close"]
@@ -129,24 +91,8 @@ def volume_growth_passed(candles):
     return avg>0 and candles[-1]["volume"] >= VOL_GROWTH_FACTOR * avg
 
 # === BYBIT ===
-async def fetch_kline(s,symbol,interval,limit):
-    url=f"{BASE_URL}/v5/market/kline"
-    params={"category":"linear","symbol":symbol,"interval":interval,"limit":str(limit)}
-    async with s.get(url,params=params,timeout=20) as r:
-        data=await r.json()
-        lst=sorted(data["result"]["list"], key=lambda x:int(x[0]))
-        return [{"ts":int(x[0]),"open":float(x[1]),"high":float(x[2]),"low":float(x[3]),"close":float(x[4]),"volume":float(x[5])} for x in lst]
-
-async def fetch_orderbook(s, symbol, limit=50):
-    url=f"{BASE_URL}/v5/market/orderbook"
-    params={"category":"linear","symbol":symbol,"limit":str(limit)}
-    async with s.get(url,params=params,timeout=20) as r:
-        data=await r.json()
-        ob=data["result"]
-        return float(ob["b"][0][1]), float(ob["a"][0][1])  # bid1, ask1
-
-async def fetch_daily_atr_prev(s,symbol,period=14):
-    kl=await fetch_kline(s,symbol,"D",max(period+2,20))
+async def fetch_daily_atr_prev(bybit,symbol,period=14):
+    kl=await bybit.get_klines(symbol,"D",max(period+2,20))
     if len(kl)<period+1: return None
     h=[x["high"] for x in kl]; l=[x["low"] for x in kl]; c=[x["close"] for x in kl]
     atr=compute_atr(h,l,c,period)
@@ -160,11 +106,14 @@ async def tg_photo(s,caption,image_path):
         form.add_field("caption",caption)
         form.add_field("parse_mode","HTML")
         form.add_field("photo",f,filename=os.path.basename(image_path),content_type="image/png")
-        await s.post(f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto",data=form)
+        await s.post(f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/sendPhoto",data=form)
 
 # === ГРАФИК ===
-def plot_png(sym,tf,cand,levs,save):
-    ensure_dir(save)
+@functools.lru_cache(maxsize=None)
+def chart_store():
+    return ChartStore(HTML_OUTPUT_DIR)
+
+def plot_png(sym,tf,cand,levs):
     d=cand[-CHART_BARS:]
     W,H=1100,500; L,R,T,B=70,30,30,60
     img=Image.new("RGB",(W,H),(20,20,24)); drw=ImageDraw.Draw(img)
@@ -191,9 +140,8 @@ def plot_png(sym,tf,cand,levs,save):
             drw.line([(L,y(v)),(W-R,y(v))],fill=(120,120,200))
             drw.text((W-R-140,y(v)-12),f"{k} {v:.6g}",fill=(220,220,230))
     drw.text((L,8),f"{sym} TF {tf}",fill=(230,230,240))
-    path=os.path.join(save,f"{sym}_{tf}_{int(time.time())}.png")
-    img.save(path,"PNG")
-    return path
+    # Имя = хеш содержимого, объём каталога ограничен (LRU)
+    return chart_store().save(img,sym,tf)
 
 # === УРОВНИ ===
 def pick_biggest_candle(candles):
@@ -220,25 +168,6 @@ def fmt_levels_human(levels):
     return ("A={A:.6g} | C={C:.6g} | D={D:.6g} | F={F:.6g}"
            ).format(**{k:float(v) for k,v in levels.items()})
 
-# === ПАТТЕРНЫ ===
-def detect_patterns(candles):
-    if len(candles)<4: return None
-    c1,c2,c3,c4 = candles[-4],candles[-3],candles[-2],candles[-1]
-    out=[]
-    body=lambda c: abs(c["close"]-c["open"])
-    rng=lambda c: c["high"]-c["low"]
-    if rng(c4)>0 and body(c4)/rng(c4) < 0.1:
-        out.append("Doji")
-    if c3["close"]<c3["open"] and c4["close"]>c4["open"] and c4["close"]>c3["open"] and c4["open"]<c3["close"]:
-        out.append("Bullish Engulfing")
-    if c3["close"]>c3["open"] and c4["close"]<c4["open"] and c4["close"]<c3["open"] and c4["open"]>c3["close"]:
-        out.append("Bearish Engulfing")
-    if all(c["close"]>c["open"] for c in [c2,c3,c4]):
-        out.append("Three White Soldiers")
-    if all(c["close"]<c["open"] for c in [c2,c3,c4]):
-        out.append("Three Black Crows")
-    return out if out else None
-
 # === STATE ===
 class State:
     def __init__(self):
@@ -248,111 +177,415 @@ class State:
         self.ob_bids=deque(maxlen=ORDERBOOK_WINDOW)
         self.ob_asks=deque(maxlen=ORDERBOOK_WINDOW)
 
+# Длина бара ТФ в мс (bench подменяет её на свою)
+tf_ms = interval_ms
+
+# === ОТПРАВКА ===
+alert_state = AlertState()
+market = MarketDetector()
+indicator_batch = IndicatorBatch(RSI_PERIOD, RSI_LOW, RSI_HIGH, STOCH_K, STOCH_SMOOTH,
+                                 THREE_TOUCH_LOOKBACK, THREE_TOUCH_SPACING)
+
+async def send_group(sess, sym, close_ts, reports, ledger=None):
+    """Одно сообщение и один график на все ТФ символа, закрывшиеся в один момент"""
+    if ledger is not None:
+        # В кластере бар может прийти повторно: каждый ТФ отправляем один раз
+        reports = [r for r in reports if await ledger.claim(f"{sym}:{r.tf}:{close_ts}")]
+        if not reports:
+            return
+    reports.sort(key=lambda r: tf_ms(r.tf))
+    tf = reports[0].tf
+    candles, levels = reports[0].chart
+    png = plot_png(sym, tf, candles, levels)
+    # Секунды только у баров, закрывающихся не на минуте (bench)
+    when = time.strftime("%H:%M" if close_ts % 60_000 == 0 else "%H:%M:%S", time.gmtime(close_ts / 1000))
+    caption = f"<b>{sym}</b> {when} UTC\n" + "\n".join(f"{r.tf}m {line}" for r in reports for line in r.lines)
+    if levels:
+        caption += f"\n{fmt_levels_human(levels)}"
+    try:
+        await tg_photo(sess, caption, png)
+    except Exception:
+        if ledger is not None:
+            for r in reports:
+                await ledger.release(f"{sym}:{r.tf}:{close_ts}")
+        raise
+    if ledger is not None:
+        for r in reports:
+            await ledger.confirm(f"{sym}:{r.tf}:{close_ts}")
+    chart_store().record_alert(sym, tf, png, caption, close_ts / 1000)
+
 # === WORKER ===
-async def worker(sym,tf,poll,sess):
+# Потоки, чьи стартовые уровни уже отправлены: перезапуск воркера их не повторяет
+announced = set()
+
+async def send_levels(sym, tf, sess, st, ledger=None):
+    # С Redis уровни не повторяются и после перезапуска процесса (CLUSTER_ALERT_TTL_SEC)
+    if ledger is not None and not await ledger.claim(f"{sym}:{tf}:levels"):
+        return
+    png=plot_png(sym,tf,list(st.candles),st.levels)
+    try:
+        await tg_photo(sess, f"<b>{sym} {tf}m</b>\nСтартовые уровни:\n{fmt_levels_human(st.levels)}", png)
+    except Exception:
+        if ledger is not None:
+            await ledger.release(f"{sym}:{tf}:levels")
+        raise
+    if ledger is not None:
+        await ledger.confirm(f"{sym}:{tf}:levels")
+
+async def init_state(sym, tf, sess, history, ledger=None, announce=True):
+    """announce — слать ли стартовые уровни: только потокам из SYMBOLS×TF_LIST, не стратегиям"""
     st=State()
-    initial=await fetch_kline(sess,sym,tf,INIT_CANDLES)
-    for c in initial: st.candles.append(c)
-    st.last_ts=initial[-1]["ts"] if initial else None
+    for c in history: st.candles.append(c)
+    st.last_ts=history[-1]["ts"] if history else None
 
     ref = pick_biggest_candle(list(st.candles))
     if ref:
         st.levels = build_levels_from_candle(ref)
-        png=plot_png(sym,tf,list(st.candles),st.levels,HTML_OUTPUT_DIR)
-        await tg_photo(sess, f"<b>{sym} {tf}m</b>\nСтартовые уровни:\n{fmt_levels_human(st.levels)}", png)
+        if announce and (sym, tf) not in announced:
+            try:
+                await send_levels(sym, tf, sess, st, ledger)
+            except Exception as e:
+                print(f"{sym} {tf}m: стартовые уровни не отправлены: {e}")
+            announced.add((sym, tf))
+    return st
+
+async def detect_bar(sym, tf, st, closed, atr_prev, get_ob, coalescer):
+    """Сигналы по закрытому бару; False, если бар уже обработан"""
+    if st.last_ts is not None and closed["ts"] <= st.last_ts:
+        return False
+    st.candles.append(closed)
+    st.last_ts = closed["ts"]
+
+    last_bar = st.candles[-1]
+
+    close_ts = closed["ts"] + tf_ms(tf)
+    # Движение всего рынка или только этой монеты (по всем символам ТФ)
+    ctx = await market.observe(sym, tf, close_ts, closed) if ENABLE_MARKET_CONTEXT else None
+
+    if ENABLE_VOLUME_FILTER and (not candle_big_enough(last_bar) or not volume_growth_passed(list(st.candles))):
+        # Сигналы этого бара неактивны: иначе фронт следующего бара не сработает
+        alert_state.update(sym, tf, {}, close_ts / 1000)
+        if ENABLE_INDICATORS:
+            indicator_batch.skip((sym, tf), close_ts)
+        await coalescer.submit(sym, tf, close_ts, [])
+        return True
+
+    # Сигналы, активные на этом баре: ключ -> текст
+    active = {}
+
+    # RSI / Stoch
+    if ENABLE_INDICATORS:
+        # RSI/Stoch всех потоков, закрывшихся в этот момент, считаются одним проходом NumPy
+        ind = await indicator_batch.evaluate((sym, tf), close_ts, st.candles)
+        if ind.rsi_low:
+            active["rsi_low"] = f"RSI < {RSI_LOW}: {ind.rsi:.6g}"
+        if ind.rsi_high:
+            active["rsi_high"] = f"RSI > {RSI_HIGH}: {ind.rsi:.6g}"
+        if ind.rsi_touches:
+            active["rsi_touches"] = "Три касания RSI"
+        if ind.stoch_touches:
+            active["stoch_touches"] = "Три касания Stoch"
+
+    # ATR аномалия
+    if ENABLE_ATR_ANOMALY and atr_prev:
+        prev_close = st.candles[-2]["close"] if len(st.candles)>=2 else last_bar["close"]
+        tr = true_range(last_bar["high"], last_bar["low"], prev_close)
+        if tr >= ANOMALY_ATR_RATIO * atr_prev:
+            active["atr_anomaly"] = f"ATR anomaly {tr:.6g}"
+
+    # Паттерны
+    if ENABLE_PATTERNS:
+        for p in detect_patterns(list(st.candles)) or []:
+            active[f"pattern:{p}"] = p
+
+    # Стакан
+    if ENABLE_ORDERBOOK_ANOMALY:
+        try:
+            ob = await get_ob()
+        except ExchangeError:
+            ob = None
+        if ob:
+            bid1, ask1 = ob
+            st.ob_bids.append(bid1)
+            st.ob_asks.append(ask1)
+            if len(st.ob_bids) >= 5 and len(st.ob_asks) >= 5:
+                avg_b = sum(list(st.ob_bids)[:-1]) / max(1, len(st.ob_bids) - 1)
+                avg_a = sum(list(st.ob_asks)[:-1]) / max(1, len(st.ob_asks) - 1)
+                ob_alerts = []
+                if avg_b > 0 and bid1 >= ORDERBOOK_FACTOR * avg_b:
+                    ob_alerts.append(f"bid1 qty {bid1:.6g} (avg {avg_b:.6g}, ×{bid1/max(1e-12,avg_b):.2f})")
+                if avg_a > 0 and ask1 >= ORDERBOOK_FACTOR * avg_a:
+                    ob_alerts.append(f"ask1 qty {ask1:.6g} (avg {avg_a:.6g}, ×{ask1/max(1e-12,avg_a):.2f})")
+                if ob_alerts:
+                    active["orderbook"] = "Orderbook anomaly\n" + "\n".join(ob_alerts)
+
+    # Кулдаун и срабатывание по фронту, затем одно сообщение на все ТФ символа
+    fired = alert_state.update(sym, tf, active, close_ts / 1000)
+    pats = [text for key, text in fired.items() if key.startswith("pattern:")]
+    lines = [text for key, text in fired.items() if not key.startswith("pattern:")]
+    if pats:
+        lines.append(f"Pattern(s): {', '.join(pats)}")
+    if lines and ctx is not None and ctx.label:
+        lines.append(ctx.text())
+    await coalescer.submit(sym, tf, close_ts, lines, (list(st.candles), st.levels))
+    return True
+
+def close_delay(tf, poll):
+    """Пауза до опроса следующего закрытого бара: сразу после закрытия, недели и месяцы — по интервалу"""
+    step = tf_ms(tf)
+    return next_close_delay(step) if step and tf != "W" else poll
+
+async def fetch_closed(bybit, sym, tf, last_ts, poll):
+    """Закрытый бар новее last_ts; пока биржа его не отдала, повторяем до следующего закрытия"""
+    while True:
+        try:
+            latest = await bybit.get_klines(sym,tf,2)
+            closed = (latest[-2] if len(latest)>=2 else latest[-1]) if latest else None
+            if closed and (last_ts is None or closed["ts"] > last_ts):
+                return closed
+        except ExchangeError as e:
+            print(f"{sym} {tf}m: {e}")
+        if not tf_ms(tf) or tf == "W" or close_delay(tf, poll) <= POLL_RETRY_SEC:
+            return None
+        await asyncio.sleep(POLL_RETRY_SEC)
+
+async def worker(sym,tf,poll,sess,bybit,coalescer,ledger=None,announce=True):
+    initial=await bybit.get_klines(sym,tf,INIT_CANDLES)
+    # Последний бар ещё формируется
+    st=await init_state(sym,tf,sess,initial[:-1],ledger,announce)
+    atr_prev = await fetch_daily_atr_prev(bybit, sym, ATR_PERIOD_DAILY)
+    get_ob = functools.partial(bybit.get_orderbook_top, sym)
 
-    atr_prev = await fetch_daily_atr_prev(sess, sym, ATR_PERIOD_DAILY)
+    while True:
+        await asyncio.sleep(close_delay(tf, poll))
+        closed = await fetch_closed(bybit, sym, tf, st.last_ts, poll)
+        if closed:
+            await detect_bar(sym, tf, st, closed, atr_prev, get_ob, coalescer)
+
+def poll_sec(tf):
+    return POLL_SEC_FAST if tf in ("1", "3", "5", "15") else POLL_SEC_SLOW
+
+def reconcile(tasks, wanted, start, stop=None):
+    """Запустить недостающие задачи, снять лишние, перезапустить упавшие"""
+    for key in tasks.keys() - wanted:
+        tasks.pop(key).cancel()
+        if stop: stop(key)
+    for key, task in list(tasks.items()):
+        if task.done():
+            if not task.cancelled() and task.exception():
+                print(f"{key[0]} {key[1]}m: воркер упал: {task.exception()}")
+            start(key)
+    for key in wanted - tasks.keys():
+        start(key)
+
+# === КЛАСТЕР ===
+# Ingest-узлы делят символы по кольцу хешей и публикуют закрытые бары в Redis Streams,
+# detect-узлы делят партиции потоков и шлют алерты (SCANNER_MODE=ingest / detect)
+async def ingest_worker(sym,tf,poll,bybit,bus):
+    initial=await bybit.get_klines(sym,tf,INIT_CANDLES)
+    # Последний бар ещё формируется; последний закрытый публикуем заново —
+    # прежний владелец символа мог не успеть (повтор отсеют detect-узлы)
+    await bus.put_history(sym, tf, initial[:-2])
+    last_ts = initial[-3]["ts"] if len(initial)>=3 else None
+    atr_prev = await fetch_daily_atr_prev(bybit, sym, ATR_PERIOD_DAILY)
 
     while True:
-        latest = await fetch_kline(sess,sym,tf,2)
-        if not latest: 
-            await asyncio.sleep(poll); continue
-        closed = latest[-2] if len(latest)>=2 else latest[-1]
-
-        if st.last_ts is None or closed["ts"] > st.last_ts:
-            st.candles.append(closed)
-            st.last_ts = closed["ts"]
-
-            closes=[x["close"] for x in st.candles]
-            highs =[x["high"]  for x in st.candles]
-            lows  =[x["low"]   for x in st.candles]
-
-            last_bar = st.candles[-1]
-
-            if ENABLE_VOLUME_FILTER and (not candle_big_enough(last_bar) or not volume_growth_passed(list(st.candles))):
-                await asyncio.sleep(poll); continue
-
-            # RSI / Stoch
-            if ENABLE_INDICATORS:
-                rsi = compute_rsi(closes, RSI_PERIOD)
-                st_k, _ = compute_stoch(highs, lows, closes, STOCH_K, STOCH_D, STOCH_SMOOTH)
-
-                if len(rsi)>1 and not math.isnan(rsi[-1]):
-                    if rsi[-2] >= RSI_LOW and rsi[-1] < RSI_LOW:
-                        png=plot_png(sym,tf,list(st.candles),st.levels,HTML_OUTPUT_DIR)
-                        await tg_photo(sess, f"{sym} {tf}m RSI < {RSI_LOW}: {rsi[-1]:.6g}", png)
-                    if rsi[-2] <= RSI_HIGH and rsi[-1] > RSI_HIGH:
-                        png=plot_png(sym,tf,list(st.candles),st.levels,HTML_OUTPUT_DIR)
-                        await tg_photo(sess, f"{sym} {tf}m RSI > {RSI_HIGH}: {rsi[-1]:.6g}", png)
-
-                rsi_bin=[(v<RSI_LOW or v>RSI_HIGH) if not math.isnan(v) else False for v in rsi]
-                if three_touches(rsi_bin,THREE_TOUCH_LOOKBACK,THREE_TOUCH_SPACING):
-                    png=plot_png(sym,tf,list(st.candles),st.levels,HTML_OUTPUT_DIR)
-                    await tg_photo(sess, f"{sym} {tf}m Три касания RSI", png)
-
-                stoch_bin=[(k<20 or k>80) if not math.isnan(k) else False for k in st_k]
-                if three_touches(stoch_bin,THREE_TOUCH_LOOKBACK,THREE_TOUCH_SPACING):
-                    png=plot_png(sym,tf,list(st.candles),st.levels,HTML_OUTPUT_DIR)
-                    await tg_photo(sess, f"{sym} {tf}m Три касания Stoch", png)
-
-            # ATR аномалия
-            if ENABLE_ATR_ANOMALY and atr_prev:
-                prev_close = st.candles[-2]["close"] if len(st.candles)>=2 else last_bar["close"]
-                tr = true_range(last_bar["high"], last_bar["low"], prev_close)
-                if tr >= ANOMALY_ATR_RATIO * atr_prev:
-                    png=plot_png(sym,tf,list(st.candles),st.levels,HTML_OUTPUT_DIR)
-                    await tg_photo(sess, f"{sym} {tf}m ATR anomaly {tr:.6g}", png)
-
-            # Паттерны
-            if ENABLE_PATTERNS:
-                pats=detect_patterns(list(st.candles))
-                if pats:
-                    png=plot_png(sym,tf,list(st.candles),st.levels,HTML_OUTPUT_DIR)
-                    await tg_photo(sess, f"{sym} {tf}m Pattern(s): {', '.join(pats)}", png)
-
-            # Стакан
+        closed = await fetch_closed(bybit, sym, tf, last_ts, poll)
+        if closed:
+            ob = None
             if ENABLE_ORDERBOOK_ANOMALY:
-                ob = await fetch_orderbook(sess, sym)
-                if ob:
-                    bid1, ask1 = ob
-                    st.ob_bids.append(bid1)
-                    st.ob_asks.append(ask1)
-                    if len(st.ob_bids) >= 5 and len(st.ob_asks) >= 5:
-                        avg_b = sum(list(st.ob_bids)[:-1]) / max(1, len(st.ob_bids) - 1)
-                        avg_a = sum(list(st.ob_asks)[:-1]) / max(1, len(st.ob_asks) - 1)
-                        ob_alerts = []
-                        if avg_b > 0 and bid1 >= ORDERBOOK_FACTOR * avg_b:
-                            ob_alerts.append(f"bid1 qty {bid1:.6g} (avg {avg_b:.6g}, ×{bid1/max(1e-12,avg_b):.2f})")
-                        if avg_a > 0 and ask1 >= ORDERBOOK_FACTOR * avg_a:
-                            ob_alerts.append(f"ask1 qty {ask1:.6g} (avg {avg_a:.6g}, ×{ask1/max(1e-12,avg_a):.2f})")
-                        if ob_alerts:
-                            png = plot_png(sym, tf, list(st.candles), st.levels, HTML_OUTPUT_DIR)
-                            caption = f"{sym} {tf}m Orderbook anomaly\n" + "\n".join(ob_alerts) + f"\n{fmt_levels_human(st.levels)}"
-                            await tg_photo(sess, caption, png)
-
-        await asyncio.sleep(poll)
+                try:
+                    ob = await bybit.get_orderbook_top(sym)
+                except ExchangeError:
+                    pass
+            await bus.publish(sym, tf, closed, ob, atr_prev)
+            last_ts = closed["ts"]
+        await asyncio.sleep(close_delay(tf, poll))
+
+async def run_ingest(bybit, redis):
+    bus = BarBus(redis, history=MAX_CANDLES)
+    members = Membership(redis, "ingest")
+    registry = SubscriptionRegistry(static=[(sym, tf) for sym in SYMBOLS for tf in TF_LIST],
+                                    listed=SymbolDirectory(bybit.get_symbols).get)
+    ring, refreshed, tasks = HashRing([]), 0.0, {}
+
+    def start(key):
+        tasks[key] = asyncio.create_task(ingest_worker(key[0], key[1], poll_sec(key[1]), bybit, bus))
+
+    try:
+        while True:
+            try:
+                ring = HashRing(await members.beat())
+            except Exception as e:
+                print(f"Кластер (ingest): {e}")
+            if time.monotonic() - refreshed >= SCANNER_REFRESH_SEC:
+                refreshed = time.monotonic()
+                try:
+                    await registry.arefresh()
+                except Exception as e:
+                    print(f"Подписки не обновлены: {e}")
+            # Все ТФ символа опрашивает один узел
+            reconcile(tasks, {key for key in registry.streams if ring.owner(key[0]) == SCANNER_NODE_ID}, start)
+            await asyncio.sleep(CLUSTER_HEARTBEAT_SEC)
+    finally:
+        for task in tasks.values(): task.cancel()
+        await members.leave()
+
+async def run_detect(sess, redis, bybit):
+    bus = BarBus(redis, history=MAX_CANDLES)
+    ledger = AlertLedger(redis)
+    members = Membership(redis, "detect")
+    # Тот же отбор символов, что у ingest: иначе непубликуемые потоки ждал бы market/coalescer
+    registry = SubscriptionRegistry(static=[(sym, tf) for sym in SYMBOLS for tf in TF_LIST],
+                                    listed=SymbolDirectory(bybit.get_symbols).get)
+    states, partitions = {}, set()
+    unacked = defaultdict(list)  # (символ, закрытие) -> [(партиция, id)]
+
+    async def settle(sym, close_ts):
+        # Подтверждаем бары только после отправки группы: при падении узла их дочитает другой
+        by_partition = defaultdict(list)
+        for p, msg_id in unacked.pop((sym, close_ts), ()):
+            by_partition[p].append(msg_id)
+        for p, ids in by_partition.items():
+            await bus.ack(p, ids)
+
+    coalescer = Coalescer(functools.partial(send_group, sess, ledger=ledger), tf_ms=tf_ms, settled=settle)
+
+    async def handle(p, msg_id, fields):
+        sym, tf, bar, ob, atr_prev = decode_bar(fields)
+        if bus.partition(sym) not in partitions:
+            return
+        st = states.get((sym, tf))
+        if st is None:
+            # Новый поток или партиция перешла к этому узлу: история из Redis
+            st = states[(sym, tf)] = await init_state(sym, tf, sess, await bus.history(sym, tf, bar["ts"]), ledger,
+                                                      (sym, tf) in registry.static)
+            coalescer.track(sym, tf)
+            market.track(sym, tf)
+            indicator_batch.track((sym, tf), tf_ms(tf))
+        if st.last_ts is not None and bar["ts"] <= st.last_ts:
+            await bus.ack(p, [msg_id])
+            return
+        close_ts = bar["ts"] + tf_ms(tf)
+        unacked[(sym, close_ts)].append((p, msg_id))
+
+        async def get_ob():
+            return ob
+
+        await detect_bar(sym, tf, st, bar, atr_prev, get_ob, coalescer)
+
+    async def handle_stream(messages):
+        for p, msg_id, fields in messages:
+            try:
+                await handle(p, msg_id, fields)
+            except Exception as e:
+                # Остаётся неподтверждённым и будет перечитан
+                print(f"Бар {msg_id} не обработан: {e}")
+
+    async def handle_all(messages):
+        # Потоки параллельно (общий пакет индикаторов), бары одного потока по порядку
+        by_stream = defaultdict(list)
+        for m in messages:
+            by_stream[m[2].get("symbol"), m[2].get("tf")].append(m)
+        await asyncio.gather(*(handle_stream(ms) for ms in by_stream.values()))
+
+    async def rebalance():
+        nonlocal partitions
+        mine = {p for p in range(bus.partitions) if ring.owner(str(p)) == SCANNER_NODE_ID}
+        for key in [k for k in states if bus.partition(k[0]) not in mine]:
+            del states[key]
+            coalescer.untrack(*key)
+            market.untrack(*key)
+            alert_state.forget(*key)
+            indicator_batch.forget(key)
+        gained = mine - partitions
+        partitions = mine
+        for key in registry.streams:
+            if bus.partition(key[0]) in partitions:
+                coalescer.track(*key)
+                market.track(*key)
+                indicator_batch.track(key, tf_ms(key[1]))
+        for p in sorted(gained):
+            await bus.ensure_group(p)
+            # Забираем всё, что не подтвердил прежний владелец партиции
+            await handle_all([(p, i, f) for i, f in await bus.claim(p, SCANNER_NODE_ID, 0)])
+        for p in sorted(partitions - gained):
+            await handle_all([(p, i, f) for i, f in await bus.claim(p, SCANNER_NODE_ID, CLUSTER_CLAIM_IDLE_SEC)])
+
+    ring, refreshed, beat = HashRing([]), 0.0, 0.0
+    try:
+        while True:
+            if time.monotonic() - beat >= CLUSTER_HEARTBEAT_SEC:
+                beat = time.monotonic()
+                if beat - refreshed >= SCANNER_REFRESH_SEC:
+                    refreshed = beat
+                    try:
+                        await registry.arefresh()
+                    except Exception as e:
+                        print(f"Подписки не обновлены: {e}")
+                try:
+                    ring = HashRing(await members.beat())
+                    await rebalance()
+                except Exception as e:
+                    print(f"Кластер (detect): {e}")
+                chart_store().flush()
+            try:
+                await handle_all(await bus.read(partitions, SCANNER_NODE_ID, block_ms=1000))
+            except Exception as e:
+                print(f"Кластер (detect): {e}")
+                await asyncio.sleep(1)
+    finally:
+        await members.leave()
 
 # === MAIN ===
 async def main():
     # DNS fix для Termux
     conn = aiohttp.TCPConnector(limit=50, resolver=resolver.ThreadedResolver())
     async with aiohttp.ClientSession(connector=conn) as sess:
-        tasks = []
-        for sym in SYMBOLS:
-            for tf in TF_LIST:
-                poll = POLL_SEC_FAST if tf in ("5", "15") else POLL_SEC_SLOW
-                tasks.append(asyncio.create_task(worker(sym, tf, poll, sess)))
-        await asyncio.gather(*tasks)
+        roles = scanner_roles()
+        if roles:
+            redis = get_async_redis()
+            if redis is None or roles - {"ingest", "detect"}:
+                raise RuntimeError(f"SCANNER_MODE={SCANNER_MODE}: нужны роли ingest/detect и REDIS_URL")
+            jobs = []
+            if "ingest" in roles: jobs.append(run_ingest(BybitClient(session=sess), redis))
+            if "detect" in roles: jobs.append(run_detect(sess, redis, BybitClient(session=sess)))
+            await asyncio.gather(*jobs)
+            return
+
+        # Биржевой клиент на общей сессии: лимиты Bybit, ретраи, метрики
+        bybit = BybitClient(session=sess)
+        coalescer = Coalescer(functools.partial(send_group, sess), tf_ms=tf_ms)
+        # Потоки = SYMBOLS×TF_LIST + (символ, ТФ) индикаторных стратегий на символах Bybit, без дублей
+        registry = SubscriptionRegistry(static=[(sym, tf) for sym in SYMBOLS for tf in TF_LIST],
+                                        listed=SymbolDirectory(bybit.get_symbols).get)
+        # С Redis стартовые уровни не повторяются и после перезапуска
+        redis = get_async_redis()
+        ledger = AlertLedger(redis) if redis is not None else None
+        tasks = {}
+
+        def start(key):
+            sym, tf = key
+            coalescer.track(sym, tf)
+            market.track(sym, tf)
+            indicator_batch.track(key, tf_ms(tf))
+            tasks[key] = asyncio.create_task(worker(sym, tf, poll_sec(tf), sess, bybit, coalescer,
+                                                    ledger, key in registry.static))
+
+        def stop(key):
+            coalescer.untrack(*key)
+            market.untrack(*key)
+            alert_state.forget(*key)
+            indicator_batch.forget(key)
+
+        while True:
+            try:
+                await registry.arefresh()
+            except Exception as e:
+                print(f"Подписки не обновлены: {e}")
+            reconcile(tasks, set(registry.streams), start, stop)
+            chart_store().flush()
+            await asyncio.sleep(SCANNER_REFRESH_SEC)
 
 if __name__ == "__main__":
     try:
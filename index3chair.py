@@ -1,18 +1,28 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os, asyncio, math, time
+import os, asyncio, functools, math
 from collections import deque
 from dotenv import load_dotenv
 import aiohttp
 from aiohttp import resolver
 from PIL import Image, ImageDraw
+from app.exchanges.base import ExchangeError
+from app.exchanges.bybit import BybitClient
+from app.scanner.alert_state import AlertState
+from app.scanner.batch import IndicatorBatch
+from app.scanner.chart_store import ChartStore
+from app.scanner.coalescer import Coalescer, interval_ms
+from app.scanner.market import MarketDetector
+from app.services.subscriptions import SCANNER_REFRESH_SEC, SubscriptionRegistry, SymbolDirectory
+from app.services.indicators import true_range, compute_atr, detect_patterns
 
 load_dotenv()
 TELEGRAM_BOT_TOKEN   = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID     = os.getenv("TELEGRAM_CHAT_ID")
 TELEGRAM_CHANNEL_ID  = os.getenv("TELEGRAM_CHANNEL_ID")
 HTML_OUTPUT_DIR      = os.getenv("HTML_OUTPUT_DIR", "/data/data/com.termux/files/home/www")
+TELEGRAM_API_URL     = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
 if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID or not TELEGRAM_CHANNEL_ID:
     raise RuntimeError("В .env должны быть TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_CHANNEL_ID")
 
@@ -21,6 +31,7 @@ ENABLE_INDICATORS = True
 ENABLE_ATR_ANOMALY = True
 ENABLE_VOLUME_FILTER = True
 ENABLE_ORDERBOOK_ANOMALY = True
+ENABLE_MARKET_CONTEXT = True
 
 SYMBOLS = ["SOLUSDT","INJUSDT","WIFUSDT","ADAUSDT"]
 TF_LIST = ["5","15","60","240"]
@@ -46,65 +57,9 @@ VOL_GROWTH_WINDOW = 50
 ORDERBOOK_WINDOW = 30
 ORDERBOOK_FACTOR = 2.0
 
-POLL_SEC_FAST = 60
-POLL_SEC_SLOW = 180
+POLL_SEC_FAST = float(os.getenv("POLL_SEC_FAST", "60"))
+POLL_SEC_SLOW = float(os.getenv("POLL_SEC_SLOW", "180"))
 
-BASE_URL = "https://api.bybit.com"
-
-def ensure_dir(p): os.makedirs(p, exist_ok=True)
-
-def compute_rsi(close, period=14):
-    n = len(close)
-    if n < period + 1: return [math.nan]*n
-    gains=[0.0]; losses=[0.0]
-    for i in range(1,n):
-        ch=close[i]-close[i-1]
-        gains.append(max(ch,0.0)); losses.append(max(-ch,0.0))
-    ag=sum(gains[1:period+1])/period; al=sum(losses[1:period+1])/period
-    rsi=[math.nan]*period
-    rsi.append(100.0 if al==0 else 100.0 - (100.0/(1.0+ag/al)))
-    for i in range(period+1,n):
-        ag=(ag*(period-1)+gains[i])/period
-        al=(al*(period-1)+losses[i])/period
-        rsi.append(100.0 if al==0 else 100.0 - (100.0/(1.0+ag/al)))
-    return rsi
-
-def compute_stoch(h,l,c,k=14,d=3,s=3):
-    n=len(c)
-    if n<k: return [math.nan]*n, [math.nan]*n
-    raw=[math.nan]*n
-    for i in range(k-1,n):
-        hh=max(h[i-k+1:i+1]); ll=min(l[i-k+1:i+1])
-        raw[i]=50.0 if hh==ll else (c[i]-ll)/(hh-ll)*100.0
-    ksm=[math.nan]*n
-    for i in range(k-1+s-1,n):
-        ksm[i]=sum(raw[i-s+1:i+1])/s
-    dsm=[math.nan]*n
-    for i in range(k-1+s-1+d-1,n):
-        dsm[i]=sum(ksm[i-d+1:i+1])/d
-    return ksm,dsm
-
-def true_range(h,l,prev_close): return max(h-l, abs(h-prev_close), abs(l-prev_close))
-
-def compute_atr(h,l,c,period):
-    n=len(c)
-    if n<period+1: return [math.nan]*n
-    trs=[math.nan]+[true_range(h[i],l[i],c[i-1]) for i in range(1,n)]
-    atr=[math.nan]*period
-    atr.append(sum(trs[1:period+1])/period)
-    for i in range(period+1,n):
-        atr.append((atr[-1]*(period-1)+trs[i])/period)
-    return atr
-
-def three_touches(binary_series, lookback, spacing):
-    idxs=[i for i,v in enumerate(binary_series[-lookback:]) if v]
-    if len(idxs)<3: return False
-    cnt,last=1,idxs[0]
-    for i in idxs[1:]:
-        if i-last>=spacing:
-            cnt+=1; last=i
-            if cnt>=3: return True
-    return False
 
 def candle_effective_size(c):
     o,h,l,cl = c["open"], c["high"], c["low"], c["close"]
@@ -126,24 +81,8 @@ def volume_growth_passed(candles):
     avg = (sum(vols)/len(vols)) if vols else 0.0
     return avg>0 and candles[-1]["volume"] >= VOL_GROWTH_FACTOR * avg
 
-async def fetch_kline(s,symbol,interval,limit):
-    url=f"{BASE_URL}/v5/market/kline"
-    params={"category":"linear","symbol":symbol,"interval":interval,"limit":str(limit)}
-    async with s.get(url,params=params,timeout=20) as r:
-        data=await r.json()
-        lst=sorted(data["result"]["list"], key=lambda x:int(x[0]))
-        return [{"ts":int(x[0]),"open":float(x[1]),"high":float(x[2]),"low":float(x[3]),"close":float(x[4]),"volume":float(x[5])} for x in lst]
-
-async def fetch_orderbook(s, symbol, limit=50):
-    url=f"{BASE_URL}/v5/market/orderbook"
-    params={"category":"linear","symbol":symbol,"limit":str(limit)}
-    async with s.get(url,params=params,timeout=20) as r:
-        data=await r.json()
-        ob=data["result"]
-        return float(ob["b"][0][1]), float(ob["a"][0][1])
-
-async def fetch_daily_atr_prev(s,symbol,period=14):
-    kl=await fetch_kline(s,symbol,"D",max(period+2,20))
+async def fetch_daily_atr_prev(bybit,symbol,period=14):
+    kl=await bybit.get_klines(symbol,"D",max(period+2,20))
     if len(kl)<period+1: return None
     h=[x["high"] for x in kl]; l=[x["low"] for x in kl]; c=[x["close"] for x in kl]
     atr=compute_atr(h,l,c,period)
@@ -157,10 +96,10 @@ async def tg_photo(s,caption,image_path):
             form.add_field("caption",caption)
             form.add_field("parse_mode","HTML")
             form.add_field("photo",f,filename=os.path.basename(image_path),content_type="image/png")
-            await s.post(f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto",data=form)
+            await s.post(f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/sendPhoto",data=form)
 
 async def send_telegram_text(s, text: str):
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     for chat in (TELEGRAM_CHAT_ID, TELEGRAM_CHANNEL_ID):
         data = {"chat_id": chat, "text": text, "parse_mode": "HTML", "disable_web_page_preview": True}
         try:
@@ -169,8 +108,11 @@ async def send_telegram_text(s, text: str):
         except Exception:
             pass
 
-def plot_png(sym,tf,cand,levs,save):
-    ensure_dir(save)
+@functools.lru_cache(maxsize=None)
+def chart_store():
+    return ChartStore(HTML_OUTPUT_DIR)
+
+def plot_png(sym,tf,cand,levs):
     d=cand[-CHART_BARS:]
     W,H=1100,500; L,R,T,B=70,30,30,60
     img=Image.new("RGB",(W,H),(20,20,24)); drw=ImageDraw.Draw(img)
@@ -193,9 +135,8 @@ def plot_png(sym,tf,cand,levs,save):
             drw.line([(L,y(v)),(W-R,y(v))],fill=(120,120,200))
             drw.text((W-R-140,y(v)-12),f"{k} {v:.6g}",fill=(220,220,230))
     drw.text((L,8),f"{sym} TF {tf}",fill=(230,230,240))
-    path=os.path.join(save,f"{sym}_{tf}_{int(time.time())}.png")
-    img.save(path,"PNG")
-    return path
+    # Имя = хеш содержимого, объём каталога ограничен (LRU)
+    return chart_store().save(img,sym,tf)
 def pick_biggest_candle(candles):
     if not candles: return None
     best_idx=0; best_size=-1.0
@@ -223,24 +164,6 @@ def build_levels_from_candle(c):
 def fmt_levels_human(levels):
     return ("A={A:.6g} | C={C:.6g} | D={D:.6g} | F={F:.6g}").format(**{k:float(v) for k,v in levels.items()})
 
-def detect_patterns(candles):
-    if len(candles)<4: return None
-    c1,c2,c3,c4 = candles[-4],candles[-3],candles[-2],candles[-1]
-    out=[]
-    body=lambda c: abs(c["close"]-c["open"])
-    rng=lambda c: c["high"]-c["low"]
-    if rng(c4)>0 and body(c4)/rng(c4) < 0.1:
-        out.append("Doji")
-    if c3["close"]<c3["open"] and c4["close"]>c4["open"] and c4["close"]>c3["open"] and c4["open"]<c3["close"]:
-        out.append("Bullish Engulfing")
-    if c3["close"]>c3["open"] and c4["close"]<c4["open"] and c4["close"]<c3["open"] and c4["open"]>c3["close"]:
-        out.append("Bearish Engulfing")
-    if all(c["close"]>c["open"] for c in [c2,c3,c4]):
-        out.append("Three White Soldiers")
-    if all(c["close"]<c["open"] for c in [c2,c3,c4]):
-        out.append("Three Black Crows")
-    return out if out else None
-
 class State:
     def __init__(self):
         self.candles=deque(maxlen=MAX_CANDLES)
@@ -249,59 +172,80 @@ class State:
         self.ob_bids=deque(maxlen=ORDERBOOK_WINDOW)
         self.ob_asks=deque(maxlen=ORDERBOOK_WINDOW)
 
-async def worker(sym,tf,poll,sess):
+alert_state = AlertState()
+market = MarketDetector()
+indicator_batch = IndicatorBatch(RSI_PERIOD, RSI_LOW, RSI_HIGH, STOCH_K, STOCH_SMOOTH,
+                                 THREE_TOUCH_LOOKBACK, THREE_TOUCH_SPACING)
+
+async def send_group(sess, sym, close_ts, reports):
+    reports.sort(key=lambda r: interval_ms(r.tf))
+    tf = reports[0].tf
+    candles, levels = reports[0].chart
+    png = plot_png(sym, tf, candles, levels)
+    caption = (
+        f"<b>{sym} {'/'.join(r.tf + 'm' for r in reports)}</b>\n"
+        f"{fmt_levels_human(levels)}\n\n" +
+        "\n".join(f"• {r.tf}m {e}" for r in reports for e in r.lines)
+    )
+    await tg_photo(sess, caption, png)
+    chart_store().record_alert(sym, tf, png, caption, close_ts / 1000)
+
+async def worker(sym,tf,poll,sess,bybit,coalescer):
     st=State()
-    initial=await fetch_kline(sess,sym,tf,INIT_CANDLES)
+    initial=await bybit.get_klines(sym,tf,INIT_CANDLES)
     for c in initial: st.candles.append(c)
     st.last_ts=initial[-1]["ts"] if initial else None
     ref = pick_biggest_candle(list(st.candles))
     if ref:
         st.levels = build_levels_from_candle(ref)
-    atr_prev = await fetch_daily_atr_prev(sess, sym, ATR_PERIOD_DAILY)
+    atr_prev = await fetch_daily_atr_prev(bybit, sym, ATR_PERIOD_DAILY)
     while True:
-        latest = await fetch_kline(sess,sym,tf,2)
+        try:
+            latest = await bybit.get_klines(sym,tf,2)
+        except ExchangeError as e:
+            print(f"{sym} {tf}m: {e}")
+            await asyncio.sleep(poll); continue
         if not latest:
             await asyncio.sleep(poll); continue
         closed = latest[-2] if len(latest)>=2 else latest[-1]
         if st.last_ts is None or closed["ts"] > st.last_ts:
             st.candles.append(closed)
             st.last_ts = closed["ts"]
-            closes=[x["close"] for x in st.candles]
-            highs =[x["high"]  for x in st.candles]
-            lows  =[x["low"]   for x in st.candles]
             last_bar = st.candles[-1]
             new_ref = pick_biggest_candle(list(st.candles))
             if new_ref and (st.levels is None or candle_effective_size(new_ref) > candle_effective_size(ref)):
                 ref = new_ref
                 st.levels = build_levels_from_candle(ref)
+            close_ts = closed["ts"] + interval_ms(tf)
+            ctx = await market.observe(sym, tf, close_ts, closed) if ENABLE_MARKET_CONTEXT else None
             if ENABLE_VOLUME_FILTER and (not candle_big_enough(last_bar) or not volume_growth_passed(list(st.candles))):
+                await coalescer.submit(sym, tf, close_ts, [])
                 await asyncio.sleep(poll); continue
-            events = []
+            active = {}
             if ENABLE_INDICATORS:
-                rsi = compute_rsi(closes, RSI_PERIOD)
-                st_k, _ = compute_stoch(highs, lows, closes, STOCH_K, STOCH_D, STOCH_SMOOTH)
-                if len(rsi)>1 and not math.isnan(rsi[-1]):
-                    if rsi[-2] >= RSI_LOW and rsi[-1] < RSI_LOW:
-                        events.append(f"RSI < {RSI_LOW}: {rsi[-1]:.6g}")
-                    if rsi[-2] <= RSI_HIGH and rsi[-1] > RSI_HIGH:
-                        events.append(f"RSI > {RSI_HIGH}: {rsi[-1]:.6g}")
-                rsi_bin=[(v<RSI_LOW or v>RSI_HIGH) if not math.isnan(v) else False for v in rsi]
-                if three_touches(rsi_bin,THREE_TOUCH_LOOKBACK,THREE_TOUCH_SPACING):
-                    events.append("Три касания RSI")
-                stoch_bin=[(k<20 or k>80) if not math.isnan(k) else False for k in st_k]
-                if three_touches(stoch_bin,THREE_TOUCH_LOOKBACK,THREE_TOUCH_SPACING):
-                    events.append("Три касания Stoch")
+                # RSI/Stoch всех потоков, закрывшихся в этот момент, считаются одним проходом NumPy
+                ind = await indicator_batch.evaluate((sym, tf), close_ts, st.candles)
+                if ind.rsi_low:
+                    active["rsi_low"] = f"RSI < {RSI_LOW}: {ind.rsi:.6g}"
+                if ind.rsi_high:
+                    active["rsi_high"] = f"RSI > {RSI_HIGH}: {ind.rsi:.6g}"
+                if ind.rsi_touches:
+                    active["rsi_touches"] = "Три касания RSI"
+                if ind.stoch_touches:
+                    active["stoch_touches"] = "Три касания Stoch"
             if ENABLE_ATR_ANOMALY and atr_prev:
                 prev_close = st.candles[-2]["close"] if len(st.candles)>=2 else last_bar["close"]
                 tr = true_range(last_bar["high"], last_bar["low"], prev_close)
                 if tr >= ANOMALY_ATR_RATIO * atr_prev:
-                    events.append(f"ATR anomaly {tr:.6g}")
+                    active["atr_anomaly"] = f"ATR anomaly {tr:.6g}"
             if ENABLE_PATTERNS:
-                pats=detect_patterns(list(st.candles))
-                if pats:
-                    events.append("Паттерны: " + ", ".join(pats))
+                for p in detect_patterns(list(st.candles)) or []:
+                    active[f"pattern:{p}"] = p
             if ENABLE_ORDERBOOK_ANOMALY:
-                ob = await fetch_orderbook(sess, sym)
+                try:
+                    ob = await bybit.get_orderbook_top(sym)
+                except ExchangeError:
+                    ob = None
                 if ob:
                     bid1, ask1 = ob
                     st.ob_bids.append(bid1)
@@ -310,27 +254,60 @@ async def worker(sym,tf,poll,sess):
                         avg_b = sum(list(st.ob_bids)[:-1]) / max(1, len(st.ob_bids) - 1)
                         avg_a = sum(list(st.ob_asks)[:-1]) / max(1, len(st.ob_asks) - 1)
                         if avg_b > 0 and bid1 >= ORDERBOOK_FACTOR * avg_b:
-                            events.append(f"Orderbook: bid1 {bid1:.6g} (avg {avg_b:.6g}, ×{bid1/max(1e-12,avg_b):.2f})")
+                            active["orderbook_bid"] = f"Orderbook: bid1 {bid1:.6g} (avg {avg_b:.6g}, ×{bid1/max(1e-12,avg_b):.2f})"
                         if avg_a > 0 and ask1 >= ORDERBOOK_FACTOR * avg_a:
-                            events.append(f"Orderbook: ask1 {ask1:.6g} (avg {avg_a:.6g}, ×{ask1/max(1e-12,avg_a):.2f})")
-            if events and st.levels:
-                png=plot_png(sym,tf,list(st.candles),st.levels,HTML_OUTPUT_DIR)
-                caption = (
-                    f"<b>{sym} {tf}m</b>\n"
-                    f"{fmt_levels_human(st.levels)}\n\n" +
-                    "\n".join(f"• {e}" for e in events)
-                )
-                await tg_photo(sess, caption, png)
+                            active["orderbook_ask"] = f"Orderbook: ask1 {ask1:.6g} (avg {avg_a:.6g}, ×{ask1/max(1e-12,avg_a):.2f})"
+            fired = alert_state.update(sym, tf, active, close_ts / 1000)
+            pats = [text for key, text in fired.items() if key.startswith("pattern:")]
+            events = [text for key, text in fired.items() if not key.startswith("pattern:")]
+            if pats:
+                events.append("Паттерны: " + ", ".join(pats))
+            if events and ctx is not None and ctx.label:
+                events.append(ctx.text())
+            await coalescer.submit(sym, tf, close_ts, events if st.levels else [], (list(st.candles), st.levels))
         await asyncio.sleep(poll)
 async def main():
     conn = aiohttp.TCPConnector(limit=50, resolver=resolver.ThreadedResolver())
     async with aiohttp.ClientSession(connector=conn) as sess:
-        tasks = []
-        for sym in SYMBOLS:
-            for tf in TF_LIST:
-                poll = POLL_SEC_FAST if tf in ("5", "15") else POLL_SEC_SLOW
-                tasks.append(asyncio.create_task(worker(sym, tf, poll, sess)))
-        await asyncio.gather(*tasks)
+        # Биржевой клиент на общей сессии: лимиты Bybit, ретраи, метрики
+        bybit = BybitClient(session=sess)
+        coalescer = Coalescer(functools.partial(send_group, sess))
+        # Потоки = SYMBOLS×TF_LIST + (символ, ТФ) индикаторных стратегий на символах Bybit, без дублей
+        registry = SubscriptionRegistry(static=[(sym, tf) for sym in SYMBOLS for tf in TF_LIST],
+                                        listed=SymbolDirectory(bybit.get_symbols).get)
+        tasks = {}
+
+        def start(key):
+            sym, tf = key
+            poll = POLL_SEC_FAST if tf in ("1", "3", "5", "15") else POLL_SEC_SLOW
+            coalescer.track(sym, tf)
+            market.track(sym, tf)
+            tasks[key] = asyncio.create_task(worker(sym, tf, poll, sess, bybit, coalescer))
+
+        for key in registry.streams:
+            start(key)
+        while True:
+            try:
+                added, removed = await registry.arefresh()
+            except Exception as e:
+                print(f"Подписки не обновлены: {e}")
+                added, removed = [], []
+            for key in removed:
+                tasks.pop(key).cancel()
+                coalescer.untrack(*key)
+                market.untrack(*key)
+                alert_state.forget(*key)
+                indicator_batch.forget(key)
+            for key in added:
+                start(key)
+            # Упавший воркер перезапускаем
+            for key, task in list(tasks.items()):
+                if task.done():
+                    if not task.cancelled() and task.exception():
+                        print(f"{key[0]} {key[1]}m: воркер упал: {task.exception()}")
+                    start(key)
+            chart_store().flush()
+            await asyncio.sleep(SCANNER_REFRESH_SEC)
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,63 @@
+"""initial schema
+
+Tables as previously created by Base.metadata.create_all. Existing
+databases should be marked with `alembic stamp 0001` instead of upgraded.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Uuid(), primary_key=True),
+        sa.Column('email', sa.String(255), nullable=False, unique=True),
+        sa.Column('hashed_password', sa.String(255), nullable=False),
+        sa.Column('telegram_chat_id', sa.String(255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+    )
+    op.create_table(
+        'strategies',
+        sa.Column('id', sa.Uuid(), primary_key=True),
+        sa.Column('user_id', sa.Uuid(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('source', sa.String(50), nullable=False),
+        sa.Column('symbol', sa.String(50), nullable=False),
+        sa.Column('condition_type', sa.String(50), nullable=False),
+        sa.Column('condition_value', sa.Float(), nullable=False),
+        sa.Column('check_interval', sa.Integer(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('notification_type', sa.String(50), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_checked', sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        'alerts',
+        sa.Column('id', sa.Uuid(), primary_key=True),
+        sa.Column('strategy_id', sa.Uuid(), sa.ForeignKey('strategies.id'), nullable=False),
+        sa.Column('user_id', sa.Uuid(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('message', sa.String(), nullable=False),
+        sa.Column('trigger_value', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('alerts')
+    op.drop_table('strategies')
+    op.drop_table('users')
@@ -0,0 +1,31 @@
+"""keyset pagination indexes for alerts and strategies
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Build without locking writes on large existing tables
+    with op.get_context().autocommit_block():
+        op.create_index('ix_alerts_user_created_id', 'alerts', ['user_id', 'created_at', 'id'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_strategies_user_created_id', 'strategies', ['user_id', 'created_at', 'id'],
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_strategies_user_created_id', table_name='strategies')
+    op.drop_index('ix_alerts_user_created_id', table_name='alerts')
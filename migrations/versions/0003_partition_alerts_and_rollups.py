@@ -0,0 +1,118 @@
+"""partition alerts by month and add daily rollups
+
+On Postgres the alerts table is rebuilt as a RANGE (created_at) partitioned
+table with monthly partitions plus a default partition, and existing rows
+are copied over. Other databases keep the plain table.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months of partitions created past the current one
+PARTITIONS_AHEAD = 2
+
+
+def _next_month(d: date) -> date:
+    return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+def _create_partitions(start: date) -> None:
+    """Monthly partitions from start's month through PARTITIONS_AHEAD months past today, plus the default"""
+    op.execute("CREATE TABLE IF NOT EXISTS alerts_default PARTITION OF alerts DEFAULT")
+    month = date(start.year, start.month, 1)
+    last = date.today().replace(day=1)
+    for _ in range(PARTITIONS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS alerts_y{month.year:04d}m{month.month:02d} PARTITION OF alerts "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        )
+        month = _next_month(month)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'alert_daily_rollups',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('user_id', sa.Uuid(), primary_key=True),
+        sa.Column('strategy_id', sa.Uuid(), primary_key=True),
+        sa.Column('alert_count', sa.Integer(), nullable=False),
+        sa.Column('min_trigger', sa.Float(), nullable=True),
+        sa.Column('max_trigger', sa.Float(), nullable=True),
+        sa.Column('last_alert_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_alert_daily_rollups_user_day', 'alert_daily_rollups', ['user_id', 'day'])
+
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE alerts RENAME TO alerts_legacy")
+    op.execute("ALTER TABLE alerts_legacy RENAME CONSTRAINT alerts_pkey TO alerts_legacy_pkey")
+    op.execute("ALTER INDEX ix_alerts_user_created_id RENAME TO ix_alerts_legacy_user_created_id")
+    op.execute("""
+        CREATE TABLE alerts (
+            id UUID NOT NULL,
+            strategy_id UUID NOT NULL REFERENCES strategies (id),
+            user_id UUID NOT NULL REFERENCES users (id),
+            message VARCHAR NOT NULL,
+            trigger_value FLOAT NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("CREATE INDEX ix_alerts_user_created_id ON alerts (user_id, created_at, id)")
+
+    oldest = conn.execute(sa.text("SELECT min(created_at) FROM alerts_legacy")).scalar()
+    since = oldest.date() if oldest else date.today()
+    _create_partitions(since)
+    op.execute("""
+        INSERT INTO alerts (id, strategy_id, user_id, message, trigger_value, created_at)
+        SELECT id, strategy_id, user_id, message, trigger_value, COALESCE(created_at, now() AT TIME ZONE 'utc')
+        FROM alerts_legacy
+    """)
+    op.execute("DROP TABLE alerts_legacy")
+    conn.execute(sa.text("""
+        INSERT INTO alert_daily_rollups (day, user_id, strategy_id, alert_count, min_trigger, max_trigger, last_alert_at)
+        SELECT date(created_at), user_id, strategy_id, count(*), min(trigger_value), max(trigger_value), max(created_at)
+        FROM alerts
+        WHERE created_at >= :since
+        GROUP BY date(created_at), user_id, strategy_id
+    """), {"since": since})
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name == 'postgresql':
+        op.execute("ALTER TABLE alerts RENAME TO alerts_partitioned")
+        op.execute("ALTER INDEX ix_alerts_user_created_id RENAME TO ix_alerts_partitioned_user_created_id")
+        op.execute("""
+            CREATE TABLE alerts (
+                id UUID PRIMARY KEY,
+                strategy_id UUID NOT NULL REFERENCES strategies (id),
+                user_id UUID NOT NULL REFERENCES users (id),
+                message VARCHAR NOT NULL,
+                trigger_value FLOAT NOT NULL,
+                created_at TIMESTAMP WITHOUT TIME ZONE
+            )
+        """)
+        op.execute("INSERT INTO alerts SELECT id, strategy_id, user_id, message, trigger_value, created_at FROM alerts_partitioned")
+        op.execute("DROP TABLE alerts_partitioned CASCADE")
+        op.execute("CREATE INDEX ix_alerts_user_created_id ON alerts (user_id, created_at, id)")
+    op.drop_index('ix_alert_daily_rollups_user_day', table_name='alert_daily_rollups')
+    op.drop_table('alert_daily_rollups')
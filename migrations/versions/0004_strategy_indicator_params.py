@@ -0,0 +1,30 @@
+"""kline interval and indicator period on strategies
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('strategies') as batch_op:
+        batch_op.add_column(sa.Column('interval', sa.String(10), nullable=False, server_default='1h'))
+        batch_op.add_column(sa.Column('indicator_period', sa.Integer(), nullable=False, server_default='14'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('strategies') as batch_op:
+        batch_op.drop_column('indicator_period')
+        batch_op.drop_column('interval')
@@ -0,0 +1,27 @@
+"""condition expression on strategies
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('strategies', sa.Column('expression', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('strategies') as batch_op:
+        batch_op.drop_column('expression')
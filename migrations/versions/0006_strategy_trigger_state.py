@@ -0,0 +1,37 @@
+"""edge trigger state and re-arm rules on strategies
+
+Existing strategies become edge-triggered and start armed.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('strategies', sa.Column('trigger_mode', sa.String(10), nullable=False, server_default='edge'))
+    op.add_column('strategies', sa.Column('hysteresis_pct', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('strategies', sa.Column('rearm_after_sec', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('strategies', sa.Column('trigger_state', sa.String(10), nullable=False, server_default='armed'))
+    op.add_column('strategies', sa.Column('triggered_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('strategies') as batch_op:
+        batch_op.drop_column('triggered_at')
+        batch_op.drop_column('trigger_state')
+        batch_op.drop_column('rearm_after_sec')
+        batch_op.drop_column('hysteresis_pct')
+        batch_op.drop_column('trigger_mode')
@@ -0,0 +1,59 @@
+"""alerts keyed by (id, created_at) on every backend
+
+0003 gives the partitioned Postgres table PRIMARY KEY (id, created_at) with
+created_at NOT NULL, which is what the model declares. Other databases kept
+the 0001 table (id alone, created_at nullable); rebuild it to match.
+Rows without created_at get the migration time.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _rebuild_alerts(composite: bool) -> None:
+    """Recreate alerts with the given key, keeping rows and the feed index"""
+    op.create_table(
+        'alerts_rebuilt',
+        sa.Column('id', sa.Uuid(), primary_key=True),
+        sa.Column('strategy_id', sa.Uuid(), sa.ForeignKey('strategies.id'), nullable=False),
+        sa.Column('user_id', sa.Uuid(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('message', sa.String(), nullable=False),
+        sa.Column('trigger_value', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), primary_key=composite, nullable=not composite),
+    )
+    op.execute("""
+        INSERT INTO alerts_rebuilt (id, strategy_id, user_id, message, trigger_value, created_at)
+        SELECT id, strategy_id, user_id, message, trigger_value, created_at FROM alerts
+    """)
+    op.drop_index('ix_alerts_user_created_id', table_name='alerts')
+    op.drop_table('alerts')
+    op.rename_table('alerts_rebuilt', 'alerts')
+    op.create_index('ix_alerts_user_created_id', 'alerts', ['user_id', 'created_at', 'id'])
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name == 'postgresql':
+        return
+    conn.execute(sa.text("UPDATE alerts SET created_at = :now WHERE created_at IS NULL"), {"now": datetime.utcnow()})
+    _rebuild_alerts(composite=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        return
+    _rebuild_alerts(composite=False)
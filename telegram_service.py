@@ -1,35 +0,0 @@
-import requests
-import logging
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-logger = logging.getLogger(__name__)
-
-def send_telegram_message(chat_id: str, message: str) -> bool:
-    """Send message to Telegram chat"""
-    bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
-    if not bot_token:
-        logger.error("TELEGRAM_BOT_TOKEN not set")
-        return False
-        
-    if not chat_id:
-        logger.error("Chat ID not provided")
-        return False
-        
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    
-    payload = {
-        "chat_id": chat_id,
-        "text": message,
-        "parse_mode": "HTML"
-    }
-    
-    try:
-        response = requests.post(url, json=payload, timeout=10)
-        response.raise_for_status()
-        return True
-    except Exception as e:
-        logger.error(f"Error sending Telegram message: {e}")
-        return False
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from app.services.expressions import ExpressionError, compile_template, parse
+
+def test_literals_become_parameters_of_a_shared_template():
+    a = parse("close > 25000 and rsi(14) < 30")
+    b = parse("close > 60000 and rsi(14) < 25")
+    assert a.template == b.template
+    assert a.params == (25000.0, 30.0)
+    assert b.params == (60000.0, 25.0)
+    assert a.series == frozenset({("rsi", 14)})
+
+def test_template_evaluates_over_a_parameter_matrix():
+    plan = parse("close > 100 and volume_ratio(20) >= 1.5")
+    params = np.array([[100.0, 150.0], [1.5, 1.0]])
+    env = {"close": 120.0, "volume_20": 1.5}
+    assert list(compile_template(plan.template)(env, params)) == [True, False]
+
+def test_chained_comparison_and_arithmetic():
+    plan = parse("low < close - 10 < high and not close == 0")
+    env = {"low": 1.0, "high": 200.0, "close": 100.0}
+    params = np.array(plan.params, dtype=float).reshape(-1, 1)
+    assert bool(compile_template(plan.template)(env, params)[0])
+
+@pytest.mark.parametrize("close, expected", [(10.0, False), (1.0, True)])
+def test_negation_without_parameters(close, expected):
+    env = {"close": close, "open": 5.0}
+    for expression in ("not (close > open)", "not (close > open) or close > 1e9"):
+        plan = parse(expression)
+        params = np.array(plan.params, dtype=float).reshape(-1, 1)
+        assert bool(np.all(compile_template(plan.template)(env, params))) is expected
+
+@pytest.mark.parametrize("expression", [
+    # attribute access and dunder names
+    "close.__class__ > 0",
+    "close.real > 0",
+    "__import__('os').system('true') > 0",
+    "__builtins__ > 0",
+    "().__class__.__bases__[0] > 0",
+    # callables, lambdas, comprehensions
+    "(lambda: 1)() > 0",
+    "[c for c in (1, 2)] > 0",
+    "{c for c in (1, 2)} > 0",
+    "sum(c for c in (1, 2)) > 0",
+    "eval('1') > 0",
+    "getattr(close, 'real') > 0",
+    "rsi(period=14) < 30",
+    "rsi(14, 3) < 30",
+    "rsi(14.5) < 30",
+    "rsi(True) < 30",
+    "rsi(close) < 30",
+    "rsi(100000) < 30",
+    "rsi(14)(1) < 30",
+    # huge exponents and other operators
+    "close ** 99999999 > 0",
+    "2 ** 2 ** 2 ** 2 ** 2 > 0",
+    "close // 2 > 0",
+    "close % 2 > 0",
+    "close << 2 > 0",
+    "close in (1, 2)",
+    "close is 1",
+    # non-numeric values and other syntax
+    "close > 'a'",
+    "close > True",
+    "close[0] > 0",
+    "(x := 1) > 0",
+    "f'{close}' > 0",
+    "close if close else low > 0",
+    "unknown > 0",
+    # not a condition, or not a number where one is expected
+    "close + 1",
+    "close > (low > 0)",
+    "not close",
+    # malformed
+    "close >",
+    "",
+])
+def test_rejected(expression):
+    with pytest.raises(ExpressionError):
+        parse(expression)
+
+def test_length_and_size_limits():
+    with pytest.raises(ExpressionError):
+        parse("close > 1 and " * 40 + "close > 1")
+    with pytest.raises(ExpressionError, match="too complex"):
+        parse(" + ".join(["close"] * 60) + " > 0")
+    assert len(parse(" + ".join(["close"] * 10) + " > 0").params) == 1
+
+def test_template_has_no_builtins():
+    with pytest.raises(NameError):
+        compile_template("len(p)")(None, None)
@@ -0,0 +1,30 @@
+from collections import Counter
+from app.scanner.cluster import HashRing
+
+KEYS = [f"SYM{i}USDT" for i in range(5000)]
+
+def test_empty_ring_has_no_owner():
+    assert HashRing([]).owner("BTCUSDT") is None
+
+def test_owner_is_stable_and_independent_of_node_order():
+    a = HashRing(["n1", "n2", "n3"])
+    b = HashRing(["n3", "n1", "n2", "n1"])
+    assert [a.owner(k) for k in KEYS] == [b.owner(k) for k in KEYS]
+
+def test_keys_spread_over_all_nodes():
+    ring = HashRing([f"n{i}" for i in range(4)])
+    counts = Counter(ring.owner(k) for k in KEYS)
+    assert set(counts) == set(ring.nodes)
+    assert min(counts.values()) > len(KEYS) / 4 * 0.5
+
+def test_leaving_node_moves_only_its_keys():
+    before = HashRing(["n1", "n2", "n3", "n4"])
+    after = HashRing(["n1", "n2", "n3"])
+    moved = [k for k in KEYS if before.owner(k) != after.owner(k)]
+    assert all(before.owner(k) == "n4" for k in moved)
+    assert len(moved) < len(KEYS) / 4 * 1.5
+
+def test_joining_node_takes_keys_only_for_itself():
+    before = HashRing(["n1", "n2"])
+    after = HashRing(["n1", "n2", "n3"])
+    assert all(after.owner(k) == "n3" for k in KEYS if before.owner(k) != after.owner(k))
@@ -0,0 +1,30 @@
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from app.pagination import decode_cursor, encode_cursor, next_cursor
+
+def test_cursor_round_trip():
+    created_at, row_id = datetime(2026, 10, 19, 12, 30, 5, 123456), uuid.uuid4()
+    cursor = encode_cursor(created_at, row_id)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, row_id)
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "zzz",
+    "!!!",
+    "bm90LWEtY3Vyc29y",  # "not-a-cursor"
+    encode_cursor(datetime(2026, 1, 1), uuid.uuid4())[:-4],
+    "MjAyNi0wMS0wMXxub3BlCg",  # "2026-01-01|nope"
+    "//79",  # not UTF-8
+])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_next_cursor_only_for_full_pages():
+    rows = [SimpleNamespace(created_at=datetime(2026, 1, d), id=uuid.uuid4()) for d in (3, 2, 1)]
+    assert next_cursor(rows, 4) is None
+    assert next_cursor([], 0) is None
+    assert decode_cursor(next_cursor(rows, 3)) == (rows[-1].created_at, rows[-1].id)
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+import pytest
+from app.services.trigger_state import (ARMED, EDGE, FIRED, LEVEL, ONCE, TriggerState, _decode, _encode,
+                                        fingerprint, step)
+
+def strategy(**overrides):
+    fields = dict(condition_type="price_above", condition_value=100.0, expression=None, interval="1h",
+                  indicator_period=14, trigger_mode=EDGE, hysteresis_pct=0.0, rearm_after_sec=0)
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+def test_edge_fires_once_then_rearms_when_condition_clears():
+    s = strategy()
+    fire, state = step(s, TriggerState(), True, 101.0, 1000)
+    assert fire and state == TriggerState(FIRED, 1000)
+    fire, state = step(s, state, True, 102.0, 1060)
+    assert not fire and state.state == FIRED
+    fire, state = step(s, state, False, 99.0, 1120)
+    assert not fire and state == TriggerState(ARMED, 1000)
+    fire, state = step(s, state, True, 101.0, 1180)
+    assert fire and state == TriggerState(FIRED, 1180)
+
+def test_armed_strategy_waits_for_the_condition():
+    assert step(strategy(), TriggerState(), False, 99.0, 1000) == (False, TriggerState())
+
+@pytest.mark.parametrize("condition_type, inside, outside", [
+    ("price_above", 97.0, 95.0),
+    ("price_below", 103.0, 105.0),
+])
+def test_hysteresis_band_delays_rearming(condition_type, inside, outside):
+    s = strategy(condition_type=condition_type, hysteresis_pct=5.0)
+    fired = TriggerState(FIRED, 1000)
+    assert step(s, fired, False, inside, 1060) == (False, fired)
+    assert step(s, fired, False, outside, 1060) == (False, TriggerState(ARMED, 1000))
+
+def test_hysteresis_does_not_apply_to_indicator_conditions():
+    s = strategy(condition_type="rsi_cross_below", condition_value=30.0, hysteresis_pct=10.0)
+    assert step(s, TriggerState(FIRED, 1000), False, 31.0, 1060)[1].state == ARMED
+
+def test_rearm_after_sec_holds_a_fired_strategy():
+    s = strategy(rearm_after_sec=300)
+    fired = TriggerState(FIRED, 1000)
+    assert step(s, fired, False, 99.0, 1200) == (False, fired)
+    assert step(s, fired, False, 99.0, 1300) == (False, TriggerState(ARMED, 1000))
+
+def test_once_never_rearms_on_its_own():
+    s = strategy(trigger_mode=ONCE)
+    fired = TriggerState(FIRED, 1000)
+    assert step(s, fired, False, 50.0, 10 ** 6) == (False, fired)
+
+def test_level_fires_on_every_check_without_changing_state():
+    s = strategy(trigger_mode=LEVEL)
+    assert step(s, TriggerState(), True, 101.0, 1000) == (True, TriggerState())
+    assert step(s, TriggerState(), False, 99.0, 1060) == (False, TriggerState())
+
+def test_missing_mode_means_edge():
+    assert step(strategy(trigger_mode=None), TriggerState(FIRED, 1000), True, 101.0, 1060)[0] is False
+
+@pytest.mark.parametrize("field, value", [
+    ("condition_type", "price_below"), ("condition_value", 101.0), ("expression", "close > 1"),
+    ("interval", "4h"), ("indicator_period", 21), ("trigger_mode", ONCE), ("hysteresis_pct", 1.0),
+])
+def test_fingerprint_follows_the_condition(field, value):
+    assert fingerprint(strategy(**{field: value})) != fingerprint(strategy())
+
+def test_fingerprint_ignores_rearm_delay():
+    assert fingerprint(strategy(rearm_after_sec=60)) == fingerprint(strategy())
+
+@pytest.mark.parametrize("state", [TriggerState(), TriggerState(FIRED, 1700000000), TriggerState(ARMED, 1700000000)])
+def test_encode_decode_round_trip(state):
+    fp = fingerprint(strategy())
+    assert _decode(_encode(state, fp), fp) == state
+    assert _decode(_encode(state, fp).encode(), fp) == state
+
+def test_decode_drops_state_of_another_condition():
+    raw = _encode(TriggerState(FIRED, 1000), fingerprint(strategy()))
+    assert _decode(raw, fingerprint(strategy(condition_value=101.0))) is None
+    assert _decode(None, "00000000") is None
+    assert _decode("", "00000000") is None